@@ -0,0 +1 @@
+"""Benchmark scripts for the polls app."""
@@ -0,0 +1,90 @@
+"""Minimal in-process client for driving `mysite.asgi.application`."""
+import time
+from urllib.parse import urlencode
+
+CSRF_TOKEN = 'benchmarkbenchmarkbenchmarkbench'
+
+
+async def request(app, method, path, cookies=None, data=None):
+    """Send one HTTP request through an ASGI application.
+
+    :param cookies: dict of cookies to send with the request
+    :param data: dict of form fields to post
+    :return: tuple of status code, headers dict and body bytes
+    """
+    path, _, query = path.partition('?')
+    body = urlencode(data).encode() if data is not None else b''
+    headers = [(b'host', b'testserver')]
+    cookies = dict(cookies or {})
+    if method == 'POST':
+        cookies.setdefault('csrftoken', CSRF_TOKEN)
+        headers += [
+            (b'content-type', b'application/x-www-form-urlencoded'),
+            (b'content-length', str(len(body)).encode()),
+            (b'x-csrftoken', cookies['csrftoken'].encode()),
+        ]
+    if cookies:
+        headers.append((b'cookie', '; '.join(
+            f'{key}={value}' for key, value in cookies.items()).encode()))
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    received = False
+    response = {'status': None, 'headers': {}, 'body': b''}
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {'type': 'http.disconnect'}
+        received = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {key.decode().lower(): value.decode()
+                                   for key, value in message['headers']}
+        elif message['type'] == 'http.response.body':
+            response['body'] += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return response['status'], response['headers'], response['body']
+
+
+async def timed_request(app, method, path, cookies=None, data=None):
+    """Send a request and return its status and latency in seconds."""
+    start = time.perf_counter()
+    status, _, _ = await request(app, method, path, cookies, data)
+    return status, time.perf_counter() - start
+
+
+def login_cookies(users):
+    """Create a logged in session for each user.
+
+    :return: list of cookie dicts, one per user
+    """
+    from django.conf import settings
+    from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                     SESSION_KEY)
+    from django.contrib.sessions.backends.db import SessionStore
+
+    cookies = []
+    for user in users:
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        cookies.append({settings.SESSION_COOKIE_NAME: session.session_key})
+    return cookies
@@ -0,0 +1,105 @@
+"""Compare the sync and async polls views served by `mysite.asgi`.
+
+The same seeded database is served once with the sync views and once
+with POLLS_ASYNC_VIEWS enabled, each in a fresh process, and every page
+is requested concurrently through the in-process ASGI client::
+
+    python -m benchmarks.asgi_views --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, migrate, percentile, setup_django, \
+    write_results
+
+
+async def load(app, paths, requests, concurrency):
+    """Request the paths round robin and measure each page.
+
+    :return: dict of page name to requests/sec and latency percentiles
+    """
+    from benchmarks.asgi_client import timed_request
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def get(path):
+        async with semaphore:
+            return await timed_request(app, 'GET', path)
+
+    results = {}
+    for name, path in paths.items():
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*[get(path)
+                                          for _ in range(requests)])
+        elapsed = time.perf_counter() - start
+        latencies = [latency for _, latency in outcomes]
+        results[name] = {
+            'requests_per_second': round(requests / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'errors': sum(1 for status, _ in outcomes if status >= 400),
+        }
+    return results
+
+
+def worker(args):
+    """Serve the benchmark database in one mode and print the results."""
+    setup_django(args.db)
+    from django.utils import timezone
+
+    from mysite.asgi import application
+    from polls.models import Question
+
+    question = Question.objects.filter(
+        pub_date__lte=timezone.now(), end_date__isnull=True).first()
+    paths = {
+        'index': '/polls/',
+        'detail': f'/polls/{question.pk}/',
+        'results': f'/polls/{question.pk}/results/',
+    }
+    results = asyncio.run(load(application, paths, args.requests,
+                               args.concurrency))
+    print(json.dumps(results))
+
+
+def main():
+    """Seed a database and benchmark both modes in subprocesses."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--db', help="database file (default: temporary)")
+    parser.add_argument('--output', help="write the JSON results here")
+    parser.add_argument('--worker', choices=['sync', 'async'],
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    db_path = setup_django(args.db)
+    from benchmarks.dataset import generate
+
+    migrate()
+    generate(questions=50, users=200, votes=5000)
+    results = {}
+    for mode in ('sync', 'async'):
+        env = dict(os.environ,
+                   POLLS_ASYNC_VIEWS=str(mode == 'async'))
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.asgi_views',
+             '--worker', mode, '--db', str(db_path),
+             '--requests', str(args.requests),
+             '--concurrency', str(args.concurrency)],
+            cwd=BASE_DIR, env=env, check=True, capture_output=True,
+            text=True).stdout
+        results[mode] = json.loads(output.splitlines()[-1])
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
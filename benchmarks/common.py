@@ -0,0 +1,142 @@
+"""Shared helpers for the benchmark scripts."""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db_path=None):
+    """Configure Django to run against a separate SQLite database.
+
+    Requests are accepted for the `testserver` host used by the
+    in-process clients and DEBUG is turned off. With the PostgreSQL
+    profile the configured database is used as is.
+
+    :param db_path: database file to use, a new temporary file if None
+    :return: path of the SQLite database file
+    """
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+    import django
+    from django.conf import settings
+    if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        if db_path is None:
+            handle, db_path = tempfile.mkstemp(prefix='ku-polls-bench-',
+                                               suffix='.sqlite3')
+            os.close(handle)
+        settings.DATABASES['default']['NAME'] = str(db_path)
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    # DEBUG keeps a log of every query, which skews the measurements.
+    settings.DEBUG = False
+    django.setup()
+    return db_path
+
+
+def migrate(target=None):
+    """Migrate the benchmark database, optionally to a polls migration.
+
+    The other apps are always migrated to their latest state.
+    """
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    if target is not None:
+        call_command('migrate', 'polls', target, verbosity=0)
+
+
+def percentile(samples, fraction):
+    """Return the given percentile (0-1) of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def write_results(results, path=None):
+    """Print the results as JSON and write them to `path` if given."""
+    text = json.dumps(results, indent=2, default=str)
+    print(text)
+    if path:
+        Path(path).write_text(text + '\n')
+
+
+def add_dataset_arguments(parser, questions=100, choices=4, users=1000,
+                          votes=10000):
+    """Add the options of the seeded dataset to a benchmark parser."""
+    parser.add_argument('--questions', type=int, default=questions)
+    parser.add_argument('--choices', type=int, default=choices)
+    parser.add_argument('--users', type=int, default=users)
+    parser.add_argument('--votes', type=int, default=votes)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="database file (default: temporary)")
+
+
+def add_baseline_arguments(parser):
+    """Add the output and baseline options to a benchmark parser."""
+    parser.add_argument('--output', help="write the JSON results here")
+    parser.add_argument('--baseline',
+                        help="compare the results with this JSON file")
+    parser.add_argument('--save-baseline',
+                        help="store the results as a baseline here")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown against the baseline "
+                             "(default: 0.2 = 20%%)")
+
+
+def compare_results(results, baseline, tolerance=0.2, prefix=''):
+    """Return the metrics that got worse than the baseline.
+
+    Timings (`*_ms`, `seconds`) regress when they grow and rates
+    (`*_per_second`) when they drop by more than `tolerance`; query
+    counts (`queries`) regress when they grow at all. Other numbers are
+    not compared.
+
+    :return: list of (metric path, baseline value, new value)
+    """
+    regressions = []
+    for key, value in results.items():
+        if key not in baseline:
+            continue
+        old = baseline[key]
+        path = f'{prefix}{key}'
+        if isinstance(value, dict) and isinstance(old, dict):
+            regressions += compare_results(value, old, tolerance,
+                                           f'{path}.')
+            continue
+        if not isinstance(value, (int, float)) \
+                or not isinstance(old, (int, float)):
+            continue
+        if key == 'queries':
+            worse = value > old
+        elif key.endswith('_ms') or key == 'seconds':
+            worse = value > old * (1 + tolerance)
+        elif key.endswith('_per_second'):
+            worse = value < old * (1 - tolerance)
+        else:
+            worse = False
+        if worse:
+            regressions.append((path, old, value))
+    return regressions
+
+
+def finish(results, args):
+    """Write the results and check them against the baseline.
+
+    Exits with status 1 when a metric regressed beyond the tolerance.
+    """
+    write_results(results, args.output)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(
+            json.dumps(results, indent=2, default=str) + '\n')
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare_results(results, baseline, args.tolerance)
+        for path, old, new in regressions:
+            print(f"REGRESSION {path}: {old} -> {new}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regression against {args.baseline}", file=sys.stderr)
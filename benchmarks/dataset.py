@@ -0,0 +1,105 @@
+"""Seeded synthetic dataset for the benchmark scripts.
+
+The dataset can also be written to a database file on its own::
+
+    python -m benchmarks.dataset --questions 100 --votes 10000 --db bench.sqlite3
+"""
+import datetime
+import random
+
+BATCH_SIZE = 10000
+
+
+def generate(questions=100, choices=4, users=1000, votes=10000, seed=0):
+    """Fill the database with questions, choices, users and votes.
+
+    Each user votes at most once per question, so `votes` must not be
+    larger than `questions * users`. Rows are written with bulk_create
+    and the stored tallies are recounted at the end.
+
+    :return: dict with the number of rows created per model
+    """
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from django.utils import timezone
+
+    from polls.models import Choice, Question, Vote
+
+    if votes > questions * users:
+        raise ValueError("votes must not exceed questions * users")
+    rng = random.Random(seed)
+    now = timezone.now()
+    with transaction.atomic():
+        Question.objects.bulk_create(
+            [_question(rng, number, now) for number in range(questions)],
+            batch_size=BATCH_SIZE)
+        question_ids = list(Question.objects.order_by('pk')
+                            .values_list('pk', flat=True))
+        Choice.objects.bulk_create(
+            [Choice(question_id=question_id, choice_text=f"Choice {number}")
+             for question_id in question_ids for number in range(choices)],
+            batch_size=BATCH_SIZE)
+        choice_ids = {}
+        for choice_id, question_id in Choice.objects.values_list(
+                'pk', 'question_id'):
+            choice_ids.setdefault(question_id, []).append(choice_id)
+        User.objects.bulk_create(
+            [User(username=f"user{number}", password='!')
+             for number in range(users)],
+            batch_size=BATCH_SIZE)
+        user_ids = list(User.objects.order_by('pk')
+                        .values_list('pk', flat=True))
+        batch = []
+        # Walk the (question, user) grid with a stride so every vote is
+        # unique per user and question without keeping a set of pairs.
+        for number in range(votes):
+            question_id = question_ids[number % questions]
+            user_id = user_ids[(number // questions) % users]
+            batch.append(Vote(user_id=user_id, question_id=question_id,
+                              choice_id=rng.choice(choice_ids[question_id])))
+            if len(batch) >= BATCH_SIZE:
+                Vote.objects.bulk_create(batch)
+                batch = []
+        Vote.objects.bulk_create(batch)
+        Choice.objects.refresh_vote_counts()
+    return {'questions': questions, 'choices': questions * choices,
+            'users': users, 'votes': votes}
+
+
+def _question(rng, number, now):
+    """Build a question published somewhere in the last year.
+
+    About half of the questions have an end date, a tenth of them are
+    not published yet.
+    """
+    from polls.models import Question
+
+    pub_date = now - datetime.timedelta(minutes=rng.randrange(525600))
+    if rng.random() < 0.1:
+        pub_date = now + datetime.timedelta(days=rng.randrange(1, 30))
+    end_date = None
+    if rng.random() < 0.5:
+        end_date = pub_date + datetime.timedelta(days=rng.randrange(1, 60))
+    return Question(question_text=f"Question {number}",
+                    pub_date=pub_date, end_date=end_date)
+
+
+def main():
+    """Seed a database file for running the site or other benchmarks."""
+    import argparse
+
+    from benchmarks.common import add_dataset_arguments, migrate, \
+        setup_django
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+    db_path = setup_django(args.db)
+    migrate()
+    created = generate(args.questions, args.choices, args.users, args.votes,
+                       args.seed)
+    print(f"Seeded {db_path}: {created}")
+
+
+if __name__ == '__main__':
+    main()
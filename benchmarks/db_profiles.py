@@ -0,0 +1,131 @@
+"""Measure concurrent read and write throughput of the database profiles.
+
+Each profile runs in its own process on a freshly seeded database:
+reader threads load poll results while writer threads cast votes::
+
+    python -m benchmarks.db_profiles --seconds 10 --readers 8 --writers 2
+
+SQLite is measured with its default rollback journal and with the WAL
+profile from the settings. Pass --postgresql to also measure the
+PostgreSQL profile; it uses the DATABASE_* environment variables and
+fills that database with benchmark data, so point them at a scratch
+database.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import BASE_DIR, migrate, setup_django, write_results
+
+PROFILES = {
+    'sqlite-journal': {'DATABASE_PROFILE': 'sqlite',
+                       'SQLITE_JOURNAL_MODE': 'DELETE',
+                       'SQLITE_SYNCHRONOUS': 'FULL',
+                       'SQLITE_MMAP_SIZE': '0'},
+    'sqlite-wal': {'DATABASE_PROFILE': 'sqlite'},
+    'postgresql': {'DATABASE_PROFILE': 'postgresql'},
+}
+
+
+def run_threads(seconds, readers, writers, seed):
+    """Run reader and writer threads and count their operations.
+
+    :return: dict with reads/sec, writes/sec and failed operations
+    """
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from polls.models import Choice
+    from polls.results import build_results, results_queryset
+    from polls.services import cast_vote
+
+    users = list(User.objects.all())
+    choices = list(Choice.objects.values_list('pk', 'question_id'))
+    question_ids = sorted({question_id for _, question_id in choices})
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def work(kind, rng):
+        done = errors = 0
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    if kind == 'reads':
+                        build_results(results_queryset().get(
+                            pk=rng.choice(question_ids)))
+                    else:
+                        choice_id, question_id = rng.choice(choices)
+                        cast_vote(rng.choice(users), question_id, choice_id)
+                    done += 1
+                except Exception:
+                    errors += 1
+        finally:
+            connection.close()
+        with lock:
+            counts[kind] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=work,
+                                args=(kind, random.Random(seed + number)))
+               for number, kind in enumerate(['reads'] * readers
+                                             + ['writes'] * writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'reads_per_second': round(counts['reads'] / seconds, 1),
+            'writes_per_second': round(counts['writes'] / seconds, 1),
+            'errors': counts['errors']}
+
+
+def worker(args):
+    """Seed the database of this profile and print its throughput."""
+    setup_django()
+    from benchmarks.dataset import generate
+
+    migrate()
+    generate(questions=50, users=500, votes=10000, seed=args.seed)
+    print(json.dumps(run_threads(args.seconds, args.readers, args.writers,
+                                 args.seed)))
+
+
+def main():
+    """Benchmark every selected profile in a subprocess."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--postgresql', action='store_true',
+                        help="also benchmark the PostgreSQL profile")
+    parser.add_argument('--output', help="write the JSON results here")
+    parser.add_argument('--worker', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    profiles = ['sqlite-journal', 'sqlite-wal']
+    if args.postgresql:
+        profiles.append('postgresql')
+    results = {}
+    for profile in profiles:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.db_profiles', '--worker',
+             '--seconds', str(args.seconds), '--readers', str(args.readers),
+             '--writers', str(args.writers), '--seed', str(args.seed)],
+            cwd=BASE_DIR, env=dict(os.environ, **PROFILES[profile]),
+            check=True, capture_output=True, text=True).stdout
+        results[profile] = json.loads(output.splitlines()[-1])
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
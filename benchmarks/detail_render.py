@@ -0,0 +1,106 @@
+"""Measure the render time of the detail page for polls with many choices.
+
+For each poll size the detail template is rendered with the cached
+template loader of the settings and with an uncached loader, and the
+whole page is requested by a logged-in voter through the test client::
+
+    python -m benchmarks.detail_render --choices 10 100 500
+"""
+import argparse
+import time
+
+from benchmarks.common import add_baseline_arguments, finish, migrate, \
+    percentile, setup_django
+
+
+def create_poll(size, user):
+    """Create an open question with `size` choices and a vote on the last.
+
+    :return: the question
+    """
+    from django.utils import timezone
+
+    from polls.models import Choice, Question, Vote
+
+    question = Question.objects.create(question_text=f"{size} choices",
+                                       pub_date=timezone.now())
+    Choice.objects.bulk_create(
+        [Choice(question=question, choice_text=f"Choice {number}")
+         for number in range(size)])
+    Vote.objects.create(user=user, choice=question.choice_set.last())
+    return question
+
+
+def timed(function, repeat):
+    """Return the p50 and p95 time of a function in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return {'p50_ms': round(percentile(samples, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(samples, 0.95) * 1000, 3)}
+
+
+def measure(question, client, user, repeat):
+    """Return the render and request timings of a question."""
+    from django.conf import settings
+    from django.template import engines
+    from django.template.backends.django import DjangoTemplates
+    from django.urls import reverse
+
+    from polls.history import get_vote_history
+    from polls.views import detail_queryset
+
+    question = detail_queryset().get(pk=question.pk)
+    context = {'question': question,
+               'existed_vote': get_vote_history(user.pk)[question.pk]}
+    cached = engines['django']
+    uncached = DjangoTemplates({
+        'NAME': 'uncached',
+        'DIRS': settings.TEMPLATES[0]['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'loaders': ['django.template.loaders.filesystem.Loader',
+                        'django.template.loaders.app_directories.Loader'],
+        },
+    })
+    url = reverse('polls:detail', args=(question.pk,))
+    client.get(url)
+    return {
+        'cached_loader': timed(lambda: cached.get_template(
+            'polls/detail.html').render(context), repeat),
+        'uncached_loader': timed(lambda: uncached.get_template(
+            'polls/detail.html').render(context), repeat),
+        'page': timed(lambda: client.get(url), repeat),
+    }
+
+
+def main():
+    """Create the polls and measure each size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--choices', type=int, nargs='+',
+                        default=[10, 100, 500])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--db', help="database file (default: temporary)")
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    migrate()
+    user = User.objects.create_user(username='render')
+    client = Client()
+    client.force_login(user)
+    results = {}
+    for size in args.choices:
+        question = create_poll(size, user)
+        results[f'{size}_choices'] = measure(question, client, user,
+                                             args.repeat)
+    finish(results, args)
+
+
+if __name__ == '__main__':
+    main()
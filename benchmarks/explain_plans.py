@@ -0,0 +1,117 @@
+"""Compare the SQLite query plans of the polls hot paths.
+
+The database is migrated and seeded, the hot path indexes of migration
+0008 are dropped and the plans and timings are recorded, then the
+indexes are added back and everything is measured again::
+
+    python -m benchmarks.explain_plans --votes 1000000
+"""
+import argparse
+import time
+from importlib import import_module
+
+from benchmarks.common import migrate, setup_django, write_results
+
+HOT_PATH_INDEXES = 'polls.migrations.0008_hot_path_indexes'
+
+
+def hot_path_indexes():
+    """Return the (model, index) pairs added by migration 0008."""
+    from django.apps import apps
+
+    migration = import_module(HOT_PATH_INDEXES).Migration
+    return [(apps.get_model('polls', operation.model_name), operation.index)
+            for operation in migration.operations]
+
+
+def drop_indexes():
+    """Drop the hot path indexes, keeping every later schema change."""
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model, index in hot_path_indexes():
+            editor.remove_index(model, index)
+
+
+def add_indexes():
+    """Add the hot path indexes back."""
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model, index in hot_path_indexes():
+            editor.add_index(model, index)
+
+
+def hot_path_queries():
+    """Return the hot path querysets, keyed by name."""
+    from django.db.models import Count
+    from django.utils import timezone
+
+    from polls.models import Question, Vote
+
+    now = timezone.now()
+    question = Question.objects.filter(vote__isnull=False).first()
+    user_id = Vote.objects.filter(question=question) \
+        .values_list('user_id', flat=True).first()
+    return {
+        'index': Question.objects.published(now).order_by('-pub_date')[:5],
+        'open_questions': Question.objects.open(now),
+        'user_vote': Vote.objects.filter(user_id=user_id,
+                                         question=question),
+        'tally': Vote.objects.filter(question=question).order_by()
+        .values('choice').annotate(total=Count('pk')),
+    }
+
+
+def measure(repeat):
+    """Return the query plan and mean time of each hot path query."""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    results = {}
+    for name, queryset in hot_path_queries().items():
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+            start = time.perf_counter()
+            for _ in range(repeat):
+                cursor.execute(sql, params)
+                cursor.fetchall()
+            elapsed = (time.perf_counter() - start) / repeat
+        results[name] = {'plan': plan, 'mean_ms': round(elapsed * 1000, 3)}
+    return results
+
+
+def main():
+    """Seed the database and print the plans before and after."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--choices', type=int, default=4)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--votes', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="database file (default: temporary)")
+    parser.add_argument('--output', help="write the JSON results here")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from benchmarks.dataset import generate
+
+    # The dataset needs the columns of the later migrations, so only the
+    # indexes are taken away instead of migrating back to 0007.
+    migrate()
+    dataset = generate(args.questions, args.choices, args.users,
+                       args.votes, args.seed)
+    drop_indexes()
+    before = measure(args.repeat)
+    add_indexes()
+    after = measure(args.repeat)
+    write_results({'dataset': dataset, 'before': before, 'after': after},
+                  args.output)
+
+
+if __name__ == '__main__':
+    main()
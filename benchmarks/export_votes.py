@@ -0,0 +1,79 @@
+"""Measure the throughput and memory of the raw vote export.
+
+The database is seeded once, then every format is exported in a fresh
+process so its peak memory can be read from the process statistics::
+
+    python -m benchmarks.export_votes --votes 5000000
+
+Pass --dumpdata to also measure `manage.py dumpdata polls.Vote`, which
+builds the whole fixture in memory.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, migrate, setup_django, write_results
+
+
+def worker(args):
+    """Export the votes of the database once and print the measurements."""
+    setup_django(args.db)
+    from django.core.management import call_command
+
+    from polls.models import Vote
+
+    votes = Vote.objects.count()
+    start = time.perf_counter()
+    if args.worker == 'dumpdata':
+        call_command('dumpdata', 'polls.Vote', output=os.devnull)
+    else:
+        with open(os.devnull, 'w') as devnull:
+            call_command('export_votes', format=args.worker,
+                         output=os.devnull, stderr=devnull)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'votes': votes,
+                      'seconds': round(elapsed, 2),
+                      'rows_per_second': round(votes / elapsed),
+                      'peak_rss_mb': round(peak, 1)}))
+
+
+def main():
+    """Seed a database and export it in every format."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--votes', type=int, default=5000000)
+    parser.add_argument('--dumpdata', action='store_true',
+                        help="also measure dumpdata")
+    parser.add_argument('--db', help="database file (default: temporary)")
+    parser.add_argument('--output', help="write the JSON results here")
+    parser.add_argument('--worker', choices=['csv', 'ndjson', 'dumpdata'],
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    db_path = setup_django(args.db)
+    from benchmarks.dataset import generate
+
+    migrate()
+    users = max(1, -(-args.votes // 1000))
+    generate(questions=1000, users=users, votes=args.votes)
+    modes = ['csv', 'ndjson'] + (['dumpdata'] if args.dumpdata else [])
+    results = {}
+    for mode in modes:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.export_votes',
+             '--worker', mode, '--db', str(db_path)],
+            cwd=BASE_DIR, check=True, capture_output=True, text=True).stdout
+        results[mode] = json.loads(output.splitlines()[-1])
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Measure vote throughput of direct and batched ingestion over ASGI.
+
+Every user posts one ballot per question through the vote form of
+`mysite.asgi.application`, first with each ballot written in its own
+transaction, then with POLLS_BATCHED_VOTES enabled::
+
+    python -m benchmarks.ingest_load --users 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import migrate, percentile, setup_django, \
+    write_results
+
+
+async def run_ballots(app, ballots, concurrency):
+    """Post all ballots with at most `concurrency` in flight.
+
+    :return: dict with throughput, latency percentiles and status counts
+    """
+    from benchmarks.asgi_client import timed_request
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(cookies, question_id, choice_id):
+        async with semaphore:
+            return await timed_request(
+                app, 'POST', f'/polls/{question_id}/vote/', cookies,
+                {'choice': choice_id})
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*[post(*ballot) for ballot in ballots])
+    elapsed = time.perf_counter() - start
+    latencies = [latency for _, latency in outcomes]
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'ballots': len(ballots),
+        'seconds': round(elapsed, 3),
+        'ballots_per_second': round(len(ballots) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'statuses': statuses,
+    }
+
+
+def build_ballots(cookies, question_ids, rng):
+    """Return one (cookies, question id, choice id) ballot per user/poll."""
+    from polls.models import Choice
+
+    choices = {}
+    for choice_id, question_id in Choice.objects.filter(
+            question_id__in=question_ids).values_list('pk', 'question_id'):
+        choices.setdefault(question_id, []).append(choice_id)
+    ballots = [(cookie, question_id, rng.choice(choices[question_id]))
+               for cookie in cookies for question_id in question_ids]
+    rng.shuffle(ballots)
+    return ballots
+
+
+def main():
+    """Seed the database and post the ballots in both modes."""
+    import random
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=5)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="database file (default: temporary)")
+    parser.add_argument('--output', help="write the JSON results here")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from django.conf import settings
+    from django.contrib.auth.models import User
+
+    from benchmarks.asgi_client import login_cookies
+    from benchmarks.dataset import generate
+    from mysite.asgi import application
+    from polls.ingest import get_ballot_queue
+    from polls.models import Question, Vote
+
+    migrate()
+    generate(questions=args.questions * 2, users=args.users, votes=0,
+             seed=args.seed)
+    cookies = login_cookies(User.objects.order_by('pk'))
+    question_ids = list(Question.objects.order_by('pk')
+                        .values_list('pk', flat=True))
+    rng = random.Random(args.seed)
+    results = {}
+    for mode, questions in (('direct', question_ids[:args.questions]),
+                            ('batched', question_ids[args.questions:])):
+        settings.POLLS_BATCHED_VOTES = mode == 'batched'
+        ballots = build_ballots(cookies, questions, rng)
+        results[mode] = asyncio.run(
+            run_ballots(application, ballots, args.concurrency))
+        if mode == 'batched':
+            get_ballot_queue().flush()
+        results[mode]['votes_stored'] = Vote.objects.filter(
+            question_id__in=questions).count()
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
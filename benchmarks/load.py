@@ -0,0 +1,125 @@
+"""Concurrent load driver for the polls pages.
+
+Worker threads, each logged in as its own user, request a weighted mix
+of the index, detail, results and vote pages through Django's test
+client for a fixed time::
+
+    python -m benchmarks.load --seconds 30 --concurrency 16
+
+The report gives the overall throughput and, per page, the requests per
+second and latency percentiles. It can be compared with a baseline like
+the micro-benchmarks.
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.common import add_baseline_arguments, \
+    add_dataset_arguments, finish, migrate, percentile, setup_django
+
+# Share of each page in the request mix.
+MIX = {'index': 30, 'detail': 20, 'results': 40, 'vote': 10}
+
+
+def drive(seconds, concurrency, seed):
+    """Run the workers and collect the latency of every request.
+
+    :return: dict of page name to list of (latency, status)
+    """
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+
+    from polls.models import Choice, Question
+
+    question_ids = list(Question.objects.open()
+                        .values_list('pk', flat=True))
+    choices = {}
+    for choice_id, question_id in Choice.objects.filter(
+            question_id__in=question_ids).values_list('pk', 'question_id'):
+        choices.setdefault(question_id, []).append(choice_id)
+    question_ids = [pk for pk in question_ids if pk in choices]
+    users = list(User.objects.order_by('pk')[:concurrency])
+    samples = {page: [] for page in MIX}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def work(user, rng):
+        client = Client()
+        client.force_login(user)
+        done = {page: [] for page in MIX}
+        pages, weights = zip(*MIX.items())
+        try:
+            while time.monotonic() < deadline:
+                page = rng.choices(pages, weights)[0]
+                question_id = rng.choice(question_ids)
+                start = time.perf_counter()
+                if page == 'index':
+                    response = client.get('/polls/')
+                elif page == 'detail':
+                    response = client.get(f'/polls/{question_id}/')
+                elif page == 'results':
+                    response = client.get(f'/polls/{question_id}/results/')
+                else:
+                    response = client.post(
+                        f'/polls/{question_id}/vote/',
+                        {'choice': rng.choice(choices[question_id])})
+                done[page].append((time.perf_counter() - start,
+                                   response.status_code))
+        finally:
+            connection.close()
+        with lock:
+            for page, values in done.items():
+                samples[page].extend(values)
+
+    threads = [threading.Thread(target=work,
+                                args=(user, random.Random(seed + number)))
+               for number, user in enumerate(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def report(samples, seconds):
+    """Summarize the samples of every page and of the whole run."""
+    results = {}
+    for page, values in samples.items():
+        latencies = [latency for latency, _ in values]
+        results[page] = {
+            'requests': len(values),
+            'requests_per_second': round(len(values) / seconds, 1),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'errors': sum(1 for _, status in values if status >= 400),
+        }
+    total = sum(len(values) for values in samples.values())
+    results['total'] = {'requests': total,
+                        'requests_per_second': round(total / seconds, 1)}
+    return results
+
+
+def main():
+    """Seed the database and drive the load."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_dataset_arguments(parser)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=8)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from benchmarks.dataset import generate
+
+    migrate()
+    generate(args.questions, args.choices,
+             max(args.users, args.concurrency), args.votes, args.seed)
+    samples = drive(args.seconds, args.concurrency, args.seed)
+    finish(report(samples, args.seconds), args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Micro-benchmarks of the polls models and views.
+
+Every case runs `--repeat` times on a seeded database after a short
+warm-up; the views are requested through Django's test client::
+
+    python -m benchmarks.micro --repeat 200 --save-baseline baseline.json
+    python -m benchmarks.micro --repeat 200 --baseline baseline.json
+
+With --baseline the run fails when a case got slower than the baseline
+by more than the tolerance.
+"""
+import argparse
+import itertools
+import time
+
+from benchmarks.common import add_baseline_arguments, \
+    add_dataset_arguments, finish, migrate, percentile, setup_django
+
+WARMUP = 5
+
+
+def cases():
+    """Return the benchmark cases, keyed by name."""
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.urls import reverse
+
+    from polls.models import Question
+
+    question = Question.objects.open().order_by('pk').first()
+    choices = list(question.choice_set.all())
+    questions = list(Question.objects.order_by('pk')[:1000])
+    anonymous = Client()
+    voter = Client()
+    voter.force_login(User.objects.order_by('pk').first())
+    ballots = itertools.cycle(choice.pk for choice in choices)
+    detail = reverse('polls:detail', args=(question.pk,))
+    results = reverse('polls:results', args=(question.pk,))
+    vote = reverse('polls:vote', args=(question.pk,))
+    return {
+        'choice_votes': lambda: [choice.votes for choice in choices],
+        'question_can_vote': lambda: [item.can_vote()
+                                      for item in questions],
+        'index': lambda: anonymous.get(reverse('polls:index')),
+        'index_logged_in': lambda: voter.get(reverse('polls:index')),
+        'detail': lambda: anonymous.get(detail),
+        'detail_logged_in': lambda: voter.get(detail),
+        'results': lambda: anonymous.get(results),
+        'vote': lambda: voter.post(vote, {'choice': next(ballots)}),
+    }
+
+
+def measure(case, repeat):
+    """Run a case and return its timing and query count.
+
+    :return: dict with mean, p50 and p95 time in ms and the queries of
+             one run
+    """
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(WARMUP):
+        case()
+    reset_queries()
+    with CaptureQueriesContext(connection) as captured:
+        case()
+    # The captured queries are read from the query log, which the next
+    # request clears.
+    queries = len(captured)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case()
+        samples.append(time.perf_counter() - start)
+    return {
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(samples, 0.95) * 1000, 3),
+        'queries': queries,
+    }
+
+
+def main():
+    """Seed the database and run every case."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_dataset_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--case', action='append',
+                        help="only run this case (repeatable)")
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from benchmarks.dataset import generate
+
+    migrate()
+    generate(args.questions, args.choices, args.users, args.votes,
+             args.seed)
+    results = {name: measure(case, args.repeat)
+               for name, case in cases().items()
+               if not args.case or name in args.case}
+    finish(results, args)
+
+
+if __name__ == '__main__':
+    main()
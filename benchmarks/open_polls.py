@@ -0,0 +1,66 @@
+"""Compare listing the open polls in the database and in Python.
+
+The database is seeded with questions in every state of the voting
+window, then the open ones are listed with `Question.objects.open()`
+and by loading every question and calling `can_vote()`::
+
+    python -m benchmarks.open_polls --questions 100000
+"""
+import argparse
+import time
+
+from benchmarks.common import migrate, setup_django, write_results
+
+
+def strategies():
+    """Return the ways of listing the open questions, keyed by name."""
+    from polls.models import Question
+
+    return {
+        'python_can_vote': lambda: [
+            question for question in Question.objects.all()
+            if question.can_vote()],
+        'queryset_open': lambda: list(Question.objects.open()),
+        'queryset_open_count': lambda: Question.objects.open().count(),
+    }
+
+
+def measure(repeat):
+    """Return the mean time and result size of every strategy."""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    results = {}
+    for name, strategy in strategies().items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            found = strategy()
+        elapsed = (time.perf_counter() - start) / repeat
+        size = found if isinstance(found, int) else len(found)
+        results[name] = {'open_questions': size,
+                         'mean_ms': round(elapsed * 1000, 3)}
+    return results
+
+
+def main():
+    """Seed the questions and measure both strategies."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="database file (default: temporary)")
+    parser.add_argument('--output', help="write the JSON results here")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from benchmarks.dataset import generate
+
+    migrate()
+    generate(questions=args.questions, choices=0, users=0, votes=0,
+             seed=args.seed)
+    write_results(measure(args.repeat), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Count the database work of a vote flow under each session profile.
+
+Every user logs in, opens a poll, votes and lands on the results, and
+then follows a redirect with a flash message from a closed poll. Each
+SESSION_PROFILE runs in its own process on a fresh database::
+
+    python -m benchmarks.session_profiles --users 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, add_baseline_arguments, finish, \
+    migrate, setup_django
+
+PROFILES = ['db', 'cached_db', 'signed_cookies']
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class StatementCounter:
+    """Execute wrapper that counts queries, writes and session queries."""
+
+    def __init__(self):
+        """Start from zero."""
+        self.queries = self.writes = self.session = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Count the statement and run it."""
+        self.queries += 1
+        if sql.lstrip().upper().startswith(WRITES):
+            self.writes += 1
+        if 'django_session' in sql:
+            self.session += 1
+        return execute(sql, params, many, context)
+
+
+def run_flows(users):
+    """Run the flow for `users` users and count the statements.
+
+    :return: dict with queries, writes and session queries per flow
+    """
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.utils import timezone
+
+    from polls.models import Question
+
+    now = timezone.now()
+    question = Question.objects.create(
+        question_text="Session profile", pub_date=now)
+    choice = question.choice_set.create(choice_text='yes')
+    closed = Question.objects.create(
+        question_text="Closed", pub_date=now - timezone.timedelta(days=2),
+        end_date=now - timezone.timedelta(days=1))
+    for number in range(users):
+        User.objects.create_user(username=f'flow{number}', password='pass')
+
+    counter = StatementCounter()
+    start = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        for number in range(users):
+            client = Client()
+            client.post('/accounts/login/', {'username': f'flow{number}',
+                                             'password': 'pass'})
+            client.get(f'/polls/{question.pk}/')
+            client.post(f'/polls/{question.pk}/vote/',
+                        {'choice': choice.pk}, follow=True)
+            client.get(f'/polls/{closed.pk}/', follow=True)
+    elapsed = time.perf_counter() - start
+    return {
+        'queries_per_flow': round(counter.queries / users, 2),
+        'writes_per_flow': round(counter.writes / users, 2),
+        'session_queries_per_flow': round(counter.session / users, 2),
+        'flow_ms': round(elapsed / users * 1000, 2),
+    }
+
+
+def worker(args):
+    """Measure the flow under the profile of this process."""
+    setup_django()
+    from django.conf import settings
+
+    # The flow measures storage, not password hashing.
+    settings.PASSWORD_HASHERS = [
+        'django.contrib.auth.hashers.MD5PasswordHasher']
+    migrate()
+    print(json.dumps(run_flows(args.users)))
+
+
+def main():
+    """Measure every profile in a subprocess."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--worker', action='store_true',
+                        help=argparse.SUPPRESS)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    results = {}
+    for profile in PROFILES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.session_profiles',
+             '--worker', '--users', str(args.users)],
+            cwd=BASE_DIR, env=dict(os.environ, SESSION_PROFILE=profile),
+            check=True, capture_output=True, text=True).stdout
+        results[profile] = json.loads(output.splitlines()[-1])
+    finish(results, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Measure the import time and time to first response of a new worker.
+
+`python -X importtime` reports what loading `mysite.wsgi` imports, and
+fresh processes load `mysite.wsgi` and `mysite.asgi` and time their
+first requests, without and with POLLS_WARMUP. Every process runs on
+the same seeded database::
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --max-first-response-ms 500
+
+The run fails when a timing regressed against `--baseline` or the time
+to first response exceeds `--max-first-response-ms`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, add_baseline_arguments, finish, \
+    migrate, setup_django
+
+SERVERS = ['wsgi', 'asgi']
+
+
+def import_times(top=10):
+    """Return the import time of `mysite.wsgi` and its slowest modules.
+
+    :return: dict with the total import time and the `top` modules with
+             the longest own import time in ms
+    """
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import mysite.wsgi'],
+        cwd=BASE_DIR, env=os.environ, check=True, capture_output=True,
+        text=True).stderr
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(own) / 1000
+    slowest = sorted(modules.items(), key=lambda item: -item[1])[:top]
+    return {'import_ms': round(sum(modules.values()), 2),
+            'slowest_imports': {name: round(ms, 2) for name, ms in slowest}}
+
+
+def wsgi_get(application, path):
+    """Request a path from a WSGI application and read the whole body."""
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': path, 'HTTP_HOST': 'testserver'}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda code, headers: status.append(code))
+    try:
+        b''.join(body)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+def asgi_get(application, path):
+    """Request a path from an ASGI application and read the whole body."""
+    from benchmarks.asgi_client import request
+
+    status, _, _ = asyncio.run(request(application, 'GET', path))
+    return status
+
+
+def worker(args):
+    """Load the server entry point and time the first requests."""
+    start = time.perf_counter()
+    if args.worker == 'wsgi':
+        from mysite.wsgi import application
+        get = wsgi_get
+    else:
+        from mysite.asgi import application
+        get = asgi_get
+    boot = time.perf_counter() - start
+    from django.conf import settings
+
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    timings = {'boot_ms': boot * 1000}
+    for name, path in [('first_response_ms', '/polls/'),
+                       ('first_results_ms',
+                        f'/polls/{args.question}/results/'),
+                       ('warm_response_ms', '/polls/')]:
+        start = time.perf_counter()
+        status = get(application, path)
+        timings[name] = (time.perf_counter() - start) * 1000
+        if status != 200:
+            raise SystemExit(f"{path} answered {status}")
+    timings['time_to_first_response_ms'] = \
+        timings['boot_ms'] + timings['first_response_ms']
+    print(json.dumps(timings))
+
+
+def measure(server, warm_up, db_path, question_id, runs):
+    """Return the median timings of `runs` fresh worker processes."""
+    env = dict(os.environ, POLLS_WARMUP=str(warm_up),
+               DJANGO_SETTINGS_MODULE='mysite.settings')
+    if db_path is not None:
+        env['DATABASE_NAME'] = str(db_path)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', '--worker', server,
+             '--question', str(question_id)],
+            cwd=BASE_DIR, env=env, check=True, capture_output=True,
+            text=True).stdout
+        samples.append(json.loads(output.splitlines()[-1]))
+    return {key: round(statistics.median(sample[key] for sample in samples),
+                       2)
+            for key in samples[0]}
+
+
+def main():
+    """Seed the database and measure every server with and without warm-up."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5,
+                        help="worker processes per measurement (median)")
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--votes', type=int, default=2000)
+    parser.add_argument('--db', help="database file (default: temporary)")
+    parser.add_argument('--max-first-response-ms', type=float,
+                        help="fail when a worker takes longer than this to "
+                             "answer its first request")
+    parser.add_argument('--worker', choices=SERVERS, help=argparse.SUPPRESS)
+    parser.add_argument('--question', type=int, help=argparse.SUPPRESS)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    db_path = setup_django(args.db)
+    from benchmarks.dataset import generate
+    from polls.models import Question
+
+    migrate()
+    generate(args.questions, 4, 200, args.votes, 0)
+    question_id = Question.objects.open().latest('pub_date').pk
+    results = {'import': import_times()}
+    for server in SERVERS:
+        results[server] = {
+            'cold': measure(server, False, db_path, question_id, args.runs),
+            'warm_up': measure(server, True, db_path, question_id,
+                               args.runs),
+        }
+    over = [f'{server}.{mode}' for server in SERVERS
+            for mode, timings in results[server].items()
+            if args.max_first_response_ms is not None
+            and timings['time_to_first_response_ms']
+            > args.max_first_response_ms]
+    for path in over:
+        print(f"OVER BUDGET {path}: time to first response above "
+              f"{args.max_first_response_ms} ms", file=sys.stderr)
+    finish(results, args)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 import os
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'polls.middleware.QueryTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,7 +58,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -64,6 +65,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are compiled once per process and kept in memory;
+            # the development server still reloads them when they change.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -78,13 +87,134 @@ AUTHENTICATION_BACKENDS = [
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
-DATABASES = {
+# DATABASE_PROFILE selects sqlite (default) or postgresql.
+
+DATABASE_PROFILE = config("DATABASE_PROFILE", default='sqlite')
+
+if DATABASE_PROFILE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config("DATABASE_NAME", default='ku_polls'),
+            'USER': config("DATABASE_USER", default=''),
+            'PASSWORD': config("DATABASE_PASSWORD", default=''),
+            'HOST': config("DATABASE_HOST", default=''),
+            'PORT': config("DATABASE_PORT", default=''),
+            # Keep connections open between requests and check them
+            # before reuse instead of reconnecting for every request.
+            'CONN_MAX_AGE': config("DATABASE_CONN_MAX_AGE", cast=int,
+                                   default=60),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+elif DATABASE_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config("DATABASE_NAME", default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # seconds a writer waits for the database lock
+                'timeout': config("SQLITE_BUSY_TIMEOUT", cast=int,
+                                  default=20),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        f"Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}, expected one of "
+        f"sqlite, postgresql")
+
+# PRAGMAs applied to every new SQLite connection. In WAL mode readers
+# no longer block on the writer of a vote.
+SQLITE_PRAGMAS = {
+    'journal_mode': config("SQLITE_JOURNAL_MODE", default='WAL'),
+    'synchronous': config("SQLITE_SYNCHRONOUS", default='NORMAL'),
+    'mmap_size': config("SQLITE_MMAP_SIZE", cast=int, default=268435456),
+}
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# The local-memory backend evicts the least recently used entries once
+# MAX_ENTRIES is reached.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config(
+            "CACHE_BACKEND",
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config("CACHE_LOCATION", default='ku-polls'),
+        'OPTIONS': {
+            'MAX_ENTRIES': config("CACHE_MAX_ENTRIES", cast=int,
+                                  default=1000),
+        },
     }
 }
 
+# Cache alias and lifetime (seconds) of the poll results snapshots
+POLLS_RESULTS_CACHE = config("POLLS_RESULTS_CACHE", default='default')
+POLLS_RESULTS_TIMEOUT = config("POLLS_RESULTS_TIMEOUT", cast=int,
+                               default=300)
+
+# Cache alias and lifetime (seconds) of the per-user vote histories
+POLLS_HISTORY_CACHE = config("POLLS_HISTORY_CACHE", default='default')
+POLLS_HISTORY_TIMEOUT = config("POLLS_HISTORY_TIMEOUT", cast=int,
+                               default=300)
+
+# Cache alias of the anonymous index page and its longest lifetime
+# (seconds); it is dropped earlier when a question changes, opens or closes
+POLLS_PAGE_CACHE = config("POLLS_PAGE_CACHE", default='default')
+POLLS_INDEX_CACHE_TIMEOUT = config("POLLS_INDEX_CACHE_TIMEOUT", cast=int,
+                                   default=3600)
+
+# Questions per archive page and per chunk read by the JSON export
+POLLS_ARCHIVE_PAGE_SIZE = config("POLLS_ARCHIVE_PAGE_SIZE", cast=int,
+                                 default=20)
+POLLS_EXPORT_CHUNK_SIZE = config("POLLS_EXPORT_CHUNK_SIZE", cast=int,
+                                 default=500)
+
+# Hours the per-minute vote rollups are kept before compact_rollups merges
+# them into hourly ones
+POLLS_ROLLUP_MINUTE_RETENTION = config("POLLS_ROLLUP_MINUTE_RETENTION",
+                                       cast=int, default=48)
+
+# Warm up templates, URLs, database connections and the results of the
+# newest POLLS_WARMUP_RESULTS open polls when a worker starts (see
+# polls/warmup.py). Only mysite.wsgi and mysite.asgi run it.
+POLLS_WARMUP = config("POLLS_WARMUP", cast=bool, default=False)
+POLLS_WARMUP_RESULTS = config("POLLS_WARMUP_RESULTS", cast=int, default=100)
+
+# Admin lists of unfiltered tables above this many rows show an estimated
+# count instead of running COUNT(*)
+POLLS_ADMIN_ESTIMATE_ABOVE = config("POLLS_ADMIN_ESTIMATE_ABOVE", cast=int,
+                                    default=10000)
+
+# Serve the polls pages with async views (for deployments on mysite.asgi)
+POLLS_ASYNC_VIEWS = config("POLLS_ASYNC_VIEWS", cast=bool, default=False)
+
+# Live results streams. A stream holds its connection open, which only
+# an ASGI server (mysite.asgi) can afford, so the results page only opens
+# one with POLLS_LIVE_RESULTS. Update rate per question and the lifetime
+# (seconds) of one stream connection before the browser reconnects.
+POLLS_LIVE_RESULTS = config("POLLS_LIVE_RESULTS", cast=bool, default=False)
+POLLS_STREAM_MAX_UPDATES_PER_SECOND = config(
+    "POLLS_STREAM_MAX_UPDATES_PER_SECOND", cast=float, default=2)
+POLLS_STREAM_TIMEOUT = config("POLLS_STREAM_TIMEOUT", cast=int, default=300)
+
+# Request instrumentation: samples kept per view and the number of runs
+# of the same SQL in one request that is logged as a possible N+1 query
+POLLS_TIMING_WINDOW = config("POLLS_TIMING_WINDOW", cast=int, default=1000)
+POLLS_REPEATED_QUERY_THRESHOLD = config("POLLS_REPEATED_QUERY_THRESHOLD",
+                                        cast=int, default=5)
+
+# Batched vote ingestion: when enabled, ballots are queued and written
+# every POLLS_BALLOT_FLUSH_INTERVAL seconds or once
+# POLLS_BALLOT_BATCH_SIZE ballots are waiting.
+POLLS_BATCHED_VOTES = config("POLLS_BATCHED_VOTES", cast=bool, default=False)
+POLLS_BALLOT_BATCH_SIZE = config("POLLS_BALLOT_BATCH_SIZE", cast=int,
+                                 default=500)
+POLLS_BALLOT_FLUSH_INTERVAL = config("POLLS_BALLOT_FLUSH_INTERVAL",
+                                     cast=float, default=1.0)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -103,6 +233,32 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Sessions and messages
+# SESSION_PROFILE selects where sessions live: db (default), cached_db
+# (read from the cache, written through to the database) or
+# signed_cookies (no database access at all). Outside the db profile
+# flash messages are kept in a cookie instead of the session, so a
+# redirect with a message does not write the session.
+
+SESSION_PROFILE = config("SESSION_PROFILE", default='db')
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+if SESSION_PROFILE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f"Unknown SESSION_PROFILE {SESSION_PROFILE!r}, expected one of "
+        f"{', '.join(SESSION_ENGINES)}")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_PROFILE]
+SESSION_CACHE_ALIAS = config("SESSION_CACHE_ALIAS", default='default')
+
+if SESSION_PROFILE == 'db':
+    MESSAGE_STORAGE = 'django.contrib.messages.storage.fallback.FallbackStorage'
+else:
+    MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 # Login Redirection
 LOGIN_REDIRECT_URL = '/polls/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
@@ -122,6 +278,31 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = config("STATIC_ROOT", default=str(BASE_DIR / 'staticfiles'))
+
+# With POLLS_STATIC_PIPELINE, collectstatic writes content-hashed files
+# with gzip (and brotli, if installed) variants to STATIC_ROOT, and the
+# site serves them itself with far-future cache headers. The manifest
+# only exists after collectstatic, so the pipeline is off by default.
+POLLS_STATIC_PIPELINE = config("POLLS_STATIC_PIPELINE", cast=bool,
+                               default=False)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'polls.static_files.CompressedManifestStaticFilesStorage'
+            if POLLS_STATIC_PIPELINE
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    },
+}
+
+if POLLS_STATIC_PIPELINE:
+    MIDDLEWARE.insert(MIDDLEWARE.index(
+        'django.middleware.security.SecurityMiddleware') + 1,
+        'polls.static_files.StaticAssetMiddleware')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_wsgi_application()
+
+# Warm up once every app, including the admin registry, is ready.
+from polls.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -1,6 +1,162 @@
-"""Admin page for Polls app."""
+"""Admin page for Polls app.
+
+The change lists read their rows, related objects and vote totals in one
+query. Unfiltered lists of large tables are paginated with an estimated
+row count, because an exact COUNT(*) of the votes table reads all of it.
+"""
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, QuerySet, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Choice, Question, Vote
+from .page_cache import invalidate_index
+from .results import invalidate_results
+
+
+def estimated_count(model, using='default'):
+    """Return a cheap estimate of the number of rows of a model's table.
+
+    PostgreSQL keeps an estimate in its statistics. On SQLite the largest
+    primary key is read from the index, which overestimates after
+    deletes. Other databases have no estimate.
+
+    :return: estimated number of rows, or None if there is no estimate
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class'
+                ' WHERE oid = to_regclass(%s)',
+                [connection.ops.quote_name(model._meta.db_table)])
+            row = cursor.fetchone()
+        # A table that was never analyzed has -1 reltuples.
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
+    if connection.vendor == 'sqlite':
+        return model._default_manager.using(using).aggregate(
+            largest=Coalesce(Max('pk'), 0))['largest']
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates the size of large unfiltered lists.
+
+    Filtered lists and tables with up to POLLS_ADMIN_ESTIMATE_ABOVE rows
+    are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        """Return the estimated or exact number of objects."""
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None \
+                    and estimate > settings.POLLS_ADMIN_ESTIMATE_ABOVE:
+                return estimate
+        return super().count
+
+
+class ChoiceInline(admin.TabularInline):
+    """Choices edited on the page of their question."""
+
+    model = Choice
+    fields = ['choice_text', 'vote_count']
+    readonly_fields = ['vote_count']
+    extra = 0
+
+
+@admin.register(Question)
+class QuestionAdmin(admin.ModelAdmin):
+    """Admin of the questions with their choices and vote totals."""
+
+    list_display = ['question_text', 'pub_date', 'end_date', 'is_open',
+                    'total_votes']
+    search_fields = ['question_text']
+    inlines = [ChoiceInline]
+    actions = ['close_now', 'recompute_tallies']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """Return the questions with the sum of their choice tallies."""
+        return super().get_queryset(request).annotate(
+            total_votes=Coalesce(Sum('choice__vote_count'), 0))
+
+    @admin.display(boolean=True, description="Open")
+    def is_open(self, question):
+        """Return whether the question accepts votes."""
+        return question.can_vote()
+
+    @admin.display(ordering='total_votes', description="Votes")
+    def total_votes(self, question):
+        """Return the number of votes of the question."""
+        return question.total_votes
+
+    @admin.action(description="Close selected polls now")
+    def close_now(self, request, queryset):
+        """End the voting of the selected open questions."""
+        now = timezone.now()
+        closing = list(queryset.open(now).values_list('pk', flat=True))
+        Question.objects.filter(pk__in=closing).update(end_date=now)
+        for question_id in closing:
+            invalidate_results(question_id)
+        invalidate_index()
+        self.message_user(request, f"Closed {len(closing)} poll(s).")
+
+    @admin.action(description="Recompute vote tallies of selected polls")
+    def recompute_tallies(self, request, queryset):
+        """Recount the stored tallies of the selected questions' choices."""
+        question_ids = list(queryset.values_list('pk', flat=True))
+        updated = Choice.objects.filter(question_id__in=question_ids) \
+            .refresh_vote_counts()
+        for question_id in question_ids:
+            invalidate_results(question_id)
+        self.message_user(request, f"Recounted {updated} choice(s).")
+
+
+@admin.register(Choice)
+class ChoiceAdmin(admin.ModelAdmin):
+    """Admin of the choices with their question."""
+
+    list_display = ['choice_text', 'question', 'vote_count']
+    list_select_related = ['question']
+    search_fields = ['choice_text']
+    raw_id_fields = ['question']
+    readonly_fields = ['vote_count']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Vote)
+class VoteAdmin(admin.ModelAdmin):
+    """Admin of the votes with their user, question and choice."""
+
+    list_display = ['pk', 'user', 'question', 'choice']
+    list_select_related = ['user', 'question', 'choice']
+    raw_id_fields = ['user', 'question', 'choice']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        """Refuse new votes; votes are cast by their users.
+
+        A vote added here could name a choice of another question and
+        escape the one vote per question rule kept by `cast_vote`.
+        """
+        return False
 
-from .models import Question
+    def has_change_permission(self, request, obj=None):
+        """Refuse edits; a vote is changed by casting it again.
 
-admin.site.register(Question)
+        Moving a vote to another choice here would bypass the tallies and
+        rollups kept by `cast_vote`.
+        """
+        return False
@@ -0,0 +1,87 @@
+"""Archive of published questions for Polls app.
+
+The archive is paginated with a keyset cursor on (pub_date, id) rather
+than an offset, so every page costs one indexed range query however far
+back it is. The cursor is the position of the last question of a page,
+encoded to keep it opaque to clients.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import BadRequest
+from django.db.models import Prefetch, Q
+
+from .models import Choice, Question
+
+
+def encode_cursor(question):
+    """Return the cursor that continues after `question`."""
+    position = f'{question.pub_date.isoformat()}|{question.pk}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (pub_date, id) position encoded in a cursor.
+
+    :raise BadRequest: when the cursor is malformed
+    """
+    try:
+        pub_date, pk = base64.urlsafe_b64decode(
+            cursor.encode()).decode().split('|')
+        return datetime.datetime.fromisoformat(pub_date), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise BadRequest("Invalid archive cursor")
+
+
+def archive_page(cursor=None, size=20):
+    """Return a page of published questions, newest first.
+
+    :param cursor: cursor of the previous page, None for the first page
+    :return: tuple of the questions of the page and the cursor of the
+             next page, None on the last page
+    """
+    questions = Question.objects.published().order_by('-pub_date', '-pk')
+    if cursor:
+        pub_date, pk = decode_cursor(cursor)
+        questions = questions.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk))
+    # One extra row tells whether there is a next page.
+    page = list(questions[:size + 1])
+    if len(page) > size:
+        page = page[:size]
+        return page, encode_cursor(page[-1])
+    return page, None
+
+
+def question_data(question):
+    """Return the JSON-ready summary of a question."""
+    return {
+        'id': question.pk,
+        'question_text': question.question_text,
+        'pub_date': question.pub_date.isoformat(),
+        'end_date': question.end_date and question.end_date.isoformat(),
+    }
+
+
+def export_questions(chunk_size=500):
+    """Yield every published question with its tallies as a JSON array.
+
+    Questions and their choices are read `chunk_size` questions at a
+    time, so memory use does not grow with the number of questions.
+    """
+    questions = Question.objects.published().order_by('pk') \
+        .prefetch_related(Prefetch('choice_set',
+                                   queryset=Choice.objects.order_by('pk')))
+    separator = '['
+    for question in questions.iterator(chunk_size=chunk_size):
+        choices = [{'id': choice.pk, 'choice_text': choice.choice_text,
+                    'votes': choice.vote_count}
+                   for choice in question.choice_set.all()]
+        data = question_data(question)
+        data['choices'] = choices
+        data['total'] = sum(choice['votes'] for choice in choices)
+        yield separator + json.dumps(data)
+        separator = ',\n'
+    yield '[]\n' if separator == '[' else ']\n'
@@ -0,0 +1,187 @@
+"""Async views for Polls app.
+
+These views serve the same pages as `polls.views` but load their data
+with the async ORM, so they do not tie up a worker thread per request
+when the site runs under ASGI. Writes still go through the sync
+`cast_vote` service because the async ORM has no transactions yet.
+Set POLLS_ASYNC_VIEWS to route the polls pages to these views.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.views import View
+
+from .history import aget_vote_history
+from .ingest import get_ballot_queue
+from .live import get_publisher
+from .models import Choice, Question
+from .page_cache import (get_index_page, index_generation, page_response,
+                         serves_cached_page, store_index_page)
+from .results import aget_results
+from .services import cast_vote
+from .views import detail_queryset
+
+# Seconds between comments that keep an idle results stream open
+KEEPALIVE_INTERVAL = 15
+
+
+async def _get_user(request):
+    """Return the user of the request, loading it outside the event loop.
+
+    The lazy `request.user` reads the session and user tables on first
+    access, after that it can be used from async code.
+    """
+    user = request.user
+    await sync_to_async(lambda: user.is_authenticated)()
+    return user
+
+
+async def _render(request, template_name, context):
+    """Render a template in a worker thread.
+
+    Context processors read the session and messages lazily, which may
+    query the database.
+    """
+    return await sync_to_async(render)(request, template_name, context)
+
+
+class IndexView(View):
+    """Index page that display the latest 5 questions."""
+
+    async def get(self, request):
+        """Render the last five published questions.
+
+        Anonymous visitors are served from the page cache.
+        """
+        user = await _get_user(request)
+        cached = await sync_to_async(serves_cached_page)(request)
+        if cached:
+            generation = await sync_to_async(index_generation)()
+            page = await sync_to_async(get_index_page)(generation)
+            if page is not None:
+                return page_response(request, page)
+        questions = Question.objects.published().order_by('-pub_date')[:5]
+        latest_question_list = [question async for question
+                                in questions.aiterator()]
+        context = {'latest_question_list': latest_question_list}
+        if user.is_authenticated:
+            context['voted_question_ids'] = set(
+                await aget_vote_history(user.pk))
+        response = await _render(request, 'polls/index.html', context)
+        if cached:
+            page = await sync_to_async(store_index_page)(generation,
+                                                         response.content)
+            response = page_response(request, page, response)
+        return response
+
+
+class DetailView(View):
+    """Detail page for each questions."""
+
+    async def get(self, request, pk):
+        """Render the question, or redirect when voting is not allowed."""
+        user = await _get_user(request)
+        try:
+            question = await detail_queryset().open().aget(pk=pk)
+        except Question.DoesNotExist:
+            if not await Question.objects.filter(pk=pk).aexists():
+                raise Http404("No question found matching the query")
+            messages.error(request, "Voting is not allowed for this poll")
+            return redirect(reverse('polls:index'))
+        context = {'question': question}
+        if user.is_authenticated:
+            history = await aget_vote_history(user.pk)
+            if question.pk in history:
+                context['existed_vote'] = history[question.pk]
+        return await _render(request, 'polls/detail.html', context)
+
+
+class ResultsView(View):
+    """Result page for each questions."""
+
+    async def get(self, request, pk):
+        """Render the (cached) aggregated results of the question."""
+        results = await aget_results(pk)
+        if results is None:
+            raise Http404("No question found matching the query")
+        return await _render(request, 'polls/results.html',
+                             {'results': results,
+                              'live_results': settings.POLLS_LIVE_RESULTS})
+
+
+async def vote(request, question_id):
+    """Get the vote action from detail page and save it."""
+    user = await _get_user(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    try:
+        choice_id = int(request.POST['choice'])
+        if settings.POLLS_BATCHED_VOTES:
+            await sync_to_async(get_ballot_queue().submit)(
+                user.id, question_id, choice_id)
+            messages.success(request, "Your vote was received and will be "
+                                      "counted in a moment.")
+        else:
+            await sync_to_async(cast_vote)(user, question_id, choice_id)
+    except (KeyError, ValueError, Choice.DoesNotExist):
+        try:
+            question = await Question.objects.aget(pk=question_id)
+        except Question.DoesNotExist:
+            raise Http404("No question found matching the query")
+        return await _render(request, 'polls/detail.html', {
+            'question': question,
+            'error_message': "You didn't select a choice.",
+        })
+    return HttpResponseRedirect(reverse('polls:results',
+                                        args=(question_id,)))
+
+
+def _event(kind, data):
+    """Format one Server-Sent Event."""
+    return f'event: {kind}\ndata: {json.dumps(data)}\n\n'
+
+
+async def results_stream(request, pk):
+    """Stream the results of a question as Server-Sent Events.
+
+    The first event is a full `snapshot` of the results, then a `delta`
+    with the new total and counts of the changed choices is sent when
+    votes land. The stream ends after POLLS_STREAM_TIMEOUT seconds and
+    the browser reconnects. This view needs the site to run on ASGI and
+    is only served with POLLS_LIVE_RESULTS.
+    """
+    if not settings.POLLS_LIVE_RESULTS:
+        raise Http404("Live results are not enabled")
+    publisher = get_publisher()
+    queue, snapshot = await publisher.subscribe(pk)
+    if queue is None:
+        raise Http404("No question found matching the query")
+
+    async def events():
+        try:
+            yield _event('snapshot', snapshot)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.POLLS_STREAM_TIMEOUT
+            while loop.time() < deadline:
+                timeout = min(KEEPALIVE_INTERVAL, deadline - loop.time())
+                try:
+                    kind, data = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                else:
+                    yield _event(kind, data)
+        finally:
+            publisher.unsubscribe(pk, queue)
+
+    response = StreamingHttpResponse(events(),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
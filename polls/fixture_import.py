@@ -0,0 +1,305 @@
+"""Bulk import of JSON fixtures for Polls app.
+
+`loaddata` saves fixture objects one at a time, sending signals for
+each. `FixtureImporter` reads fixtures in the same format, either a JSON
+array or one object per line (NDJSON), as a stream. It validates every
+object and writes them with `bulk_create` in batches inside a single
+transaction. Raw passwords of users are hashed in a process pool.
+
+Foreign keys are checked by the database when the transaction commits,
+so the objects of a fixture may come in any order.
+"""
+import collections
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F
+
+from .history import invalidate_history
+from .models import Choice, Question, Vote
+from .page_cache import invalidate_index
+from .results import invalidate_results
+from .trends import add_deltas, minute_bucket
+
+MODELS = {
+    'auth.user': User,
+    'polls.question': Question,
+    'polls.choice': Choice,
+    'polls.vote': Vote,
+}
+
+# Size of the pieces a JSON array fixture is read in.
+READ_SIZE = 1 << 16
+
+
+class FixtureError(ValueError):
+    """Raised when a fixture object is malformed or invalid."""
+
+
+def read_objects(path):
+    """Yield the objects of a JSON array or NDJSON fixture file.
+
+    :return: iterator of (position, object), the position being the line
+             number for NDJSON and the object number for a JSON array
+    """
+    with open(path, encoding='utf-8') as fixture:
+        start = fixture.read(READ_SIZE)
+        if start.lstrip().startswith('['):
+            yield from _read_array(fixture, start)
+            return
+        lines = (start + fixture.readline()).splitlines()
+        for number, line in enumerate(_chain(lines, fixture), start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as error:
+                    raise FixtureError(f"{path}:{number}: {error}")
+
+
+def _chain(lines, rest):
+    """Yield the already read lines, then the rest of the file."""
+    yield from lines
+    yield from rest
+
+
+def _read_array(fixture, buffer):
+    """Yield the items of a JSON array without loading it at once."""
+    decoder = json.JSONDecoder()
+    position = buffer.index('[') + 1
+    number = 0
+    while True:
+        # Skip the separators between items, reading more when needed.
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer):
+                break
+            more = fixture.read(READ_SIZE)
+            if not more:
+                raise FixtureError("Unterminated JSON array")
+            buffer, position = more, 0
+        if buffer[position] == ']':
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                break
+            except ValueError as error:
+                more = fixture.read(READ_SIZE)
+                if not more:
+                    raise FixtureError(f"Object {number + 1}: {error}")
+                buffer, position = buffer[position:] + more, 0
+        number += 1
+        yield number, item
+        position = end
+
+
+def _hash_passwords(passwords):
+    """Hash a list of raw passwords."""
+    return [make_password(password) for password in passwords]
+
+
+class FixtureImporter:
+    """Import fixture objects in batches with bulk_create."""
+
+    def __init__(self, batch_size=1000, workers=None):
+        """Create an importer.
+
+        :param batch_size: objects of a model written per INSERT
+        :param workers: processes hashing passwords, None for one per CPU
+        """
+        self.batch_size = batch_size
+        self.workers = workers
+        self.counts = dict.fromkeys(MODELS.values(), 0)
+        self._pending = {model: [] for model in MODELS.values()}
+        self._choice_questions = {}
+        self._voters = set()
+        self._questions = set()
+        self._pool = None
+
+    def load(self, paths):
+        """Import every object of the fixture files in one transaction.
+
+        :return: dict of model label to number of imported objects, and
+                 the import speed under `rows_per_second`
+        :raise FixtureError: when an object is invalid; nothing is saved
+        """
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                for path in paths:
+                    for position, data in read_objects(path):
+                        try:
+                            instance = self.build(data)
+                        except (FixtureError, ValidationError) as error:
+                            raise FixtureError(f"{path}:{position}: {error}")
+                        self.add(instance)
+                for model in MODELS.values():
+                    self.flush(model)
+                self._finish()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        elapsed = time.perf_counter() - start
+        report = {model._meta.label_lower: count
+                  for model, count in self.counts.items()}
+        total = sum(self.counts.values())
+        report['rows_per_second'] = round(total / elapsed) if elapsed else 0
+        return report
+
+    def build(self, data):
+        """Return the validated, unsaved instance of a fixture object.
+
+        :raise FixtureError: when the object is malformed
+        :raise ValidationError: when a field value is invalid
+        """
+        try:
+            model = MODELS[data['model']]
+            fields = data['fields']
+        except (KeyError, TypeError):
+            raise FixtureError("Expected a polls or auth.user object with "
+                               "`model` and `fields`")
+        instance = model(pk=data.get('pk'))
+        for name, value in fields.items():
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise FixtureError(f"Unknown field {data['model']}.{name}")
+            if field.many_to_many:
+                if value:
+                    raise FixtureError(f"{data['model']}.{name} is not "
+                                       "supported")
+                continue
+            if field.many_to_one:
+                setattr(instance, field.attname, value)
+            else:
+                setattr(instance, field.attname, field.to_python(value))
+        # Foreign keys are checked by the database, not one query each.
+        instance.clean_fields(exclude=[
+            field.name for field in model._meta.fields if field.many_to_one])
+        return instance
+
+    def add(self, instance):
+        """Queue an instance, writing its batch when it is full."""
+        model = type(instance)
+        if model is Choice:
+            self._choice_questions[instance.pk] = instance.question_id
+        pending = self._pending[model]
+        pending.append(instance)
+        if len(pending) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model):
+        """Write the queued instances of a model."""
+        pending = self._pending[model]
+        if not pending:
+            return
+        if model is User:
+            self._hash_passwords(pending)
+        elif model is Vote:
+            self._fill_questions(pending)
+            self._voters.update(vote.user_id for vote in pending)
+        model.objects.bulk_create(pending)
+        if model is Question:
+            self._questions.update(question.pk for question in pending)
+        elif model is not User:
+            self._questions.update(instance.question_id
+                                   for instance in pending)
+        if model is Vote:
+            trend = collections.Counter(
+                (vote.question_id, vote.choice_id, minute_bucket(vote.cast_at))
+                for vote in pending)
+            add_deltas((question_id, choice_id, bucket, delta)
+                       for (question_id, choice_id, bucket), delta
+                       in trend.items())
+        self.counts[model] += len(pending)
+        self._pending[model] = []
+
+    def _hash_passwords(self, users):
+        """Hash the raw passwords of users across the process pool."""
+        raw = []
+        for user in users:
+            try:
+                identify_hasher(user.password)
+            except ValueError:
+                raw.append(user)
+        if not raw:
+            return
+        workers = self.workers or os.cpu_count() or 1
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(workers)
+        passwords = [user.password for user in raw]
+        chunk = max(1, len(passwords) // (workers * 4))
+        hashed = self._pool.map(
+            _hash_passwords,
+            [passwords[index:index + chunk]
+             for index in range(0, len(passwords), chunk)])
+        hashed = [password for part in hashed for password in part]
+        for user, password in zip(raw, hashed):
+            user.password = password
+
+    def _fill_questions(self, votes):
+        """Set the question of votes from older fixtures without one."""
+        missing = {vote.choice_id for vote in votes
+                   if vote.question_id is None
+                   and vote.choice_id not in self._choice_questions}
+        if missing:
+            self._choice_questions.update(Choice.objects.filter(
+                pk__in=missing).values_list('pk', 'question_id'))
+        for vote in votes:
+            if vote.question_id is None:
+                try:
+                    vote.question_id = self._choice_questions[vote.choice_id]
+                except KeyError:
+                    raise FixtureError(f"Vote {vote.pk} has an unknown "
+                                       f"choice {vote.choice_id}")
+
+    def _check_vote_questions(self, question_ids):
+        """Check that the votes of questions are on one of their choices.
+
+        A vote whose question differs from its choice's would escape the
+        one vote per question rule. The check runs once every object is
+        written, since a vote may come before its choice.
+
+        :raise FixtureError: for the first such vote
+        """
+        vote = Vote.objects.filter(question_id__in=question_ids).exclude(
+            question=F('choice__question')).values(
+            'pk', 'question_id', 'choice_id', 'choice__question_id').first()
+        if vote is not None:
+            raise FixtureError(
+                f"Vote {vote['pk']} is on question {vote['question_id']} "
+                f"but its choice {vote['choice_id']} belongs to question "
+                f"{vote['choice__question_id']}")
+
+    def _finish(self):
+        """Bring the sequences, tallies and caches up to date."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [model for model, count in self.counts.items()
+                         if count])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+        if self.counts[Vote]:
+            # In batches, so the ids stay below the SQL variable limit.
+            question_ids = sorted(self._questions)
+            for start in range(0, len(question_ids), self.batch_size):
+                batch = question_ids[start:start + self.batch_size]
+                self._check_vote_questions(batch)
+                Choice.objects.filter(
+                    question_id__in=batch).refresh_vote_counts()
+        for question_id in self._questions:
+            invalidate_results(question_id)
+        if self._questions:
+            invalidate_index()
+        for user_id in self._voters:
+            invalidate_history(user_id)
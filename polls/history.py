@@ -0,0 +1,93 @@
+"""Per-user vote history for Polls app.
+
+The questions a user voted on, mapped to the chosen choice, are loaded
+with one query and cached under a version of the user that is bumped
+whenever one of their votes changes. Pages for a logged-in user then
+know every vote of the user without a query per question.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Vote
+
+
+def _cache():
+    """Return the cache that holds the vote histories."""
+    return caches[settings.POLLS_HISTORY_CACHE]
+
+
+def _version_key(user_id):
+    """Return the cache key of the history version of a user."""
+    return f'polls:history:version:{user_id}'
+
+
+def _history_key(user_id):
+    """Return the cache key of the vote history of a user."""
+    return f'polls:history:{user_id}'
+
+
+def history_version(user_id):
+    """Return the current history version of a user."""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, default=version)
+    return version
+
+
+def _bump_version(user_id):
+    """Move a user to a new history version."""
+    cache = _cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_history(user_id):
+    """Make the cached history of a user stale, now and on commit."""
+    _bump_version(user_id)
+    transaction.on_commit(lambda: _bump_version(user_id))
+
+
+def get_vote_history(user_id):
+    """Return the votes of a user, from the cache when possible.
+
+    :return: dict of question id to the id of the chosen choice
+    """
+    cache = _cache()
+    version = history_version(user_id)
+    history = cache.get(_history_key(user_id), version=version)
+    if history is None:
+        history = dict(Vote.objects.filter(user_id=user_id)
+                       .values_list('question_id', 'choice_id'))
+        cache.set(_history_key(user_id), history,
+                  timeout=settings.POLLS_HISTORY_TIMEOUT, version=version)
+    return history
+
+
+async def aget_vote_history(user_id):
+    """Async version of `get_vote_history`."""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, default=version)
+    history = await cache.aget(_history_key(user_id), version=version)
+    if history is None:
+        history = {question_id: choice_id
+                   async for question_id, choice_id
+                   in Vote.objects.filter(user_id=user_id)
+                   .values_list('question_id', 'choice_id')}
+        await cache.aset(_history_key(user_id), history,
+                         timeout=settings.POLLS_HISTORY_TIMEOUT,
+                         version=version)
+    return history
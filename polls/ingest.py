@@ -0,0 +1,260 @@
+"""Batched vote ingestion for Polls app.
+
+Ballots are queued in memory and written in batches, either when the
+queue reaches `batch_size` or every `flush_interval` seconds. Every
+ballot gets a ticket whose status can be checked after it was written.
+Queued ballots are lost if the process dies before the next flush.
+"""
+import collections
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from .history import invalidate_history
+from .models import Choice, Vote
+from .results import invalidate_results
+from .trends import record_deltas
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+WRITTEN = 'written'
+REJECTED = 'rejected'
+
+# First votes inserted per statement, well within SQLite's parameter limit.
+INSERT_BATCH_SIZE = 200
+
+
+class BallotQueue:
+    """In-memory queue of ballots flushed to the database in batches."""
+
+    def __init__(self, batch_size=500, flush_interval=1.0,
+                 max_tickets=100000):
+        """Create an empty queue.
+
+        :param batch_size: number of queued ballots that triggers a flush
+        :param flush_interval: seconds between background flushes, or
+                               None to only flush on size or on demand
+        :param max_tickets: number of ticket statuses kept for lookup
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_tickets = max_tickets
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._tickets = collections.OrderedDict()
+        self._worker = None
+
+    def submit(self, user_id, question_id, choice_id):
+        """Queue a ballot, replacing a queued ballot of the same user.
+
+        :return: ticket of the ballot
+        """
+        ticket = uuid.uuid4().hex
+        with self._lock:
+            replaced = self._pending.pop((user_id, question_id), None)
+            if replaced is not None:
+                self._set_status(replaced[0], user_id, REJECTED)
+            self._pending[(user_id, question_id)] = (ticket, choice_id)
+            self._set_status(ticket, user_id, PENDING)
+            full = len(self._pending) >= self.batch_size
+        self._start_worker()
+        if full:
+            # The failed ballots stay queued for the next flush; the
+            # submitter only needs the ticket.
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing queued ballots failed")
+        return ticket
+
+    def status(self, ticket, user_id):
+        """Return the status of a ticket, or None if it is unknown."""
+        with self._lock:
+            owner, status = self._tickets.get(ticket, (None, None))
+        return status if owner == user_id else None
+
+    def flush(self):
+        """Write all queued ballots in one transaction.
+
+        :return: number of ballots written
+        """
+        with self._flush_lock:
+            with self._lock:
+                ballots, self._pending = self._pending, {}
+            if not ballots:
+                return 0
+            try:
+                written = write_ballots(ballots)
+            except Exception:
+                self._requeue(ballots)
+                raise
+            with self._lock:
+                for (user_id, question_id), (ticket, _) in ballots.items():
+                    status = WRITTEN if ticket in written else REJECTED
+                    self._set_status(ticket, user_id, status)
+            return len(written)
+
+    def _requeue(self, ballots):
+        """Put back ballots of a failed flush unless they were replaced."""
+        with self._lock:
+            for key, ballot in ballots.items():
+                self._pending.setdefault(key, ballot)
+
+    def _set_status(self, ticket, user_id, status):
+        """Record the status of a ticket, forgetting the oldest ones."""
+        self._tickets[ticket] = (user_id, status)
+        self._tickets.move_to_end(ticket)
+        while len(self._tickets) > self.max_tickets:
+            self._tickets.popitem(last=False)
+
+    def _start_worker(self):
+        """Start the background flush thread if it is not running yet."""
+        if self.flush_interval is None or self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name='ballot-flush', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        """Flush the queue every `flush_interval` seconds."""
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing queued ballots failed")
+
+
+def _locked_votes(keys):
+    """Lock the existing votes of (user id, question id) pairs.
+
+    :return: dict of (user id, question id) to the current choice id
+    """
+    votes = Vote.objects.select_for_update().filter(
+        user_id__in={user_id for user_id, _ in keys},
+        question_id__in={question_id for _, question_id in keys})
+    return {(user_id, question_id): choice_id
+            for user_id, question_id, choice_id
+            in votes.values_list('user_id', 'question_id', 'choice_id')
+            if (user_id, question_id) in keys}
+
+
+def _insert_votes(ballots, now):
+    """Insert first votes, skipping users who voted in the meantime.
+
+    Rows that do not exist cannot be locked, so a vote cast between
+    reading the previous votes and this insert is left alone with
+    ON CONFLICT DO NOTHING, which SQLite and PostgreSQL both support.
+
+    :param ballots: dict of (user id, question id) to choice id
+    :return: set of (user id, question id) pairs whose vote was inserted
+    """
+    rows = list(ballots.items())
+    table = connection.ops.quote_name(Vote._meta.db_table)
+    user, question, choice, cast_at = (
+        connection.ops.quote_name(Vote._meta.get_field(name).column)
+        for name in ['user', 'question', 'choice', 'cast_at'])
+    inserted = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            batch = rows[start:start + INSERT_BATCH_SIZE]
+            params = []
+            for (user_id, question_id), choice_id in batch:
+                params += [user_id, question_id, choice_id,
+                           connection.ops.adapt_datetimefield_value(now)]
+            values = ', '.join(['(%s, %s, %s, %s)'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {table} ({user}, {question}, {choice},'
+                f' {cast_at}) VALUES {values}'
+                f' ON CONFLICT ({user}, {question}) DO NOTHING'
+                f' RETURNING {user}, {question}', params)
+            inserted.update(map(tuple, cursor.fetchall()))
+    return inserted
+
+
+def write_ballots(ballots):
+    """Upsert a batch of ballots and move the tallies accordingly.
+
+    Existing votes are locked while they are read, and a vote that
+    another request inserted meanwhile is locked and re-read before it
+    is replaced, so every replaced choice loses its vote in the tallies.
+
+    :param ballots: dict of (user_id, question_id) to (ticket, choice_id)
+    :return: set of tickets whose ballot was written
+    """
+    choice_ids = {choice_id for _, choice_id in ballots.values()}
+    questions = dict(Choice.objects.filter(pk__in=choice_ids)
+                     .values_list('pk', 'question_id'))
+    valid = {key: value for key, value in ballots.items()
+             if questions.get(value[1]) == key[1]}
+    if not valid:
+        return set()
+    question_ids = {question_id for _, question_id in valid}
+    with transaction.atomic():
+        previous = _locked_votes(valid.keys())
+        now = timezone.now()
+        first = {key: choice_id for key, (_, choice_id) in valid.items()
+                 if key not in previous}
+        inserted = _insert_votes(first, now)
+        raced = first.keys() - inserted
+        if raced:
+            previous.update(_locked_votes(raced))
+        trend = collections.Counter()
+        votes = []
+        for (user_id, question_id), (_, choice_id) in valid.items():
+            key = (user_id, question_id)
+            if key in inserted:
+                trend[question_id, choice_id] += 1
+                continue
+            old_choice_id = previous.get(key)
+            if old_choice_id == choice_id:
+                continue
+            if old_choice_id is not None:
+                trend[question_id, old_choice_id] -= 1
+            trend[question_id, choice_id] += 1
+            votes.append(Vote(user_id=user_id, question_id=question_id,
+                              choice_id=choice_id, cast_at=now))
+        # Every vote left here is locked, or gone if it was deleted.
+        Vote.objects.bulk_create(
+            votes, update_conflicts=True,
+            unique_fields=['user', 'question'],
+            update_fields=['choice', 'cast_at'])
+        deltas = {choice_id: delta
+                  for (_, choice_id), delta in trend.items() if delta}
+        if deltas:
+            Choice.objects.filter(pk__in=deltas).update(vote_count=Case(
+                *[When(pk=pk, then=F('vote_count') + delta)
+                  for pk, delta in deltas.items()]))
+            record_deltas(trend, now)
+        for question_id in question_ids:
+            invalidate_results(question_id)
+        for user_id in {vote.user_id for vote in votes} \
+                | {user_id for user_id, _ in inserted}:
+            invalidate_history(user_id)
+    return {ticket for ticket, _ in valid.values()}
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_ballot_queue():
+    """Return the ballot queue of this process."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = BallotQueue(
+                batch_size=settings.POLLS_BALLOT_BATCH_SIZE,
+                flush_interval=settings.POLLS_BALLOT_FLUSH_INTERVAL)
+        return _queue
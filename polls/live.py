@@ -0,0 +1,173 @@
+"""Live results publishing for Polls app.
+
+A single publisher per process fans out tally changes to every viewer
+of a results stream. When votes land, the results of the question are
+loaded once, however many viewers there are, and only the choices whose
+count changed are pushed. Updates of a question are coalesced to at
+most POLLS_STREAM_MAX_UPDATES_PER_SECOND. Deltas carry the new absolute
+count of each changed choice, so applying one twice is harmless.
+
+Only votes committed by this process are pushed; with several workers a
+viewer sees the votes of other workers with the next local change.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+
+from .results import aget_results
+
+
+class _LoopSubscribers:
+    """Subscribers of a publisher that wait on the same event loop."""
+
+    def __init__(self, loop):
+        """Start without subscribers."""
+        self.loop = loop
+        self.subscribers = {}
+        self.last = {}
+        self.dirty = set()
+        self.pumps = {}
+
+
+class ResultsPublisher:
+    """Fan out tally deltas of questions to stream subscribers.
+
+    Every event loop with subscribers, e.g. the loop of an ASGI server or
+    one of the loops `async_to_sync` runs requests on, keeps its own
+    subscribers, so viewers on one loop are never dropped for another.
+    """
+
+    def __init__(self, max_updates_per_second=2, queue_size=100):
+        """Create a publisher without subscribers.
+
+        :param max_updates_per_second: updates pushed per question
+        :param queue_size: events buffered per subscriber before it is
+                           sent a full snapshot instead
+        """
+        self.interval = 1 / max_updates_per_second
+        self.queue_size = queue_size
+        self._loops = {}
+        self._lock = threading.Lock()
+
+    async def subscribe(self, question_id):
+        """Register a viewer of a question.
+
+        :return: tuple of the viewer's event queue and the current
+                 results, or (None, None) if the question does not exist
+        """
+        snapshot = await aget_results(question_id)
+        if snapshot is None:
+            return None, None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._loops
+                           if other.is_closed()]:
+                del self._loops[closed]
+            state = self._loops.setdefault(loop, _LoopSubscribers(loop))
+        state.last.setdefault(question_id, snapshot)
+        queue = asyncio.Queue(self.queue_size)
+        state.subscribers.setdefault(question_id, set()).add(queue)
+        return queue, snapshot
+
+    def unsubscribe(self, question_id, queue):
+        """Remove a viewer, forgetting the question after the last one."""
+        with self._lock:
+            states = list(self._loops.values())
+        for state in states:
+            queues = state.subscribers.get(question_id)
+            if queues is None or queue not in queues:
+                continue
+            queues.discard(queue)
+            if not queues:
+                state.subscribers.pop(question_id, None)
+                state.last.pop(question_id, None)
+
+    def notify(self, question_id):
+        """Tell the publisher the tallies of a question changed.
+
+        Safe to call from any thread.
+        """
+        with self._lock:
+            states = list(self._loops.values())
+        for state in states:
+            if not state.loop.is_closed():
+                state.loop.call_soon_threadsafe(self._schedule, state,
+                                                question_id)
+
+    def _schedule(self, state, question_id):
+        """Mark a question changed and start pushing its updates."""
+        if question_id not in state.subscribers:
+            return
+        state.dirty.add(question_id)
+        if question_id not in state.pumps:
+            state.pumps[question_id] = state.loop.create_task(
+                self._pump(state, question_id))
+
+    async def _pump(self, state, question_id):
+        """Push updates of a question until no more changes come in."""
+        try:
+            while (question_id in state.dirty
+                   and question_id in state.subscribers):
+                state.dirty.discard(question_id)
+                results = await aget_results(question_id)
+                if results is not None:
+                    self._publish(state, question_id, results)
+                await asyncio.sleep(self.interval)
+        finally:
+            state.pumps.pop(question_id, None)
+
+    def _publish(self, state, question_id, results):
+        """Send the changes since the last update to every viewer."""
+        previous = state.last.get(question_id)
+        state.last[question_id] = results
+        delta = tally_delta(previous, results)
+        if delta is None:
+            return
+        if 'choices' in delta:
+            event = ('delta', delta)
+        else:
+            event = ('snapshot', results)
+        for queue in state.subscribers.get(question_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A slow viewer gets resynchronized with a full snapshot.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(('snapshot', results))
+
+
+def tally_delta(previous, results):
+    """Return the tally changes between two results.
+
+    :return: dict with the new total and the vote count of every changed
+             choice, a dict without choices when the set of choices
+             changed, or None when nothing changed
+    """
+    if previous is None:
+        return {'total': results['total']}
+    old = {choice['id']: choice['votes'] for choice in previous['choices']}
+    new = {choice['id']: choice['votes'] for choice in results['choices']}
+    if old.keys() != new.keys() \
+            or previous['question_text'] != results['question_text']:
+        return {'total': results['total']}
+    changed = {choice_id: votes for choice_id, votes in new.items()
+               if old[choice_id] != votes}
+    if not changed:
+        return None
+    return {'total': results['total'], 'choices': changed}
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher():
+    """Return the results publisher of this process."""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = ResultsPublisher(
+                settings.POLLS_STREAM_MAX_UPDATES_PER_SECOND)
+        return _publisher
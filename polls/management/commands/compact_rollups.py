@@ -0,0 +1,30 @@
+"""Command for merging old per-minute vote rollups into hourly ones."""
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from polls.trends import compact_rollups
+
+
+class Command(BaseCommand):
+    """Merge the minute buckets of old hours into hour buckets."""
+
+    help = ("Merge the per-minute vote rollups older than the retention "
+            "into hourly ones. Run it periodically, e.g. from cron.")
+
+    def add_arguments(self, parser):
+        """Add the retention option."""
+        parser.add_argument(
+            '--older-than', type=int,
+            default=settings.POLLS_ROLLUP_MINUTE_RETENTION,
+            help="Hours of minute buckets to keep (default: "
+                 "POLLS_ROLLUP_MINUTE_RETENTION).")
+
+    def handle(self, *args, **options):
+        """Merge the buckets and report how many there were."""
+        before = timezone.now() - datetime.timedelta(
+            hours=options['older_than'])
+        merged = compact_rollups(before)
+        self.stdout.write(f"Merged {merged} minute buckets into hours.")
@@ -0,0 +1,56 @@
+"""Command for exporting the raw votes."""
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.vote_export import FORMATS, parse_moment, vote_rows
+
+
+class Command(BaseCommand):
+    """Stream every vote as CSV or NDJSON."""
+
+    help = "Export the votes as CSV or newline delimited JSON."
+
+    def add_arguments(self, parser):
+        """Add the format, output and filter options."""
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS), default='csv',
+            help="Output format (default: csv).")
+        parser.add_argument(
+            '--output', help="Write to this file instead of stdout.")
+        parser.add_argument(
+            '--question', type=int, nargs='*', dest='questions',
+            help="Only export the votes of these question ids.")
+        parser.add_argument(
+            '--since', help="Only export the votes cast from this date or "
+                            "datetime.")
+        parser.add_argument(
+            '--until', help="Only export the votes cast up to this date or "
+                            "before this datetime.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help="Votes read from the database at a time.")
+
+    def handle(self, *args, **options):
+        """Write the votes line by line and report how many there were."""
+        try:
+            since = options['since'] and parse_moment(options['since'])
+            until = options['until'] and parse_moment(options['until'],
+                                                      end=True)
+        except ValueError as error:
+            raise CommandError(error)
+        self.count = 0
+        rows = self._counted(vote_rows(options['questions'], since, until,
+                                       options['chunk_size']))
+        lines, _ = FORMATS[options['format']]
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines(rows))
+        else:
+            for line in lines(rows):
+                self.stdout.write(line, ending='')
+        self.stderr.write(f"Exported {self.count} votes.")
+
+    def _counted(self, rows):
+        """Pass the rows through, counting them."""
+        for row in rows:
+            self.count += 1
+            yield row
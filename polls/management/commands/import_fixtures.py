@@ -0,0 +1,37 @@
+"""Command for importing large fixtures in bulk."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from polls.fixture_import import FixtureError, FixtureImporter
+
+
+class Command(BaseCommand):
+    """Import questions, choices, users and votes with bulk_create."""
+
+    help = ("Import JSON or NDJSON fixtures of polls and users in bulk, "
+            "a faster loaddata for large datasets.")
+
+    def add_arguments(self, parser):
+        """Add the fixture paths and tuning options."""
+        parser.add_argument('fixtures', nargs='+',
+                            help="Fixture files to import.")
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Objects of a model written per INSERT.")
+        parser.add_argument(
+            '--workers', type=int,
+            help="Processes hashing raw passwords (default: one per CPU).")
+
+    def handle(self, *args, **options):
+        """Import the fixtures and report the rows per second."""
+        importer = FixtureImporter(options['batch_size'], options['workers'])
+        try:
+            report = importer.load(options['fixtures'])
+        except (FixtureError, IntegrityError, OSError) as error:
+            raise CommandError(error)
+        speed = report.pop('rows_per_second')
+        for label, count in report.items():
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {sum(report.values())} objects "
+            f"({speed} rows/sec)."))
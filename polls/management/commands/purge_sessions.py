@@ -0,0 +1,49 @@
+"""Command for deleting expired sessions in batches."""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# Session engines that keep their sessions in the django_session table.
+DATABASE_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    """Delete expired database sessions a batch at a time."""
+
+    help = ("Delete expired sessions in small batches, so the database is "
+            "never locked for long. Run it periodically, e.g. from cron.")
+
+    def add_arguments(self, parser):
+        """Add the batch size and pause options."""
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Sessions deleted per statement.")
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help="Seconds to wait between batches.")
+
+    def handle(self, *args, **options):
+        """Delete the expired sessions and report how many there were."""
+        if settings.SESSION_ENGINE not in DATABASE_ENGINES:
+            self.stdout.write("Sessions are not stored in the database, "
+                              "nothing to purge.")
+            return
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(Session.objects.filter(expire_date__lt=now)
+                        .values_list('session_key', flat=True)
+                        [:options['batch_size']])
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} expired sessions."))
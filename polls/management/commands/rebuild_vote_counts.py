@@ -0,0 +1,33 @@
+"""Command for rebuilding the stored vote tallies."""
+from django.core.management.base import BaseCommand
+
+from polls.models import Choice
+from polls.results import invalidate_results
+
+
+class Command(BaseCommand):
+    """Recount Choice.vote_count from the Vote rows."""
+
+    help = "Rebuild the stored vote count of every choice from its votes."
+
+    def add_arguments(self, parser):
+        """Add the optional question filter."""
+        parser.add_argument(
+            '--question', type=int, nargs='*', dest='questions',
+            help="Only rebuild the choices of these question ids.")
+
+    def handle(self, *args, **options):
+        """Recount the votes and report how many choices were updated.
+
+        The cached results of the recounted questions are invalidated, so
+        the repaired tallies are shown right away.
+        """
+        choices = Choice.objects.all()
+        if options['questions']:
+            choices = choices.filter(question_id__in=options['questions'])
+        updated = choices.refresh_vote_counts()
+        for question_id in choices.values_list('question_id',
+                                               flat=True).distinct():
+            invalidate_results(question_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt vote counts for {updated} choices."))
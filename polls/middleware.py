@@ -0,0 +1,193 @@
+"""Middleware for Polls app."""
+import collections
+import contextlib
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, \
+    sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('polls.performance')
+
+
+class QueryRecorder:
+    """Execute wrapper that counts and times database queries."""
+
+    def __init__(self):
+        """Start without any recorded query."""
+        self.count = 0
+        self.duration = 0.0
+        self.statements = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Run the query and record it under its parameterized SQL."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        """Return the statements run at least `threshold` times.
+
+        The same SQL run many times with different parameters in one
+        request usually means a query in a loop (N+1).
+        """
+        return {sql: count for sql, count in self.statements.items()
+                if count >= threshold}
+
+
+class RollingTimings:
+    """Rolling window of request timings per view."""
+
+    def __init__(self, window=1000):
+        """Keep the last `window` samples of every view."""
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._flagged = collections.Counter()
+
+    def record(self, name, duration, queries, db_duration, repeated=False):
+        """Add one request of the view `name`."""
+        with self._lock:
+            samples = self._samples.setdefault(
+                name, collections.deque(maxlen=self.window))
+            samples.append((duration, queries, db_duration))
+            if repeated:
+                self._flagged[name] += 1
+
+    def snapshot(self):
+        """Return the percentiles of every view in the window.
+
+        :return: dict of view name to request count, p50/p95/p99 wall time
+                 and median query count and DB time (times in ms)
+        """
+        with self._lock:
+            samples = {name: list(values)
+                       for name, values in self._samples.items()}
+            flagged = dict(self._flagged)
+        report = {}
+        for name, values in samples.items():
+            durations = sorted(value[0] for value in values)
+            queries = sorted(value[1] for value in values)
+            db_durations = sorted(value[2] for value in values)
+            report[name] = {
+                'requests': len(values),
+                'p50_ms': _percentile(durations, 0.5) * 1000,
+                'p95_ms': _percentile(durations, 0.95) * 1000,
+                'p99_ms': _percentile(durations, 0.99) * 1000,
+                'queries_p50': _percentile(queries, 0.5),
+                'db_p50_ms': _percentile(db_durations, 0.5) * 1000,
+                'repeated_queries': flagged.get(name, 0),
+            }
+        return report
+
+    def clear(self):
+        """Forget all samples."""
+        with self._lock:
+            self._samples.clear()
+            self._flagged.clear()
+
+
+def _percentile(ordered, fraction):
+    """Return the given percentile (0-1) of a sorted list."""
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1,
+                       int(round(fraction * (len(ordered) - 1))))]
+
+
+timings = RollingTimings(settings.POLLS_TIMING_WINDOW)
+
+# Timings key of the requests without a URL name.
+UNRESOLVED = '(unresolved)'
+
+
+class QueryTimingMiddleware:
+    """Record wall time, query count and DB time of every request.
+
+    The numbers are sent in a `Server-Timing` header and kept in
+    `timings` per URL name (e.g. `polls:results`). Requests that run the
+    same SQL POLLS_REPEATED_QUERY_THRESHOLD times or more are logged as
+    possible N+1 queries. The middleware runs sync or async like the
+    rest of the chain, so it does not force async views onto a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Keep the next handler of the chain."""
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Handle the request while recording its queries."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with _recording(recorder):
+            response = self.get_response(request)
+        return _finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        """Async version of `__call__`.
+
+        Database connections belong to a thread and the async ORM runs
+        its queries on the thread-sensitive sync thread of the request,
+        so the recorder is installed and removed on that thread.
+        """
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        stack = contextlib.ExitStack()
+        await sync_to_async(stack.enter_context)(_recording(recorder))
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return _finish(request, response, recorder, start)
+
+
+@contextlib.contextmanager
+def _recording(recorder):
+    """Record the queries of every database connection."""
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+def _finish(request, response, recorder, start):
+    """Store the timings of a request and add its Server-Timing header."""
+    duration = time.perf_counter() - start
+    name = _view_name(request)
+    repeated = recorder.repeated(settings.POLLS_REPEATED_QUERY_THRESHOLD)
+    for sql, count in repeated.items():
+        logger.warning("Possible N+1 query in %s: %d runs of %s",
+                       name, count, sql)
+    timings.record(name, duration, recorder.count, recorder.duration,
+                   bool(repeated))
+    response['Server-Timing'] = (
+        f'total;dur={duration * 1000:.1f}, '
+        f'db;dur={recorder.duration * 1000:.1f};'
+        f'desc="{recorder.count} queries"')
+    return response
+
+
+def _view_name(request):
+    """Return the URL name of the request, or UNRESOLVED if it has none.
+
+    Unnamed and unresolved requests, e.g. the 404s of a scanner, share
+    one bucket, so the number of windows stays bounded.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.url_name:
+        return match.view_name
+    return UNRESOLVED
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:05
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_vote_question(apps, schema_editor):
+    """Copy the question of each vote's choice and drop duplicate votes.
+
+    Only the latest vote of a user on a question is kept, and the stored
+    tallies are recounted afterwards.
+    """
+    Choice = apps.get_model('polls', 'Choice')
+    Vote = apps.get_model('polls', 'Vote')
+    Vote.objects.update(question=Subquery(
+        Choice.objects.filter(pk=OuterRef('choice')).values('question')))
+    latest = Vote.objects.values('user', 'question') \
+        .annotate(latest=Max('pk')).values_list('latest', flat=True)
+    Vote.objects.exclude(pk__in=latest).delete()
+    tally = Vote.objects.filter(choice=OuterRef('pk')).order_by() \
+        .values('choice').annotate(total=Count('pk')).values('total')
+    Choice.objects.update(vote_count=Coalesce(Subquery(tally), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_choice_vote_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='question',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='polls.question'),
+        ),
+        migrations.RunPython(fill_vote_question,
+                             migrations.RunPython.noop),
+    ]
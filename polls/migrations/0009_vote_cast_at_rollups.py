@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def seed_rollups(apps, schema_editor):
+    """Start the rollups with the existing tallies in the current hour."""
+    Choice = apps.get_model('polls', 'Choice')
+    VoteRollup = apps.get_model('polls', 'VoteRollup')
+    bucket = django.utils.timezone.now().replace(minute=0, second=0,
+                                                 microsecond=0)
+    VoteRollup.objects.bulk_create(
+        (VoteRollup(question_id=question_id, choice_id=choice_id,
+                    bucket=bucket, resolution='hour', delta=vote_count)
+         for choice_id, question_id, vote_count in Choice.objects
+         .filter(vote_count__gt=0)
+         .values_list('pk', 'question_id', 'vote_count').iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], default='minute', max_length=6)),
+                ('delta', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='cast_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='date cast'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['cast_at'], name='polls_vote_cast_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='voterollup',
+            name='choice',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.choice'),
+        ),
+        migrations.AddField(
+            model_name='voterollup',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.question'),
+        ),
+        migrations.AddIndex(
+            model_name='voterollup',
+            index=models.Index(fields=['question', 'bucket'], name='polls_rollup_question_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voterollup',
+            index=models.Index(fields=['resolution', 'bucket'], name='polls_rollup_resolution_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='voterollup',
+            constraint=models.UniqueConstraint(fields=('choice', 'resolution', 'bucket'), name='polls_rollup_one_per_bucket'),
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
@@ -2,10 +2,39 @@
 import datetime
 
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+class QuestionQuerySet(models.QuerySet):
+    """QuerySet for Question model.
+
+    The voting window filters match `Question.can_vote` but run in the
+    database on the pub_date and end_date indexes.
+    """
+
+    def published(self, now=None):
+        """Return the questions whose publish date has passed."""
+        return self.filter(pub_date__lte=now or timezone.now())
+
+    def open(self, now=None):
+        """Return the questions that are accepting votes."""
+        now = now or timezone.now()
+        return self.published(now).filter(
+            models.Q(end_date__isnull=True) | models.Q(end_date__gte=now))
+
+    def closed(self, now=None):
+        """Return the published questions whose end date has passed."""
+        now = now or timezone.now()
+        return self.published(now).filter(end_date__lt=now)
+
+    def upcoming(self, now=None):
+        """Return the questions that are not published yet."""
+        return self.filter(pub_date__gt=now or timezone.now())
+
+
 class Question(models.Model):
     """Question model for polls app."""
 
@@ -13,6 +42,20 @@ class Question(models.Model):
     pub_date = models.DateTimeField('date published')
     end_date = models.DateTimeField('date to be ended', null=True, blank=True)
 
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pub_date'],
+                         name='polls_question_pub_date_idx'),
+            models.Index(fields=['end_date', 'pub_date'],
+                         name='polls_question_window_idx'),
+            # Polls without an end date stay open once published.
+            models.Index(fields=['pub_date'],
+                         condition=models.Q(end_date__isnull=True),
+                         name='polls_question_open_ended_idx'),
+        ]
+
     def __str__(self):
         """Return string of question's text."""
         return self.question_text
@@ -44,17 +87,32 @@ class Question(models.Model):
         return self.end_date >= now >= self.pub_date
 
 
+class ChoiceQuerySet(models.QuerySet):
+    """QuerySet for Choice model."""
+
+    def refresh_vote_counts(self):
+        """Recount the stored vote tally of each choice from its Vote rows.
+
+        :return: number of choices that were updated
+        """
+        tally = Vote.objects.filter(choice=OuterRef('pk')).order_by() \
+            .values('choice').annotate(total=Count('pk')).values('total')
+        return self.update(vote_count=Coalesce(Subquery(tally), 0))
+
+
 class Choice(models.Model):
     """Choice model for polls app."""
 
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
+    vote_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ChoiceQuerySet.as_manager()
 
     @property
     def votes(self):
-        """Count the number of votes for this choice."""
-        count = Vote.objects.filter(choice=self).count()
-        return count
+        """Return the stored number of votes for this choice."""
+        return self.vote_count
 
     def __str__(self):
         """Return string for the choices."""
@@ -62,11 +120,63 @@ class Choice(models.Model):
 
 
 class Vote(models.Model):
-    """Vote model for polls app."""
+    """Vote model for polls app.
+
+    The question of the choice is stored on the vote as well, so that the
+    database can enforce a single vote per user and question.
+    """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    cast_at = models.DateTimeField('date cast', default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'],
+                                    name='polls_vote_one_per_question'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'choice'],
+                         name='polls_vote_question_choice_idx'),
+            models.Index(fields=['cast_at'], name='polls_vote_cast_at_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Fill in the question from the choice before saving."""
+        if self.question_id is None:
+            self.question_id = self.choice.question_id
+        super().save(*args, **kwargs)
+
+
+class VoteRollup(models.Model):
+    """Net change of the votes of a choice within a time bucket.
+
+    Every change of a tally adds its delta to the bucket of the current
+    minute. Old minute buckets are merged into hour buckets by the
+    compact_rollups command, so the cumulative sum of the deltas of a
+    choice is its tally over time.
+    """
+
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    RESOLUTIONS = [(MINUTE, 'Minute'), (HOUR, 'Hour')]
 
-    @property
-    def question(self):
-        return self.question
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    bucket = models.DateTimeField()
+    resolution = models.CharField(max_length=6, choices=RESOLUTIONS,
+                                  default=MINUTE)
+    delta = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'resolution', 'bucket'],
+                                    name='polls_rollup_one_per_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'bucket'],
+                         name='polls_rollup_question_idx'),
+            models.Index(fields=['resolution', 'bucket'],
+                         name='polls_rollup_resolution_idx'),
+        ]
@@ -0,0 +1,127 @@
+"""Cache of the rendered index page for anonymous visitors.
+
+The cached page is stored under a generation number that is bumped
+whenever a question is saved or deleted. It also expires when the next
+question is published or closes, so polls appear and close on time
+without a short timeout.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date
+
+from .models import Question
+
+GENERATION_KEY = 'polls:index:generation'
+
+
+def _cache():
+    """Return the cache that holds the rendered pages."""
+    return caches[settings.POLLS_PAGE_CACHE]
+
+
+def index_generation():
+    """Return the current generation of the index page."""
+    cache = _cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(GENERATION_KEY, generation, timeout=None):
+            generation = cache.get(GENERATION_KEY, default=generation)
+    return generation
+
+
+def _bump_generation():
+    """Move the index page to a new generation."""
+    cache = _cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_index():
+    """Drop the cached index page, now and when the transaction commits."""
+    _bump_generation()
+    transaction.on_commit(_bump_generation)
+
+
+def seconds_until_next_change(now=None):
+    """Return the seconds until the next question opens or closes.
+
+    :return: seconds, capped at POLLS_INDEX_CACHE_TIMEOUT
+    """
+    now = now or timezone.now()
+    # Two ordered lookups that each stop at the first entry of the
+    # pub_date and end_date indexes, instead of aggregating every row.
+    boundaries = [
+        Question.objects.filter(pub_date__gt=now).order_by('pub_date')
+        .values_list('pub_date', flat=True).first(),
+        Question.objects.filter(end_date__gt=now).order_by('end_date')
+        .values_list('end_date', flat=True).first(),
+    ]
+    timeout = settings.POLLS_INDEX_CACHE_TIMEOUT
+    for boundary in boundaries:
+        if boundary is not None:
+            timeout = min(timeout, (boundary - now).total_seconds())
+    return max(1, int(timeout))
+
+
+def get_index_page(generation):
+    """Return the cached index page, or None if it is not cached.
+
+    :return: dict with the page `content`, its `etag` and the
+             `last_modified` timestamp
+    """
+    return _cache().get(f'polls:index:{generation}')
+
+
+def store_index_page(generation, content):
+    """Cache an index page rendered at the given generation.
+
+    The generation has to be read before rendering, so a page rendered
+    while a question changed is stored under the outdated generation.
+
+    :return: the cached page as returned by `get_index_page`
+    """
+    page = {'content': content,
+            'etag': '"%s"' % hashlib.md5(content).hexdigest(),
+            'last_modified': int(time.time())}
+    _cache().set(f'polls:index:{generation}', page,
+                 timeout=seconds_until_next_change())
+    return page
+
+
+def serves_cached_page(request):
+    """Return whether the request can be answered with a cached page.
+
+    Visitors who are logged in or have pending messages see a page of
+    their own.
+    """
+    return (not request.user.is_authenticated
+            and not len(get_messages(request)))
+
+
+def page_response(request, page, response=None):
+    """Return a cached page, or a 304 if the client already has it.
+
+    :param response: the response the page was just rendered into
+    """
+    if response is None:
+        response = get_conditional_response(
+            request, etag=page['etag'], last_modified=page['last_modified'])
+    if response is None:
+        response = HttpResponse(page['content'])
+    response['ETag'] = page['etag']
+    response['Last-Modified'] = http_date(page['last_modified'])
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
@@ -0,0 +1,196 @@
+"""Results aggregation for Polls app."""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Prefetch
+from django.dispatch import Signal
+
+from .models import Choice, Question
+
+# Sent with `question_id` once a change of its results was committed.
+results_changed = Signal()
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def results_queryset():
+    """Return questions with their choices and tallies prefetched.
+
+    Loading a question from this queryset costs two queries no matter
+    how many choices it has.
+    """
+    return Question.objects.prefetch_related(
+        Prefetch('choice_set', queryset=Choice.objects.order_by('pk')))
+
+
+def build_results(question):
+    """Summarize the vote tallies of a question.
+
+    :param question: question loaded from `results_queryset`
+    :return: dict with the choices, their percentages, the total
+             turnout and the leading choice (None when there is no
+             single leader)
+    """
+    choices = [{'id': choice.id,
+                'choice_text': choice.choice_text,
+                'votes': choice.vote_count}
+               for choice in question.choice_set.all()]
+    total = sum(choice['votes'] for choice in choices)
+    for choice in choices:
+        if total:
+            choice['percentage'] = round(choice['votes'] * 100 / total, 1)
+        else:
+            choice['percentage'] = 0.0
+    leader = None
+    if total:
+        top = max(choice['votes'] for choice in choices)
+        leaders = [choice for choice in choices if choice['votes'] == top]
+        if len(leaders) == 1:
+            leader = leaders[0]
+    return {'question_id': question.id,
+            'question_text': question.question_text,
+            'choices': choices,
+            'total': total,
+            'leader': leader}
+
+
+def _cache():
+    """Return the cache that holds the results snapshots."""
+    return caches[settings.POLLS_RESULTS_CACHE]
+
+
+def _version_key(question_id):
+    """Return the cache key of the results version of a question."""
+    return f'polls:results:version:{question_id}'
+
+
+def _snapshot_key(question_id):
+    """Return the cache key of the results snapshot of a question."""
+    return f'polls:results:{question_id}'
+
+
+def _record(outcome):
+    """Count a cache hit or miss."""
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def results_version(question_id):
+    """Return the current results version of a question.
+
+    A missing version starts from the current time rather than from 1,
+    so snapshots stored before the version was evicted can never be
+    read again.
+    """
+    cache = _cache()
+    key = _version_key(question_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, default=version)
+    return version
+
+
+def _bump_version(question_id):
+    """Move a question to a new results version."""
+    cache = _cache()
+    try:
+        cache.incr(_version_key(question_id))
+    except ValueError:
+        cache.set(_version_key(question_id), time.time_ns(), timeout=None)
+
+
+def invalidate_results(question_id):
+    """Make the cached results of a question stale.
+
+    The version is bumped right away, so the writer sees its own change,
+    and again when the transaction commits, so a snapshot that another
+    reader stored before the commit is never served.
+    """
+    _bump_version(question_id)
+    transaction.on_commit(lambda: _committed(question_id))
+
+
+def _committed(question_id):
+    """Bump the version after commit and announce the change."""
+    _bump_version(question_id)
+    results_changed.send(sender=None, question_id=question_id)
+
+
+def get_results(question_id):
+    """Return the results of a question, from the cache when possible.
+
+    :return: results as built by `build_results`, or None when the
+             question does not exist
+    """
+    cache = _cache()
+    version = results_version(question_id)
+    results = cache.get(_snapshot_key(question_id), version=version)
+    if results is not None:
+        _record('hits')
+        return results
+    _record('misses')
+    question = results_queryset().filter(pk=question_id).first()
+    if question is None:
+        return None
+    results = build_results(question)
+    cache.set(_snapshot_key(question_id), results,
+              timeout=settings.POLLS_RESULTS_TIMEOUT, version=version)
+    return results
+
+
+def prime_results(questions):
+    """Store fresh results snapshots of several questions at once.
+
+    :param questions: questions loaded from `results_queryset`
+    :return: number of snapshots stored
+    """
+    cache = _cache()
+    primed = 0
+    for question in questions:
+        cache.set(_snapshot_key(question.id), build_results(question),
+                  timeout=settings.POLLS_RESULTS_TIMEOUT,
+                  version=results_version(question.id))
+        primed += 1
+    return primed
+
+
+async def aresults_version(question_id):
+    """Async version of `results_version`."""
+    cache = _cache()
+    key = _version_key(question_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, default=version)
+    return version
+
+
+async def aget_results(question_id):
+    """Async version of `get_results`."""
+    cache = _cache()
+    version = await aresults_version(question_id)
+    results = await cache.aget(_snapshot_key(question_id), version=version)
+    if results is not None:
+        _record('hits')
+        return results
+    _record('misses')
+    question = await results_queryset().filter(pk=question_id).afirst()
+    if question is None:
+        return None
+    results = build_results(question)
+    await cache.aset(_snapshot_key(question_id), results,
+                     timeout=settings.POLLS_RESULTS_TIMEOUT, version=version)
+    return results
+
+
+def cache_stats():
+    """Return the hit and miss counters of the results cache."""
+    with _stats_lock:
+        return dict(_stats)
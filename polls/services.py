@@ -0,0 +1,82 @@
+"""Vote casting service for Polls app."""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, OuterRef, Subquery, When
+from django.utils import timezone
+
+from .history import invalidate_history
+from .models import Choice, Vote
+from .results import invalidate_results
+from .trends import record_deltas
+
+
+class VoteConflict(Exception):
+    """Raised when another request changed the vote while casting it."""
+
+
+def _load_choice(user, question_id, choice_id):
+    """Load the choice with its question and the user's current vote.
+
+    :return: choice with a `previous_choice_id` attribute, which is None
+             when the user has not voted on the question yet
+    :raise Choice.DoesNotExist: when the choice is not part of the question
+    """
+    previous = Vote.objects.filter(user=user, question=OuterRef('question'))
+    return Choice.objects.select_related('question').annotate(
+        previous_choice_id=Subquery(previous.values('choice')[:1])
+    ).get(pk=choice_id, question_id=question_id)
+
+
+def _record(user, choice, previous_choice_id):
+    """Write the vote and move the tallies in one transaction.
+
+    :return: True if anything changed, False if the vote was already cast
+    """
+    if previous_choice_id == choice.id:
+        return False
+    with transaction.atomic():
+        if previous_choice_id is None:
+            # The post_save handler counts the new vote.
+            Vote.objects.create(user=user, question=choice.question,
+                                choice=choice)
+        else:
+            now = timezone.now()
+            changed = Vote.objects.filter(
+                user=user, question=choice.question,
+                choice_id=previous_choice_id).update(choice=choice,
+                                                     cast_at=now)
+            if not changed:
+                raise VoteConflict
+            Choice.objects.filter(
+                pk__in=[previous_choice_id, choice.id]).update(
+                vote_count=Case(
+                    When(pk=choice.id, then=F('vote_count') + 1),
+                    default=F('vote_count') - 1))
+            record_deltas({(choice.question_id, previous_choice_id): -1,
+                           (choice.question_id, choice.id): 1}, now)
+            invalidate_results(choice.question_id)
+            invalidate_history(user.pk)
+    return True
+
+
+def cast_vote(user, question_id, choice_id, retries=3):
+    """Record the vote of a user, replacing their earlier vote if any.
+
+    The existing vote is read together with the choice, so a ballot costs
+    one read and one write of the vote row, plus one tally update and
+    one rollup upsert.
+    The unique (user, question) constraint on Vote and the conditional
+    update of the old vote make concurrent ballots of the same user safe:
+    the losing request re-reads the vote and tries again.
+
+    :return: the chosen choice, with its question loaded
+    :raise Choice.DoesNotExist: when the choice is not part of the question
+    """
+    for attempt in range(retries):
+        choice = _load_choice(user, question_id, choice_id)
+        try:
+            _record(user, choice, choice.previous_choice_id)
+        except (IntegrityError, VoteConflict):
+            if attempt == retries - 1:
+                raise
+        else:
+            return choice
@@ -0,0 +1,84 @@
+"""Signal handlers for Polls app."""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Choice, Question, Vote
+from .history import invalidate_history
+from .live import get_publisher
+from .page_cache import invalidate_index
+from .results import invalidate_results, results_changed
+from .trends import record_deltas
+
+
+@receiver(post_save, sender=Vote)
+def count_new_vote(sender, instance, created, raw=False, **kwargs):
+    """Add a newly created vote to the tally and trend of its choice."""
+    if created and not raw:
+        Choice.objects.filter(pk=instance.choice_id).update(
+            vote_count=F('vote_count') + 1)
+        record_deltas({(instance.question_id, instance.choice_id): 1},
+                      instance.cast_at)
+        invalidate_results(instance.question_id)
+
+
+@receiver(post_delete, sender=Vote)
+def uncount_deleted_vote(sender, instance, **kwargs):
+    """Remove a deleted vote from the tally and trend of its choice.
+
+    This also runs for votes removed by a cascade, e.g. when the user
+    who cast them is deleted. When the choice or question itself is
+    deleted, the tally and rollups go with it and its results are
+    invalidated by its own handler, so nothing is done per vote.
+    """
+    origin = kwargs.get('origin')
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(model, (Choice, Question)):
+        return
+    Choice.objects.filter(pk=instance.choice_id, vote_count__gt=0).update(
+        vote_count=F('vote_count') - 1)
+    record_deltas({(instance.question_id, instance.choice_id): -1})
+    invalidate_results(instance.question_id)
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+def invalidate_vote_history(sender, instance, raw=False, **kwargs):
+    """Drop the cached vote history of the voter."""
+    if not raw:
+        invalidate_history(instance.user_id)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def invalidate_choice_results(sender, instance, raw=False, **kwargs):
+    """Drop the cached results of a question whose choices changed."""
+    if not raw:
+        invalidate_results(instance.question_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_results(sender, instance, raw=False, **kwargs):
+    """Drop the cached results and index page of a changed question."""
+    if not raw:
+        invalidate_results(instance.pk)
+        invalidate_index()
+
+
+@receiver(results_changed)
+def push_live_results(sender, question_id, **kwargs):
+    """Push committed tally changes to the live results streams."""
+    get_publisher().notify(question_id)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Apply the SQLITE_PRAGMAS setting to a new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
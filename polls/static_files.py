@@ -0,0 +1,162 @@
+"""Fingerprinted, precompressed static files for Polls app.
+
+`CompressedManifestStaticFilesStorage` gives every collected file a
+content hash in its name and writes gzip (and brotli, when the optional
+`brotli` package is installed) variants next to it at collectstatic
+time. `StaticAssetMiddleware` serves the collected files from
+STATIC_ROOT, picking the smallest variant the client accepts. Hashed
+files never change, so they are sent with a far-future Cache-Control;
+every file carries an ETag and Last-Modified, so the others can be
+revalidated with a 304.
+
+Both are enabled with POLLS_STATIC_PIPELINE.
+"""
+import gzip
+import mimetypes
+import os
+from functools import cached_property
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Extensions of the files worth compressing.
+COMPRESSIBLE = {'.css', '.js', '.svg', '.txt', '.html', '.json', '.xml',
+                '.map'}
+
+# Compressed variants by Content-Encoding, in order of preference.
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# One year, the longest lifetime caches honour.
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes compressed copies of the files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Hash the files, then compress every original and hashed file."""
+        processed = []
+        for name, hashed_name, done in super().post_process(
+                paths, dry_run, **options):
+            if not isinstance(done, Exception) and hashed_name:
+                processed.append((name, hashed_name))
+            yield name, hashed_name, done
+        if dry_run:
+            return
+        for name, hashed_name in processed:
+            for path in {name, hashed_name}:
+                self.compress(path)
+
+    def compress(self, name):
+        """Write the compressed variants of a file, if they are smaller."""
+        if os.path.splitext(name)[1] not in COMPRESSIBLE:
+            return
+        with self.open(name) as original:
+            content = original.read()
+        variants = {'.gz': gzip.compress(content, compresslevel=9,
+                                         mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(content)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(content):
+                with open(self.path(name + suffix), 'wb') as variant:
+                    variant.write(compressed)
+
+
+def accepted_encodings(header):
+    """Return the content codings a client accepts.
+
+    :param header: value of the Accept-Encoding request header
+    """
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:] or 0) == 0:
+                    continue
+            except ValueError:
+                # A malformed quality is treated as not acceptable.
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssetMiddleware:
+    """Serve collected static files from STATIC_ROOT.
+
+    The brotli or gzip variant is sent when the client accepts it, with
+    `Vary: Accept-Encoding`. Files whose name carries a content hash are
+    cached for a year; other files have to be revalidated, and a client
+    that still has the file gets a 304.
+    """
+
+    def __init__(self, get_response):
+        """Keep the next handler of the chain."""
+        self.get_response = get_response
+
+    @cached_property
+    def immutable(self):
+        """Return the names of the hashed files in the manifest."""
+        return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        """Answer static file requests, pass on everything else."""
+        if request.method in ('GET', 'HEAD') \
+                and request.path_info.startswith(settings.STATIC_URL):
+            return self.serve(request,
+                              request.path_info[len(settings.STATIC_URL):])
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        """Return the response for the static file `name`."""
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            raise Http404("No such static file")
+        if not os.path.isfile(path):
+            raise Http404("No such static file")
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = accepted_encodings(
+            request.headers.get('Accept-Encoding', ''))
+        encoding = None
+        for coding, suffix in ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                encoding, path = coding, path + suffix
+                break
+        stat = os.stat(path)
+        # The validators come from the variant sent, so each encoding has
+        # an ETag of its own.
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(stat.st_mtime))
+        if response is None:
+            response = FileResponse(open(path, 'rb'),
+                                    content_type=content_type
+                                    or 'application/octet-stream')
+            # The file name of a variant is not meant for the client.
+            del response['Content-Disposition']
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if encoding and response.status_code == 200:
+            response['Content-Encoding'] = encoding
+        if os.path.splitext(name)[1] in COMPRESSIBLE:
+            patch_vary_headers(response, ['Accept-Encoding'])
+        if name in self.immutable:
+            response['Cache-Control'] = \
+                f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = 'public, no-cache'
+        return response
@@ -0,0 +1,58 @@
+"""Query and time budgets for Polls app tests."""
+import contextlib
+import time
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class query_budget(contextlib.ContextDecorator):
+    """Fail when a block runs more queries or takes longer than allowed.
+
+    Usable as a context manager or a decorator::
+
+        with query_budget(2):
+            client.get(url)
+
+        @query_budget(4, ms=200)
+        def test_detail(self):
+            ...
+
+    The failure lists every query that ran, so an N+1 shows up as the
+    same SQL repeated.
+    """
+
+    def __init__(self, queries, ms=None, using='default'):
+        """Allow at most `queries` queries and `ms` milliseconds."""
+        self.queries = queries
+        self.ms = ms
+        self.using = using
+
+    def __enter__(self):
+        """Start capturing the queries and timing the block."""
+        self._capture = CaptureQueriesContext(connections[self.using])
+        self._capture.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Check the budgets unless the block failed already."""
+        self.elapsed_ms = (time.perf_counter() - self._start) * 1000
+        self._capture.__exit__(exc_type, exc_value, traceback)
+        self.captured = list(self._capture.captured_queries)
+        if exc_type is not None:
+            return False
+        problems = []
+        if len(self.captured) > self.queries:
+            problems.append(f"{len(self.captured)} queries, over the "
+                            f"budget of {self.queries}")
+        if self.ms is not None and self.elapsed_ms > self.ms:
+            problems.append(f"{self.elapsed_ms:.1f} ms, over the budget "
+                            f"of {self.ms} ms")
+        if problems:
+            statements = '\n'.join(
+                f"{number}. {query['sql']}"
+                for number, query in enumerate(self.captured, start=1))
+            raise AssertionError('; '.join(problems)
+                                 + f"\nQueries run:\n{statements}")
+        return False
@@ -0,0 +1,26 @@
+"""Pytest fixtures for Polls app tests."""
+import pytest
+from django.core.cache import caches
+
+from .budget import query_budget
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty caches.
+
+    Rolled back test data reuses primary keys, so entries cached by an
+    earlier test would otherwise leak into the next one.
+    """
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture
+def budget():
+    """Return `query_budget` for tests declaring query and time budgets.
+
+    Use it as ``with budget(2, ms=100): ...`` in a test with database
+    access.
+    """
+    return query_budget
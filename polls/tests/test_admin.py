@@ -0,0 +1,161 @@
+"""Test for the admin of Polls app."""
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..admin import EstimatedCountPaginator, estimated_count
+from ..models import Choice, Question, Vote
+from .test_view import create_question
+
+
+class AdminTests(TestCase):
+    """Test for the question, choice and vote admins."""
+
+    def setUp(self):
+        """Create a question with votes and log in a superuser."""
+        self.admin = User.objects.create_superuser(username="admin",
+                                                   password="123")
+        self.client.force_login(self.admin)
+        self.question = create_question("admin", days=-1)
+        self.choices = [self.question.choice_set.create(choice_text=text)
+                        for text in ['yes', 'no']]
+        for number in range(3):
+            user = User.objects.create_user(username=f"voter{number}")
+            Vote.objects.create(user=user, choice=self.choices[number % 2])
+
+    def run_action(self, action):
+        """Run a question action on the question under test."""
+        return self.client.post(
+            reverse('admin:polls_question_changelist'),
+            {'action': action, ACTION_CHECKBOX_NAME: [self.question.pk]},
+            follow=True)
+
+    def test_question_list_totals(self):
+        """The question list reads the vote totals with its rows."""
+        for number in range(5):
+            question = create_question(f"other {number}", days=-1)
+            question.choice_set.create(choice_text='only')
+        url = reverse('admin:polls_question_changelist')
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_list
+                         .get(pk=self.question.pk).total_votes, 3)
+        polls_queries = [query['sql'] for query in captured
+                         if 'polls_question' in query['sql']]
+        # The estimate, the exact count of the small table and the list.
+        self.assertEqual(len(polls_queries), 3)
+        self.assertIn('SUM', polls_queries[-1])
+
+    def test_question_page_has_choices(self):
+        """The question page edits its choices inline."""
+        response = self.client.get(
+            reverse('admin:polls_question_change', args=(self.question.pk,)))
+        self.assertContains(response, 'choice_set-0-choice_text')
+
+    def test_vote_list(self):
+        """The vote list loads its related objects with the votes."""
+        url = reverse('admin:polls_vote_changelist')
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertContains(response, "voter2")
+        self.assertEqual(len([query for query in captured
+                              if 'polls_vote' in query['sql']]), 3)
+
+    def test_vote_is_read_only(self):
+        """A vote can be viewed but not moved to another choice."""
+        vote = Vote.objects.get(user__username="voter0")
+        url = reverse('admin:polls_vote_change', args=(vote.pk,))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'name="_save"')
+        response = self.client.post(url, {'user': vote.user_id,
+                                          'question': self.question.pk,
+                                          'choice': self.choices[1].pk})
+        self.assertEqual(response.status_code, 403)
+        vote.refresh_from_db()
+        self.assertEqual(self.choices[0].pk, vote.choice_id)
+
+    def test_votes_cannot_be_added(self):
+        """Votes are only cast by their users, not added in the admin."""
+        user = User.objects.create_user(username="newcomer")
+        other = create_question("other", days=-1)
+        choice = other.choice_set.create(choice_text='elsewhere')
+        response = self.client.post(reverse('admin:polls_vote_add'), {
+            'user': user.pk, 'question': self.question.pk,
+            'choice': choice.pk, 'cast_at_0': '2023-01-01',
+            'cast_at_1': '00:00:00'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Vote.objects.filter(user=user).exists())
+
+    def test_close_now(self):
+        """Closing a poll ends its voting."""
+        self.run_action('close_now')
+        self.question.refresh_from_db()
+        self.assertFalse(self.question.can_vote())
+        response = self.client.get(
+            reverse('polls:detail', args=(self.question.pk,)))
+        self.assertEqual(response.status_code, 302)
+
+    def test_close_now_skips_closed_polls(self):
+        """Polls that are closed already keep their end date."""
+        closed = create_question("closed", days=-5)
+        end_date = closed.pub_date + closed.pub_date.resolution * 10
+        Question.objects.filter(pk=closed.pk).update(end_date=end_date)
+        self.client.post(reverse('admin:polls_question_changelist'),
+                         {'action': 'close_now',
+                          ACTION_CHECKBOX_NAME: [closed.pk]})
+        closed.refresh_from_db()
+        self.assertEqual(closed.end_date, end_date)
+
+    def test_recompute_tallies(self):
+        """Recomputing the tallies recounts them from the votes."""
+        Choice.objects.filter(pk=self.choices[0].pk).update(vote_count=40)
+        self.client.get(reverse('polls:results', args=(self.question.pk,)))
+        self.run_action('recompute_tallies')
+        self.assertEqual([choice.vote_count for choice in
+                          self.question.choice_set.order_by('pk')], [2, 1])
+        response = self.client.get(
+            reverse('polls:results', args=(self.question.pk,)))
+        self.assertContains(response, '<span id="total">3</span>')
+
+
+class EstimatedCountTests(TestCase):
+    """Test for the estimated count paginator."""
+
+    def setUp(self):
+        """Create some questions and delete one of them."""
+        self.questions = [create_question(f"q{number}", days=-1)
+                          for number in range(5)]
+        self.questions[1].delete()
+
+    def test_estimate(self):
+        """The SQLite estimate is the largest primary key."""
+        self.assertEqual(estimated_count(Question),
+                         self.questions[-1].pk)
+
+    @override_settings(POLLS_ADMIN_ESTIMATE_ABOVE=0)
+    def test_large_table_is_estimated(self):
+        """Unfiltered lists of large tables are not counted."""
+        paginator = EstimatedCountPaginator(
+            Question.objects.order_by('pk'), 2)
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(paginator.count, self.questions[-1].pk)
+        self.assertNotIn('COUNT', captured[0]['sql'].upper())
+
+    @override_settings(POLLS_ADMIN_ESTIMATE_ABOVE=0)
+    def test_filtered_list_is_counted(self):
+        """Filtered lists are counted exactly."""
+        paginator = EstimatedCountPaginator(
+            Question.objects.filter(question_text__startswith='q')
+            .order_by('pk'), 2)
+        self.assertEqual(paginator.count, 4)
+
+    def test_small_table_is_counted(self):
+        """Tables below the threshold are counted exactly."""
+        paginator = EstimatedCountPaginator(
+            Question.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 4)
@@ -0,0 +1,113 @@
+"""Test for the poll archive and export."""
+import datetime
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_page, decode_cursor, encode_cursor
+from ..models import Question
+
+
+@override_settings(POLLS_ARCHIVE_PAGE_SIZE=2)
+class ArchiveTests(TestCase):
+    """Test for the keyset paginated archive."""
+
+    def setUp(self):
+        """Create published questions, two of them at the same time."""
+        now = timezone.now()
+        same_time = now - datetime.timedelta(days=2)
+        self.questions = [
+            Question.objects.create(question_text="newest",
+                                    pub_date=now - datetime.timedelta(days=1)),
+            Question.objects.create(question_text="tied 1",
+                                    pub_date=same_time),
+            Question.objects.create(question_text="tied 2",
+                                    pub_date=same_time),
+            Question.objects.create(question_text="oldest",
+                                    pub_date=now - datetime.timedelta(days=3)),
+        ]
+        Question.objects.create(question_text="future",
+                                pub_date=now + datetime.timedelta(days=1))
+
+    def test_pages_cover_every_published_question(self):
+        """Following the cursors lists each question once, newest first."""
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = archive_page(cursor, size=1)
+            seen.extend(page)
+            if cursor is None:
+                break
+        newest, tied1, tied2, oldest = self.questions
+        self.assertEqual([newest, tied2, tied1, oldest], seen)
+
+    def test_cursor_round_trip(self):
+        """A cursor decodes to the position of its question."""
+        question = self.questions[1]
+        self.assertEqual((question.pub_date, question.pk),
+                         decode_cursor(encode_cursor(question)))
+
+    def test_page_is_one_query(self):
+        """Any page of the archive costs a single query."""
+        _, cursor = archive_page(size=2)
+        with self.assertNumQueries(1):
+            archive_page(cursor, size=2)
+
+    def test_api_follows_next_link(self):
+        """The JSON API links to the next page until the last one."""
+        response = self.client.get(reverse('polls:archive_api'))
+        data = response.json()
+        self.assertEqual(2, len(data['questions']))
+        data = self.client.get(data['next']).json()
+        self.assertEqual(["tied 1", "oldest"],
+                         [question['question_text']
+                          for question in data['questions']])
+        self.assertIsNone(data['next'])
+
+    def test_invalid_cursor(self):
+        """A malformed cursor is a bad request."""
+        response = self.client.get(reverse('polls:archive_api'),
+                                   {'cursor': 'nonsense'})
+        self.assertEqual(400, response.status_code)
+
+    def test_archive_page(self):
+        """The archive page links to the older questions."""
+        response = self.client.get(reverse('polls:archive'))
+        self.assertContains(response, "newest")
+        self.assertNotContains(response, "future")
+        self.assertIsNotNone(response.context['next_cursor'])
+
+
+class ExportTests(TestCase):
+    """Test for the streaming JSON export."""
+
+    def test_export_streams_every_question(self):
+        """The export is a JSON array of the questions and tallies."""
+        question = Question.objects.create(question_text="exported",
+                                           pub_date=timezone.now())
+        choice = question.choice_set.create(choice_text='one')
+        choice.vote_count = 3
+        choice.save()
+        response = self.client.get(reverse('polls:export'))
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(1, len(data))
+        self.assertEqual(3, data[0]['total'])
+        self.assertEqual('one', data[0]['choices'][0]['choice_text'])
+
+    def test_future_question_not_exported(self):
+        """Questions that are not published yet are left out."""
+        Question.objects.create(
+            question_text="future",
+            pub_date=timezone.now() + datetime.timedelta(days=1))
+        response = self.client.get(reverse('polls:export'))
+        self.assertEqual([], json.loads(b''.join(
+            response.streaming_content)))
+
+    def test_empty_export(self):
+        """Without questions the export is an empty array."""
+        response = self.client.get(reverse('polls:export'))
+        self.assertEqual([], json.loads(b''.join(
+            response.streaming_content)))
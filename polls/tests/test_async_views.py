@@ -0,0 +1,78 @@
+"""Test for the async views of Polls app."""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+
+from .. import async_views, views
+from ..models import Vote
+from .test_view import create_question
+
+urlpatterns = [
+    path('polls/', include(([
+        path('', async_views.IndexView.as_view(), name='index'),
+        path('archive/', views.ArchiveView.as_view(), name='archive'),
+        path('<int:pk>/', async_views.DetailView.as_view(), name='detail'),
+        path('<int:pk>/results/', async_views.ResultsView.as_view(),
+             name='results'),
+        path('<int:pk>/results/stream/', async_views.results_stream,
+             name='results_stream'),
+        path('<int:question_id>/vote/', async_views.vote, name='vote'),
+        path('ballots/<str:ticket>/', views.ballot_status,
+             name='ballot_status'),
+    ], 'polls'))),
+    path('accounts/', include('django.contrib.auth.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(TestCase):
+    """Test the async views through the async test client."""
+
+    def setUp(self):
+        """Create an open question with a choice and a voter."""
+        self.question = create_question("async", days=-1)
+        self.choice = self.question.choice_set.create(choice_text='one')
+        User.objects.create_user(username="voter", password="123")
+
+    async def test_index(self):
+        """The index lists the published questions."""
+        await sync_to_async(create_question)("future", days=5)
+        response = await self.async_client.get(reverse('polls:index'))
+        self.assertEqual([self.question],
+                         response.context['latest_question_list'])
+
+    async def test_detail_closed_question_redirects(self):
+        """A closed question redirects to the index page."""
+        closed = await sync_to_async(create_question)(
+            "closed", days=-5, end_day=-1)
+        response = await self.async_client.get(
+            reverse('polls:detail', args=(closed.id,)))
+        self.assertRedirects(response, reverse('polls:index'),
+                             fetch_redirect_response=False)
+
+    async def test_vote_and_results(self):
+        """A vote cast through the async view shows in the results."""
+        await sync_to_async(self.async_client.login)(username="voter",
+                                                     password="123")
+        response = await self.async_client.post(
+            reverse('polls:vote', args=(self.question.id,)),
+            {'choice': self.choice.id})
+        self.assertRedirects(response, reverse('polls:results',
+                                               args=(self.question.id,)),
+                             fetch_redirect_response=False)
+        self.assertEqual(1, await Vote.objects.acount())
+        response = await self.async_client.get(
+            reverse('polls:results', args=(self.question.id,)))
+        self.assertEqual(1, response.context['results']['total'])
+        response = await self.async_client.get(
+            reverse('polls:detail', args=(self.question.id,)))
+        self.assertEqual(self.choice.id, response.context['existed_vote'])
+
+    async def test_vote_requires_login(self):
+        """Anonymous voters are sent to the login page."""
+        response = await self.async_client.post(
+            reverse('polls:vote', args=(self.question.id,)),
+            {'choice': self.choice.id})
+        self.assertEqual(302, response.status_code)
+        self.assertIn(reverse('login'), response.url)
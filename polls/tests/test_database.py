@@ -0,0 +1,44 @@
+"""Test for the database profiles."""
+import os
+import runpy
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase
+
+
+class DatabaseProfileTests(TestCase):
+    """Test for the DATABASE_PROFILE setting and the SQLite PRAGMAs."""
+
+    def test_unknown_profile(self):
+        """An unknown profile names the valid ones."""
+        path = os.path.join(settings.BASE_DIR, 'mysite', 'settings.py')
+        with mock.patch.dict(os.environ, DATABASE_PROFILE='postgres'), \
+                self.assertRaisesMessage(
+                    ImproperlyConfigured,
+                    "Unknown DATABASE_PROFILE 'postgres', expected one of "
+                    "sqlite, postgresql"):
+            runpy.run_path(path)
+
+    def test_sqlite_pragmas(self):
+        """A new connection to a database file gets SQLITE_PRAGMAS."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict,
+             'NAME': os.path.join(directory.name, 'pragmas.sqlite3')},
+            alias='pragmas')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            pragmas = {}
+            for pragma in ['journal_mode', 'synchronous', 'mmap_size']:
+                cursor.execute(f'PRAGMA {pragma}')
+                pragmas[pragma] = cursor.fetchone()[0]
+        # synchronous is reported as a number, 1 being NORMAL.
+        self.assertEqual({'journal_mode': 'wal', 'synchronous': 1,
+                          'mmap_size': settings.SQLITE_PRAGMAS['mmap_size']},
+                         pragmas)
@@ -0,0 +1,144 @@
+"""Test for the bulk fixture import."""
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from ..fixture_import import FixtureError, FixtureImporter, read_objects
+from ..models import Choice, Question, Vote, VoteRollup
+
+DATA_DIR = Path(settings.BASE_DIR) / 'data'
+
+
+class FixtureImportTests(TestCase):
+    """Test for the import_fixtures command."""
+
+    def setUp(self):
+        """Create a directory for the fixtures of a test."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write_ndjson(self, objects):
+        """Write objects as an NDJSON fixture and return its path."""
+        path = self.directory / 'fixture.ndjson'
+        path.write_text(''.join(json.dumps(item) + '\n' for item in objects))
+        return str(path)
+
+    def test_shipped_fixtures(self):
+        """The fixtures of the repository import like with loaddata."""
+        call_command('import_fixtures', str(DATA_DIR / 'polls.json'),
+                     str(DATA_DIR / 'users.json'), stdout=StringIO())
+        self.assertEqual(3, Question.objects.count())
+        self.assertEqual(11, Choice.objects.count())
+        self.assertEqual(4, Vote.objects.count())
+        self.assertEqual(3, User.objects.count())
+        self.assertEqual(1, Choice.objects.get(pk=7).votes)
+        self.assertEqual(4, VoteRollup.objects.aggregate(
+            total=Sum('delta'))['total'])
+
+    def test_json_array_read_in_pieces(self):
+        """Objects split across read pieces are decoded whole."""
+        with mock.patch('polls.fixture_import.READ_SIZE', 7):
+            objects = list(read_objects(DATA_DIR / 'polls.json'))
+        self.assertEqual(18, len(objects))
+        self.assertEqual('polls.question', objects[0][1]['model'])
+
+    def test_ndjson_with_raw_passwords(self):
+        """Raw passwords are hashed and votes get their question."""
+        path = self.write_ndjson([
+            {'model': 'auth.user', 'pk': 10,
+             'fields': {'username': 'loader', 'password': 'secret'}},
+            {'model': 'polls.question', 'pk': 20,
+             'fields': {'question_text': 'Bulk?',
+                        'pub_date': '2023-01-01T00:00:00Z'}},
+            {'model': 'polls.choice', 'pk': 30,
+             'fields': {'question': 20, 'choice_text': 'Yes'}},
+            {'model': 'polls.vote', 'pk': 40,
+             'fields': {'user': 10, 'choice': 30}},
+        ])
+        report = FixtureImporter(workers=1).load([path])
+        self.assertEqual(1, report['polls.vote'])
+        self.assertTrue(User.objects.get(pk=10).check_password('secret'))
+        self.assertEqual(20, Vote.objects.get(pk=40).question_id)
+        self.assertEqual(1, Choice.objects.get(pk=30).votes)
+
+    def test_invalid_object_imports_nothing(self):
+        """A single invalid object rolls back the whole import."""
+        path = self.write_ndjson([
+            {'model': 'polls.question', 'pk': 1,
+             'fields': {'question_text': 'Fine',
+                        'pub_date': '2023-01-01T00:00:00Z'}},
+            {'model': 'polls.question', 'pk': 2,
+             'fields': {'question_text': 'Broken', 'pub_date': 'soon'}},
+        ])
+        with self.assertRaisesMessage(CommandError, 'fixture.ndjson:2'):
+            call_command('import_fixtures', path, batch_size=1,
+                         stdout=StringIO())
+        self.assertFalse(Question.objects.exists())
+
+    def test_only_imported_questions_invalidated(self):
+        """The caches of questions the import did not touch are kept."""
+        Question.objects.create(question_text='Untouched',
+                                pub_date='2023-01-01T00:00:00Z')
+        path = self.write_ndjson([
+            {'model': 'polls.question', 'pk': 20,
+             'fields': {'question_text': 'New',
+                        'pub_date': '2023-01-01T00:00:00Z'}},
+            {'model': 'polls.choice', 'pk': 30,
+             'fields': {'question': 20, 'choice_text': 'Yes'}},
+        ])
+        with mock.patch('polls.fixture_import.invalidate_results') \
+                as results, \
+                mock.patch('polls.fixture_import.invalidate_index') as index:
+            FixtureImporter(batch_size=1).load([path])
+        results.assert_called_once_with(20)
+        index.assert_called_once_with()
+
+    def test_vote_on_other_question_is_rejected(self):
+        """A vote must be on the question of its choice."""
+        path = self.write_ndjson([
+            {'model': 'auth.user', 'pk': 10,
+             'fields': {'username': 'loader', 'password': '!'}},
+            *[{'model': 'polls.question', 'pk': pk,
+               'fields': {'question_text': f'Q{pk}',
+                          'pub_date': '2023-01-01T00:00:00Z'}}
+              for pk in [20, 21]],
+            {'model': 'polls.vote', 'pk': 40,
+             'fields': {'user': 10, 'question': 20, 'choice': 30}},
+            {'model': 'polls.choice', 'pk': 30,
+             'fields': {'question': 21, 'choice_text': 'Yes'}},
+        ])
+        with self.assertRaisesMessage(
+                FixtureError, "Vote 40 is on question 20 but its choice 30 "
+                              "belongs to question 21"):
+            FixtureImporter().load([path])
+        self.assertFalse(Vote.objects.exists())
+
+    def test_only_imported_tallies_recounted(self):
+        """The tallies of other questions are left as they are."""
+        other = Question.objects.create(question_text='Other',
+                                        pub_date='2023-01-01T00:00:00Z')
+        drifted = other.choice_set.create(choice_text='Drifted')
+        Choice.objects.filter(pk=drifted.pk).update(vote_count=5)
+        path = self.write_ndjson([
+            {'model': 'auth.user', 'pk': 10,
+             'fields': {'username': 'loader', 'password': '!'}},
+            {'model': 'polls.question', 'pk': 20,
+             'fields': {'question_text': 'New',
+                        'pub_date': '2023-01-01T00:00:00Z'}},
+            {'model': 'polls.choice', 'pk': 30,
+             'fields': {'question': 20, 'choice_text': 'Yes'}},
+            {'model': 'polls.vote', 'pk': 40,
+             'fields': {'user': 10, 'choice': 30}},
+        ])
+        FixtureImporter().load([path])
+        self.assertEqual(5, Choice.objects.get(pk=drifted.pk).vote_count)
+        self.assertEqual(1, Choice.objects.get(pk=30).vote_count)
@@ -0,0 +1,147 @@
+"""Test for batched vote ingestion."""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import ingest
+from ..ingest import PENDING, REJECTED, WRITTEN, BallotQueue
+from ..models import Choice, Vote
+from .test_view import create_question
+
+
+class BallotQueueTests(TestCase):
+    """Test for BallotQueue."""
+
+    def setUp(self):
+        """Create a question with two choices, a voter and a queue."""
+        self.question = create_question("batched", days=-1)
+        self.choice1 = self.question.choice_set.create(choice_text='one')
+        self.choice2 = self.question.choice_set.create(choice_text='two')
+        self.user = User.objects.create_user(username="voter",
+                                             password="123")
+        self.queue = BallotQueue(batch_size=10, flush_interval=None)
+
+    def tallies(self):
+        """Return the stored tallies of both choices."""
+        return list(Choice.objects.order_by('pk')
+                    .values_list('vote_count', flat=True))
+
+    def test_ballot_is_written_on_flush(self):
+        """A queued ballot is pending until the queue is flushed."""
+        ticket = self.queue.submit(self.user.id, self.question.id,
+                                   self.choice1.id)
+        self.assertEqual(PENDING, self.queue.status(ticket, self.user.id))
+        self.assertEqual(0, Vote.objects.count())
+        self.assertEqual(1, self.queue.flush())
+        self.assertEqual(WRITTEN, self.queue.status(ticket, self.user.id))
+        self.assertEqual([1, 0], self.tallies())
+
+    def test_later_ballot_replaces_queued_one(self):
+        """Only the last queued ballot of a user is written."""
+        first = self.queue.submit(self.user.id, self.question.id,
+                                  self.choice1.id)
+        self.queue.submit(self.user.id, self.question.id, self.choice2.id)
+        self.queue.flush()
+        self.assertEqual(REJECTED, self.queue.status(first, self.user.id))
+        self.assertEqual(self.choice2, Vote.objects.get().choice)
+
+    def test_changed_vote_moves_tally(self):
+        """A flushed ballot replaces the vote the user already cast."""
+        Vote.objects.create(user=self.user, choice=self.choice1)
+        self.queue.submit(self.user.id, self.question.id, self.choice2.id)
+        self.queue.flush()
+        self.assertEqual(1, Vote.objects.count())
+        self.assertEqual([0, 1], self.tallies())
+
+    def test_choice_of_other_question_is_rejected(self):
+        """A ballot naming a choice of another question is not written."""
+        other = create_question("other", days=-1)
+        ticket = self.queue.submit(self.user.id, other.id, self.choice1.id)
+        self.assertEqual(0, self.queue.flush())
+        self.assertEqual(REJECTED, self.queue.status(ticket, self.user.id))
+
+    def test_full_queue_flushes(self):
+        """Reaching the batch size writes the queue right away."""
+        queue = BallotQueue(batch_size=1, flush_interval=None)
+        queue.submit(self.user.id, self.question.id, self.choice1.id)
+        self.assertEqual(1, Vote.objects.count())
+
+    def test_vote_cast_during_flush(self):
+        """A vote inserted after the read is replaced and uncounted."""
+        insert = ingest._insert_votes
+
+        def racing_insert(ballots, now):
+            Vote.objects.create(user=self.user, choice=self.choice1)
+            return insert(ballots, now)
+
+        self.queue.submit(self.user.id, self.question.id, self.choice2.id)
+        with mock.patch('polls.ingest._insert_votes', racing_insert):
+            self.assertEqual(1, self.queue.flush())
+        self.assertEqual(self.choice2, Vote.objects.get().choice)
+        self.assertEqual([0, 1], self.tallies())
+
+    def test_failed_flush_on_submit_keeps_ballots(self):
+        """A failing size flush is logged and the ballot stays pending."""
+        queue = BallotQueue(batch_size=1, flush_interval=None)
+        with mock.patch('polls.ingest.write_ballots',
+                        side_effect=OperationalError("locked")), \
+                self.assertLogs('polls.ingest', 'ERROR'):
+            ticket = queue.submit(self.user.id, self.question.id,
+                                  self.choice1.id)
+        self.assertEqual(PENDING, queue.status(ticket, self.user.id))
+        self.assertEqual(1, queue.flush())
+        self.assertEqual(WRITTEN, queue.status(ticket, self.user.id))
+
+    def test_status_of_other_user(self):
+        """The status of a ticket is only reported to its owner."""
+        ticket = self.queue.submit(self.user.id, self.question.id,
+                                   self.choice1.id)
+        self.assertIsNone(self.queue.status(ticket, self.user.id + 1))
+
+
+class BallotViewTests(TestCase):
+    """Test for the ballot endpoints."""
+
+    def setUp(self):
+        """Log in a voter and give the views a queue of their own."""
+        self.question = create_question("batched", days=-1)
+        self.choice = self.question.choice_set.create(choice_text='one')
+        User.objects.create_user(username="voter", password="123")
+        self.client.login(username="voter", password="123")
+        self.queue = BallotQueue(flush_interval=None)
+        patcher = mock.patch('polls.views.get_ballot_queue',
+                             return_value=self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_submit_and_confirm(self):
+        """A ballot is acknowledged and its write can be confirmed."""
+        response = self.client.post(
+            reverse('polls:ballot', args=(self.question.id,)),
+            {'choice': self.choice.id})
+        self.assertEqual(202, response.status_code)
+        status_url = response.json()['status_url']
+        self.assertEqual(PENDING, self.client.get(status_url).json()['status'])
+        self.queue.flush()
+        self.assertEqual(WRITTEN, self.client.get(status_url).json()['status'])
+
+    def test_missing_choice(self):
+        """A ballot without a choice is refused."""
+        response = self.client.post(
+            reverse('polls:ballot', args=(self.question.id,)))
+        self.assertEqual(400, response.status_code)
+
+    def test_batched_vote_form(self):
+        """The vote form queues the ballot when batching is enabled."""
+        with self.settings(POLLS_BATCHED_VOTES=True):
+            response = self.client.post(
+                reverse('polls:vote', args=(self.question.id,)),
+                {'choice': self.choice.id})
+        self.assertRedirects(response, reverse('polls:results',
+                                               args=(self.question.id,)))
+        self.assertEqual(0, Vote.objects.count())
+        self.queue.flush()
+        self.assertEqual(1, Vote.objects.count())
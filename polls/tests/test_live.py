@@ -0,0 +1,135 @@
+"""Test for live results streaming."""
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..live import ResultsPublisher, tally_delta
+from ..models import Choice
+from ..results import invalidate_results
+from .test_view import create_question
+
+
+def add_vote(choice):
+    """Count one more vote for `choice` and invalidate its results."""
+    Choice.objects.filter(pk=choice.pk).update(
+        vote_count=choice.vote_count + 1)
+    choice.vote_count += 1
+    invalidate_results(choice.question_id)
+
+
+class TallyDeltaTests(TestCase):
+    """Test for tally_delta."""
+
+    def results(self, *votes):
+        """Build results with the given vote counts."""
+        return {'question_text': 'q', 'total': sum(votes),
+                'choices': [{'id': number, 'votes': count}
+                            for number, count in enumerate(votes)]}
+
+    def test_only_changed_choices(self):
+        """Only the choices whose count changed are in the delta."""
+        delta = tally_delta(self.results(1, 2), self.results(1, 3))
+        self.assertEqual({'total': 4, 'choices': {1: 3}}, delta)
+
+    def test_no_change(self):
+        """Unchanged results give no delta."""
+        self.assertIsNone(tally_delta(self.results(1), self.results(1)))
+
+
+class ResultsPublisherTests(TestCase):
+    """Test for ResultsPublisher."""
+
+    def setUp(self):
+        """Create a question with two choices."""
+        self.question = create_question("live", days=-1)
+        self.choice1 = self.question.choice_set.create(choice_text='one')
+        self.choice2 = self.question.choice_set.create(choice_text='two')
+
+    async def test_updates_are_coalesced(self):
+        """Several changes within the interval reach viewers as one delta."""
+        publisher = ResultsPublisher(max_updates_per_second=20)
+        queue1, snapshot = await publisher.subscribe(self.question.id)
+        queue2, _ = await publisher.subscribe(self.question.id)
+        self.assertEqual(0, snapshot['total'])
+        await sync_to_async(add_vote)(self.choice1)
+        publisher.notify(self.question.id)
+        await asyncio.sleep(0.01)
+        await sync_to_async(add_vote)(self.choice2)
+        publisher.notify(self.question.id)
+        await sync_to_async(add_vote)(self.choice2)
+        publisher.notify(self.question.id)
+        first = await asyncio.wait_for(queue1.get(), 1)
+        second = await asyncio.wait_for(queue1.get(), 1)
+        self.assertEqual(('delta', {'total': 1, 'choices': {
+            self.choice1.id: 1}}), first)
+        self.assertEqual(('delta', {'total': 3, 'choices': {
+            self.choice2.id: 2}}), second)
+        self.assertTrue(queue1.empty())
+        self.assertEqual(2, queue2.qsize())
+
+    async def test_subscribers_on_other_loops_are_kept(self):
+        """Viewers on two event loops both receive the updates."""
+        results = {'question_text': 'live', 'total': 0,
+                   'choices': [{'id': 1, 'votes': 0}]}
+
+        async def current_results(question_id):
+            return results
+
+        publisher = ResultsPublisher(max_updates_per_second=20)
+        subscribed = threading.Event()
+        received = []
+
+        async def other_viewer():
+            queue, _ = await publisher.subscribe(self.question.id)
+            subscribed.set()
+            received.append(await asyncio.wait_for(queue.get(), 2))
+
+        with mock.patch('polls.live.aget_results', current_results):
+            thread = threading.Thread(target=asyncio.run,
+                                      args=(other_viewer(),))
+            thread.start()
+            await sync_to_async(subscribed.wait)(2)
+            queue, _ = await publisher.subscribe(self.question.id)
+            results = {'question_text': 'live', 'total': 1,
+                       'choices': [{'id': 1, 'votes': 1}]}
+            publisher.notify(self.question.id)
+            event = await asyncio.wait_for(queue.get(), 2)
+            await sync_to_async(thread.join)(2)
+        self.assertEqual(('delta', {'total': 1, 'choices': {1: 1}}), event)
+        self.assertEqual([event], received)
+
+    async def test_missing_question(self):
+        """Subscribing to a question that does not exist fails."""
+        publisher = ResultsPublisher()
+        self.assertEqual((None, None), await publisher.subscribe(999))
+
+    async def test_stream_needs_live_results(self):
+        """Without POLLS_LIVE_RESULTS there is no stream to open."""
+        url = reverse('polls:results', args=(self.question.id,))
+        self.assertNotContains(await self.async_client.get(url),
+                               'EventSource')
+        response = await self.async_client.get(
+            reverse('polls:results_stream', args=(self.question.id,)))
+        self.assertEqual(404, response.status_code)
+        with self.settings(POLLS_LIVE_RESULTS=True):
+            self.assertContains(await self.async_client.get(url),
+                                'EventSource')
+
+    @override_settings(POLLS_LIVE_RESULTS=True)
+    async def test_stream_starts_with_snapshot(self):
+        """The stream endpoint first sends the full results."""
+        response = await self.async_client.get(
+            reverse('polls:results_stream', args=(self.question.id,)))
+        self.assertEqual('text/event-stream', response['Content-Type'])
+        content = response.streaming_content
+        event = (await content.__anext__()).decode()
+        await content.aclose()
+        kind, data = event.strip().split('\n')
+        self.assertEqual('event: snapshot', kind)
+        self.assertEqual('live', json.loads(data[len('data: '):])[
+            'question_text'])
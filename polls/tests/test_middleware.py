@@ -0,0 +1,80 @@
+"""Test for the query timing middleware."""
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from ..middleware import (UNRESOLVED, QueryRecorder, QueryTimingMiddleware,
+                          timings)
+from ..models import Choice
+from .test_view import create_question
+
+
+class QueryTimingMiddlewareTests(TestCase):
+    """Test for QueryTimingMiddleware."""
+
+    def setUp(self):
+        """Start from an empty timing window."""
+        timings.clear()
+
+    def test_server_timing_header(self):
+        """Responses report their wall time, DB time and query count."""
+        response = self.client.get(reverse('polls:index'))
+        header = response['Server-Timing']
+        self.assertIn('total;dur=', header)
+        self.assertIn('db;dur=', header)
+        self.assertRegex(header, r'desc="\d+ queries"')
+
+    def test_timings_per_url_name(self):
+        """Requests are recorded under their URL name."""
+        question = create_question("timed", days=-1)
+        for _ in range(3):
+            self.client.get(reverse('polls:results', args=(question.id,)))
+        report = timings.snapshot()
+        self.assertEqual(3, report['polls:results']['requests'])
+        self.assertLessEqual(report['polls:results']['p50_ms'],
+                             report['polls:results']['p99_ms'])
+
+    async def test_async_chain(self):
+        """Under an async chain the middleware is a coroutine function."""
+        async def view(request):
+            await Choice.objects.acount()
+            return HttpResponse()
+
+        middleware = QueryTimingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get('/polls/'))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertEqual(1, timings.snapshot()[UNRESOLVED]['requests'])
+
+    def test_unresolved_paths_share_a_bucket(self):
+        """Unknown paths do not each add a timing window."""
+        for number in range(5):
+            self.client.get(f'/missing/{number}/')
+        report = timings.snapshot()
+        self.assertEqual([UNRESOLVED], list(report))
+        self.assertEqual(5, report[UNRESOLVED]['requests'])
+
+    def test_metrics_for_staff(self):
+        """Staff members can read the percentiles of each view."""
+        User.objects.create_user(username="staff", password="123",
+                                 is_staff=True)
+        self.client.login(username="staff", password="123")
+        self.client.get(reverse('polls:index'))
+        report = self.client.get(reverse('polls:metrics')).json()
+        self.assertEqual(1, report['timings']['polls:index']['requests'])
+
+    def test_repeated_query_is_flagged(self):
+        """The same SQL run in a loop is reported as a possible N+1."""
+        question = create_question("loop", days=-1)
+        choices = [question.choice_set.create(choice_text=str(number))
+                   for number in range(6)]
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for choice in choices:
+                Choice.objects.get(pk=choice.pk)
+        repeated = recorder.repeated(5)
+        self.assertEqual([6], list(repeated.values()))
+        self.assertEqual(6, recorder.count)
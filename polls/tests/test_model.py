@@ -1,10 +1,16 @@
 """Test for Poll's model."""
 import datetime
+from io import StringIO
 
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
 
-from ..models import Question
+from ..models import Choice, Question, Vote
 
 
 def create_question(question_text, days, end_day=None):
@@ -126,3 +132,100 @@ class Question_can_vote_and_is_published_test(TestCase):
                                    end_day=5)
         self.assertIs(True, question.is_published())
         self.assertIs(True, question.can_vote())
+
+
+class QuestionVotingWindowQuerySetTests(TestCase):
+    """Test for the open, closed and upcoming question filters."""
+
+    def setUp(self):
+        """Create a question in every state of the voting window."""
+        self.upcoming = create_question("upcoming", days=5)
+        self.closed = create_question("closed", days=-5, end_day=-1)
+        self.open = create_question("open", days=-5, end_day=5)
+        self.open_ended = create_question("open ended", days=-1)
+
+    def test_filters_match_can_vote(self):
+        """The open filter selects exactly the questions that can vote."""
+        open_questions = {question for question in Question.objects.all()
+                          if question.can_vote()}
+        self.assertEqual(open_questions, set(Question.objects.open()))
+
+    def test_states(self):
+        """Every question falls in exactly one state."""
+        self.assertEqual([self.open, self.open_ended],
+                         list(Question.objects.open().order_by('pk')))
+        self.assertEqual([self.closed], list(Question.objects.closed()))
+        self.assertEqual([self.upcoming], list(Question.objects.upcoming()))
+
+    def test_filters_run_in_one_query(self):
+        """Listing the open questions is a single query."""
+        with self.assertNumQueries(1):
+            list(Question.objects.open())
+
+
+class ChoiceVoteCountTests(TestCase):
+    """Test for the stored vote tally of Choice."""
+
+    def setUp(self):
+        """Create a question with two choices and a voter."""
+        self.question = create_question("tally", days=-1)
+        self.choice1 = self.question.choice_set.create(choice_text='one')
+        self.choice2 = self.question.choice_set.create(choice_text='two')
+        self.user = User.objects.create_user(username="voter",
+                                             password="123")
+
+    def vote(self, choice):
+        """Cast a vote for `choice` as the logged in user."""
+        self.client.login(username="voter", password="123")
+        self.client.post(reverse('polls:vote', args=(self.question.id,)),
+                         {'choice': choice.id})
+
+    def test_vote_is_counted(self):
+        """A new vote adds one to the tally of its choice."""
+        self.vote(self.choice1)
+        self.choice1.refresh_from_db()
+        self.assertEqual(1, self.choice1.votes)
+
+    def test_changed_vote_moves_count(self):
+        """Changing a vote moves the count from the old to the new choice."""
+        self.vote(self.choice1)
+        self.vote(self.choice2)
+        self.choice1.refresh_from_db()
+        self.choice2.refresh_from_db()
+        self.assertEqual(0, self.choice1.votes)
+        self.assertEqual(1, self.choice2.votes)
+
+    def test_same_vote_twice(self):
+        """Voting for the same choice again does not change the count."""
+        self.vote(self.choice1)
+        self.vote(self.choice1)
+        self.choice1.refresh_from_db()
+        self.assertEqual(1, self.choice1.votes)
+
+    def test_cascade_delete_uncounts_vote(self):
+        """Deleting the voter removes their vote from the tally."""
+        self.vote(self.choice1)
+        self.user.delete()
+        self.choice1.refresh_from_db()
+        self.assertEqual(0, self.choice1.votes)
+
+    def test_deleting_question_skips_tallies(self):
+        """Votes deleted with their question are not uncounted one by one."""
+        for number in range(20):
+            user = User.objects.create_user(username=f"voter{number}")
+            Vote.objects.create(user=user, choice=self.choice1)
+        with CaptureQueriesContext(connection) as captured:
+            self.question.delete()
+        self.assertFalse([query for query in captured
+                          if query['sql'].startswith('UPDATE')])
+        self.assertFalse(Vote.objects.exists())
+
+    def test_rebuild_vote_counts(self):
+        """The rebuild command repairs a drifted tally."""
+        Vote.objects.create(user=self.user, choice=self.choice2)
+        Choice.objects.update(vote_count=7)
+        call_command('rebuild_vote_counts', stdout=StringIO())
+        self.choice1.refresh_from_db()
+        self.choice2.refresh_from_db()
+        self.assertEqual(0, self.choice1.votes)
+        self.assertEqual(1, self.choice2.votes)
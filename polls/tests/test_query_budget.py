@@ -0,0 +1,179 @@
+"""Query budgets of every polls URL.
+
+Each page is requested on datasets of growing size and has to stay
+within its budget with the same number of queries every time, so a
+query run per question, choice or vote fails the test. The results
+stream is long-lived and covered by test_async_views.
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Vote
+from .budget import query_budget
+from .test_view import create_question
+
+# Extra questions, choices and voters added before each measurement.
+GROWTH = [1, 10, 40]
+
+# Generous wall time per request, only meant to catch pathological cases.
+MS = 1000
+
+
+class QueryBudgetTests(TestCase):
+    """Test that every polls URL runs a constant number of queries."""
+
+    def setUp(self):
+        """Create the question under test, a voter and a staff member."""
+        self.question = create_question("budget", days=-1)
+        self.choices = [self.question.choice_set.create(choice_text=str(n))
+                        for n in range(4)]
+        self.voter = User.objects.create_user(username="voter",
+                                              password="123")
+        self.staff = User.objects.create_user(username="staff",
+                                              password="123", is_staff=True)
+        self.users = 0
+
+    def grow(self, size):
+        """Add `size` questions with choices and votes of new users."""
+        for _ in range(size):
+            question = create_question(f"filler {self.users}", days=-2)
+            choice = question.choice_set.create(choice_text='filler')
+            question.choice_set.create(choice_text='other')
+            user = User.objects.create_user(username=f"user{self.users}")
+            self.users += 1
+            Vote.objects.create(user=user, choice=choice)
+            Vote.objects.create(user=user,
+                                choice=self.choices[self.users % 4])
+
+    def assertConstantQueries(self, queries, request, login=None,
+                              prepare=None):
+        """Check the budget of a request on every dataset size.
+
+        :param queries: most queries the request may run
+        :param request: function making the request with the test client
+        :param login: user to log in as, anonymous if None
+        :param prepare: function run before each measured request
+        """
+        if login is not None:
+            self.client.force_login(login)
+        counts = []
+        for size in GROWTH:
+            self.grow(size)
+            if prepare is not None:
+                prepare()
+            for cache in caches.all():
+                cache.clear()
+            with query_budget(queries, ms=MS) as budget:
+                response = request()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400)
+            counts.append(len(budget.captured))
+        self.assertEqual(len(set(counts)), 1,
+                         f"Queries grew with the data: {counts}")
+
+    def test_index(self):
+        """The anonymous index lists the questions in one query.
+
+        Caching the page adds the lookups of the next opening and closing.
+        """
+        self.assertConstantQueries(
+            3, lambda: self.client.get(reverse('polls:index')))
+
+    def test_index_logged_in(self):
+        """A logged in user adds the session, user and history queries."""
+        self.assertConstantQueries(
+            4, lambda: self.client.get(reverse('polls:index')),
+            login=self.voter)
+
+    def test_archive(self):
+        """An archive page is a single query."""
+        self.assertConstantQueries(
+            1, lambda: self.client.get(reverse('polls:archive')))
+
+    def test_archive_api(self):
+        """An archive API page is a single query."""
+        self.assertConstantQueries(
+            1, lambda: self.client.get(reverse('polls:archive_api')))
+
+    def test_export(self):
+        """The export reads the questions and their choices."""
+        self.assertConstantQueries(
+            2, lambda: self.client.get(reverse('polls:export')))
+
+    def test_export_votes(self):
+        """The vote export reads the votes in one query."""
+        self.assertConstantQueries(
+            3, lambda: self.client.get(reverse('polls:export_votes')),
+            login=self.staff)
+
+    def test_detail(self):
+        """The detail page loads the question and its choices."""
+        url = reverse('polls:detail', args=(self.question.id,))
+        self.assertConstantQueries(2, lambda: self.client.get(url))
+
+    def test_detail_logged_in(self):
+        """The user's votes are loaded in one query."""
+        url = reverse('polls:detail', args=(self.question.id,))
+        self.assertConstantQueries(5, lambda: self.client.get(url),
+                                   login=self.voter)
+
+    def test_results(self):
+        """The results read the question and the stored tallies."""
+        url = reverse('polls:results', args=(self.question.id,))
+        self.assertConstantQueries(2, lambda: self.client.get(url))
+
+    def test_trend(self):
+        """The trend reads the question, its rollups and its choices."""
+        url = reverse('polls:trend', args=(self.question.id,))
+        self.assertConstantQueries(3, lambda: self.client.get(url))
+
+    def test_vote(self):
+        """A first vote costs the same however many votes exist."""
+        url = reverse('polls:vote', args=(self.question.id,))
+        self.assertConstantQueries(
+            8, lambda: self.client.post(url, {'choice': self.choices[0].id}),
+            login=self.voter,
+            prepare=lambda: Vote.objects.filter(user=self.voter).delete())
+
+    def test_ballot(self):
+        """Queuing a ballot does not touch the polls tables."""
+        url = reverse('polls:ballot', args=(self.question.id,))
+        with mock.patch('polls.views.get_ballot_queue') as queue:
+            queue.return_value.submit.return_value = 'ticket'
+            self.assertConstantQueries(
+                2, lambda: self.client.post(
+                    url, {'choice': self.choices[0].id}),
+                login=self.voter)
+
+    def test_ballot_status(self):
+        """Checking a ballot does not touch the polls tables."""
+        url = reverse('polls:ballot_status', args=('ticket',))
+        with mock.patch('polls.views.get_ballot_queue') as queue:
+            queue.return_value.status.return_value = 'pending'
+            self.assertConstantQueries(2, lambda: self.client.get(url),
+                                       login=self.voter)
+
+
+class QueryBudgetUtilityTests(TestCase):
+    """Test for the query budget helper itself."""
+
+    def test_lists_offending_queries(self):
+        """Going over the budget fails with the queries that ran."""
+        question = create_question("n+1", days=-1)
+        for number in range(3):
+            question.choice_set.create(choice_text=str(number))
+        with self.assertRaisesMessage(AssertionError, "over the budget of 1"):
+            with query_budget(1):
+                for choice in question.choice_set.all():
+                    Vote.objects.filter(choice=choice).count()
+
+
+def test_budget_fixture(budget, db):
+    """The pytest fixture gives the same budget helper."""
+    with budget(1, ms=MS):
+        User.objects.count()
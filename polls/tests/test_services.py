@@ -0,0 +1,104 @@
+"""Test for the vote casting service."""
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Choice, Vote
+from ..services import cast_vote
+from .test_view import create_question
+
+
+def statements(queries):
+    """Return the captured statements, leaving out savepoints."""
+    return [query['sql'] for query in queries.captured_queries
+            if 'SAVEPOINT' not in query['sql']]
+
+
+class CastVoteTests(TestCase):
+    """Test for cast_vote."""
+
+    def setUp(self):
+        """Create a question with two choices and a voter."""
+        self.question = create_question("service", days=-1)
+        self.choice1 = self.question.choice_set.create(choice_text='one')
+        self.choice2 = self.question.choice_set.create(choice_text='two')
+        self.user = User.objects.create_user(username="voter",
+                                             password="123")
+
+    def test_new_vote_statements(self):
+        """A first ballot reads once, inserts the vote and counts it."""
+        with CaptureQueriesContext(connection) as queries:
+            cast_vote(self.user, self.question.id, self.choice1.id)
+        # Read, vote insert, tally update and rollup upsert.
+        self.assertEqual(4, len(statements(queries)))
+        self.assertEqual(1, Vote.objects.get().choice.votes)
+
+    def test_changed_vote_statements(self):
+        """A changed ballot reads once, updates the vote and the tallies."""
+        cast_vote(self.user, self.question.id, self.choice1.id)
+        with CaptureQueriesContext(connection) as queries:
+            cast_vote(self.user, self.question.id, self.choice2.id)
+        # Read, vote update, tally update and rollup upsert.
+        self.assertEqual(4, len(statements(queries)))
+        self.assertEqual([0, 1], list(Choice.objects.order_by('pk')
+                                      .values_list('vote_count', flat=True)))
+
+    def test_same_vote_is_read_only(self):
+        """Casting the same ballot again only reads."""
+        cast_vote(self.user, self.question.id, self.choice1.id)
+        with CaptureQueriesContext(connection) as queries:
+            cast_vote(self.user, self.question.id, self.choice1.id)
+        self.assertEqual(1, len(statements(queries)))
+
+    def test_choice_of_other_question(self):
+        """A choice from another question is rejected."""
+        other = create_question("other", days=-1)
+        with self.assertRaises(Choice.DoesNotExist):
+            cast_vote(self.user, other.id, self.choice1.id)
+
+
+class ConcurrentCastVoteTests(TransactionTestCase):
+    """Test for cast_vote under concurrent ballots of one user."""
+
+    def test_one_vote_stored(self):
+        """Parallel ballots of the same user leave exactly one vote."""
+        question = create_question("race", days=-1)
+        choices = [question.choice_set.create(choice_text=str(number))
+                   for number in range(4)]
+        user = User.objects.create_user(username="voter", password="123")
+        barrier = threading.Barrier(8)
+        errors = []
+
+        def ballot(choice):
+            # The in-memory test database reports a locked table instead
+            # of waiting for it, so the ballot is resubmitted like a
+            # client would.
+            try:
+                barrier.wait()
+                for attempt in range(50):
+                    try:
+                        cast_vote(user, question.id, choice.id)
+                        break
+                    except OperationalError:
+                        time.sleep(0.01)
+                else:
+                    errors.append(choice)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=ballot, args=(choices[i % 4],))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(1, Vote.objects.count())
+        self.assertEqual(1, sum(Choice.objects.values_list('vote_count',
+                                                           flat=True)))
@@ -0,0 +1,96 @@
+"""Test for the session storage profiles."""
+import datetime
+import os
+import runpy
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .test_view import create_question
+
+COOKIE_PROFILE = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies',
+    'MESSAGE_STORAGE': 'django.contrib.messages.storage.cookie.CookieStorage',
+}
+
+
+class PurgeSessionsTests(TestCase):
+    """Test for the purge_sessions command."""
+
+    def test_deletes_only_expired_sessions(self):
+        """Expired sessions are deleted in batches, live ones are kept."""
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(
+                session_key=f'expired{number}', session_data='',
+                expire_date=now - datetime.timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='',
+                               expire_date=now + datetime.timedelta(days=1))
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertIn("Deleted 5 expired sessions", out.getvalue())
+        self.assertEqual(['live'], list(
+            Session.objects.values_list('session_key', flat=True)))
+
+    @override_settings(**COOKIE_PROFILE)
+    def test_nothing_to_purge_with_cookie_sessions(self):
+        """Cookie sessions have no table to purge."""
+        out = StringIO()
+        call_command('purge_sessions', stdout=out)
+        self.assertIn("nothing to purge", out.getvalue())
+
+
+class SessionProfileTests(TestCase):
+    """Test for the SESSION_PROFILE setting."""
+
+    def test_unknown_profile(self):
+        """An unknown profile names the valid ones."""
+        path = os.path.join(settings.BASE_DIR, 'mysite', 'settings.py')
+        with mock.patch.dict(os.environ, SESSION_PROFILE='memory'), \
+                self.assertRaisesMessage(
+                    ImproperlyConfigured,
+                    "Unknown SESSION_PROFILE 'memory', expected one of db, "
+                    "cached_db, signed_cookies"):
+            runpy.run_path(path)
+
+
+@override_settings(**COOKIE_PROFILE)
+class CookieProfileTests(TestCase):
+    """Test for the signed cookie session profile."""
+
+    def setUp(self):
+        """Create a voter and an open question."""
+        self.user = User.objects.create_user(username="voter",
+                                             password="123")
+        self.question = create_question("cookies", days=-1)
+        self.choice = self.question.choice_set.create(choice_text='one')
+
+    def test_vote_flow_does_not_touch_sessions(self):
+        """Logging in and voting never reads or writes django_session."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('login'), {'username': 'voter',
+                                                'password': '123'})
+            self.client.get(reverse('polls:detail',
+                                    args=(self.question.id,)))
+            self.client.post(reverse('polls:vote', args=(self.question.id,)),
+                             {'choice': self.choice.id}, follow=True)
+        self.assertFalse([query for query in queries
+                          if 'django_session' in query['sql']])
+        self.assertEqual(1, self.choice.vote_set.count())
+
+    def test_message_survives_redirect(self):
+        """A flash message is carried by a cookie to the next page."""
+        closed = create_question("closed", days=-5, end_day=-1)
+        response = self.client.get(reverse('polls:detail',
+                                           args=(closed.id,)), follow=True)
+        self.assertContains(response, "Voting is not allowed for this poll")
@@ -0,0 +1,122 @@
+"""Test for the fingerprinted, precompressed static files."""
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+from ..static_files import accepted_encodings
+
+STYLE = Path(__file__).resolve().parent.parent / 'static/polls/style.css'
+
+
+class StaticPipelineTests(SimpleTestCase):
+    """Test for collectstatic and the static asset middleware."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Collect the static files into a temporary STATIC_ROOT."""
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.root)
+        cls.pipeline = override_settings(
+            STATIC_ROOT=cls.root,
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {
+                    'BACKEND': 'polls.static_files.'
+                               'CompressedManifestStaticFilesStorage',
+                },
+            },
+            MIDDLEWARE=['polls.static_files.StaticAssetMiddleware',
+                        *settings.MIDDLEWARE],
+        )
+        cls.pipeline.enable()
+        cls.addClassCleanup(cls.pipeline.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_hashed_name(self):
+        """The static tag points at the file with a content hash."""
+        url = static('polls/style.css')
+        self.assertRegex(url, r'/polls/style\.[0-9a-f]{12}\.css$')
+
+    def test_gzip_variant(self):
+        """A client accepting gzip gets the compressed file."""
+        response = self.client.get(static('polls/style.css'),
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)),
+                         STYLE.read_bytes())
+
+    def test_identity(self):
+        """A client without Accept-Encoding gets the file as it is."""
+        response = self.client.get(static('polls/style.css'))
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(b''.join(response.streaming_content),
+                         STYLE.read_bytes())
+
+    def test_hashed_file_is_immutable(self):
+        """A hashed file is cached for a year."""
+        response = self.client.get(static('polls/style.css'))
+        self.assertEqual(response['Cache-Control'],
+                         'public, max-age=31536000, immutable')
+
+    def test_unhashed_file_is_revalidated(self):
+        """The original name of a file has to be revalidated."""
+        response = self.client.get(f'{settings.STATIC_URL}polls/style.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+
+    def test_unhashed_file_not_modified(self):
+        """A client with the current file gets a 304 with its validators."""
+        url = f'{settings.STATIC_URL}polls/style.css'
+        response = self.client.get(url)
+        for headers in [{'HTTP_IF_NONE_MATCH': response['ETag']},
+                        {'HTTP_IF_MODIFIED_SINCE':
+                         response['Last-Modified']}]:
+            with self.subTest(headers=headers):
+                cached = self.client.get(url, **headers)
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached['ETag'], response['ETag'])
+                self.assertEqual(cached['Cache-Control'], 'public, no-cache')
+
+    def test_variants_have_their_own_etag(self):
+        """The gzip variant is not validated with the ETag of the file."""
+        url = f'{settings.STATIC_URL}polls/style.css'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_missing_file(self):
+        """Missing files and paths out of STATIC_ROOT are not found."""
+        for name in ['polls/missing.css', '../mysite/settings.py']:
+            with self.subTest(name=name):
+                response = self.client.get(f'{settings.STATIC_URL}{name}')
+                self.assertEqual(response.status_code, 404)
+
+    def test_other_paths_pass_through(self):
+        """Requests outside STATIC_URL reach the site."""
+        response = self.client.get('/accounts/login/')
+        self.assertEqual(response.status_code, 200)
+
+
+class AcceptedEncodingsTests(SimpleTestCase):
+    """Test for parsing Accept-Encoding."""
+
+    def test_refused_codings(self):
+        """Codings with a quality of zero are not accepted."""
+        self.assertEqual(accepted_encodings('br;q=0, GZIP;q=0.5, identity'),
+                         {'gzip', 'identity'})
+
+    def test_malformed_quality(self):
+        """A coding with a malformed quality is not accepted."""
+        self.assertEqual(accepted_encodings('gzip;q=abc, br'), {'br'})
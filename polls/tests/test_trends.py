@@ -0,0 +1,186 @@
+"""Test for the vote rollups and trends."""
+import datetime
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..ingest import write_ballots
+from ..models import Choice, Vote, VoteRollup
+from ..services import cast_vote
+from ..trends import add_deltas, compact_rollups, hour_bucket
+from .test_view import create_question
+
+
+class RollupTests(TestCase):
+    """Test that the vote paths keep the rollups in step with the tallies."""
+
+    def setUp(self):
+        """Create a question with two choices and two voters."""
+        self.question = create_question("trend", days=-1)
+        self.choice1 = self.question.choice_set.create(choice_text='one')
+        self.choice2 = self.question.choice_set.create(choice_text='two')
+        self.users = [User.objects.create_user(username=f"voter{number}")
+                      for number in range(2)]
+
+    def assertRollupsMatchTallies(self):
+        """Check that the deltas of each choice add up to its tally."""
+        for choice in Choice.objects.all():
+            total = VoteRollup.objects.filter(choice=choice).aggregate(
+                total=Sum('delta'))['total'] or 0
+            self.assertEqual(choice.vote_count, total)
+
+    def test_cast_change_and_delete(self):
+        """New, changed and deleted votes all move the rollups."""
+        cast_vote(self.users[0], self.question.id, self.choice1.id)
+        cast_vote(self.users[1], self.question.id, self.choice1.id)
+        cast_vote(self.users[0], self.question.id, self.choice2.id)
+        self.assertRollupsMatchTallies()
+        Vote.objects.filter(user=self.users[1]).delete()
+        self.assertRollupsMatchTallies()
+        self.assertEqual({VoteRollup.MINUTE}, set(
+            VoteRollup.objects.values_list('resolution', flat=True)))
+
+    def test_batched_ballots(self):
+        """Batched ballots add their deltas to the rollups."""
+        cast_vote(self.users[0], self.question.id, self.choice1.id)
+        write_ballots({
+            (self.users[0].id, self.question.id): ('a', self.choice2.id),
+            (self.users[1].id, self.question.id): ('b', self.choice2.id),
+        })
+        self.assertRollupsMatchTallies()
+        self.assertEqual(2, Choice.objects.get(pk=self.choice2.pk).vote_count)
+
+    def test_changed_vote_is_recast(self):
+        """Changing a vote moves its cast time."""
+        cast_vote(self.users[0], self.question.id, self.choice1.id)
+        earlier = timezone.now() - datetime.timedelta(days=1)
+        Vote.objects.update(cast_at=earlier)
+        cast_vote(self.users[0], self.question.id, self.choice2.id)
+        self.assertGreater(Vote.objects.get().cast_at, earlier)
+
+
+class CascadeTests(TransactionTestCase):
+    """Test for deleting the question or choice of counted votes."""
+
+    def setUp(self):
+        """Create a question with a vote on each of two choices."""
+        self.question = create_question("cascade", days=-1)
+        self.choices = [self.question.choice_set.create(choice_text=text)
+                        for text in ['one', 'two']]
+        for number, choice in enumerate(self.choices):
+            user = User.objects.create_user(username=f"voter{number}")
+            cast_vote(user, self.question.id, choice.id)
+
+    def test_delete_question(self):
+        """A question is deleted with its votes and rollups."""
+        self.question.delete()
+        self.assertFalse(VoteRollup.objects.exists())
+        self.assertFalse(Vote.objects.exists())
+
+    def test_delete_choice(self):
+        """A choice is deleted with its votes and rollups."""
+        Choice.objects.filter(pk=self.choices[0].pk).delete()
+        self.assertEqual([self.choices[1].id], list(
+            VoteRollup.objects.values_list('choice', flat=True)))
+        self.assertEqual(1, Vote.objects.count())
+
+    def test_delete_voter(self):
+        """Deleting a voter takes their vote out of the trend."""
+        User.objects.get(username="voter0").delete()
+        self.assertEqual(0, VoteRollup.objects.filter(
+            choice=self.choices[0]).aggregate(total=Sum('delta'))['total'])
+
+
+class TrendTests(TestCase):
+    """Test for the trend endpoint and the compaction of the rollups."""
+
+    def setUp(self):
+        """Create rollups over two hours of a question."""
+        self.question = create_question("trend", days=-1)
+        self.choice1 = self.question.choice_set.create(choice_text='one')
+        self.choice2 = self.question.choice_set.create(choice_text='two')
+        self.start = hour_bucket(timezone.now()) - datetime.timedelta(days=3)
+        minute = datetime.timedelta(minutes=1)
+        add_deltas([
+            (self.question.id, self.choice1.id, self.start, 2),
+            (self.question.id, self.choice1.id, self.start + minute, -1),
+            (self.question.id, self.choice2.id, self.start + minute, 3),
+            (self.question.id, self.choice1.id, self.start + 60 * minute, 4),
+        ])
+        # Adding to an existing bucket adds up.
+        add_deltas([(self.question.id, self.choice1.id, self.start, 1)])
+
+    def trend(self, **params):
+        """Return the trend of the question as JSON."""
+        response = self.client.get(
+            reverse('polls:trend', args=(self.question.id,)), params)
+        self.assertEqual(200, response.status_code)
+        return response.json()
+
+    def points(self, trend):
+        """Return the points of each choice by choice text."""
+        return {choice['choice_text']: [tally for _, tally in choice['points']]
+                for choice in trend['choices']}
+
+    def test_cumulative_minutes(self):
+        """Each point is the running tally of its choice."""
+        trend = self.trend()
+        self.assertEqual('minute', trend['resolution'])
+        self.assertEqual({'one': [3, 2, 6], 'two': [3]}, self.points(trend))
+        self.assertEqual(self.start.isoformat(),
+                         trend['choices'][0]['points'][0][0])
+
+    def test_hours(self):
+        """The hour resolution merges the minutes of each hour."""
+        self.assertEqual({'one': [2, 6], 'two': [3]},
+                         self.points(self.trend(resolution='hour')))
+
+    def test_invalid_requests(self):
+        """Unknown resolutions and unpublished questions are refused."""
+        url = reverse('polls:trend', args=(self.question.id,))
+        self.assertEqual(400, self.client.get(
+            url, {'resolution': 'day'}).status_code)
+        future = create_question("future", days=5)
+        self.assertEqual(404, self.client.get(
+            reverse('polls:trend', args=(future.id,))).status_code)
+
+    def test_trend_follows_votes(self):
+        """A vote shows up in the next trend."""
+        self.trend()
+        user = User.objects.create_user(username="voter")
+        cast_vote(user, self.question.id, self.choice2.id)
+        self.assertEqual([3, 4], self.points(self.trend())['two'])
+
+    def test_compaction(self):
+        """Old minute buckets are merged into hour buckets."""
+        before = self.points(self.trend(resolution='hour'))
+        self.assertEqual(4, compact_rollups(timezone.now()))
+        self.assertEqual(
+            [(self.choice1.id, self.start, 2),
+             (self.choice1.id, self.start + datetime.timedelta(hours=1), 4),
+             (self.choice2.id, self.start, 3)],
+            list(VoteRollup.objects.filter(resolution=VoteRollup.HOUR)
+                 .order_by('choice', 'bucket')
+                 .values_list('choice', 'bucket', 'delta')))
+        self.assertFalse(VoteRollup.objects.filter(
+            resolution=VoteRollup.MINUTE).exists())
+        user = User.objects.create_user(username="voter")
+        cast_vote(user, self.question.id, self.choice2.id)
+        self.assertEqual({'one': [2, 6], 'two': [3, 4]},
+                         self.points(self.trend(resolution='hour')))
+        self.assertEqual(before['one'],
+                         self.points(self.trend(resolution='hour'))['one'])
+
+    def test_command_keeps_recent_minutes(self):
+        """The command only merges buckets older than the retention."""
+        stdout = io.StringIO()
+        call_command('compact_rollups', '--older-than', str(24 * 5),
+                     stdout=stdout)
+        self.assertIn("Merged 0 minute buckets", stdout.getvalue())
+        call_command('compact_rollups', stdout=stdout)
+        self.assertIn("Merged 4 minute buckets", stdout.getvalue())
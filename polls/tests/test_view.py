@@ -1,11 +1,18 @@
 """Test for Poll's View."""
 import datetime
+from io import StringIO
 
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from django.urls import reverse
 
-from ..models import Question
+from ..history import get_vote_history
+from ..models import Question, Vote
+from ..page_cache import seconds_until_next_change
+from ..results import cache_stats
 
 
 def create_question(question_text, days, end_day=None):
@@ -85,3 +92,253 @@ class QuestionIndexViewTests(TestCase):
             response.context['latest_question_list'],
             [question2, question1],
         )
+
+
+class QuestionResultsViewTests(TestCase):
+    """Test for results page."""
+
+    def test_results_summary(self):
+        """The results page shows tallies, percentages and the leader."""
+        question = create_question("results", days=-1)
+        question.choice_set.create(choice_text='one', vote_count=3)
+        question.choice_set.create(choice_text='two', vote_count=1)
+        response = self.client.get(reverse('polls:results',
+                                           args=(question.id,)))
+        results = response.context['results']
+        self.assertEqual(4, results['total'])
+        self.assertEqual([75.0, 25.0],
+                         [choice['percentage']
+                          for choice in results['choices']])
+        self.assertEqual('one', results['leader']['choice_text'])
+
+    def test_no_leader_on_tie(self):
+        """There is no leading choice when the top tallies are tied."""
+        question = create_question("tie", days=-1)
+        question.choice_set.create(choice_text='one', vote_count=2)
+        question.choice_set.create(choice_text='two', vote_count=2)
+        response = self.client.get(reverse('polls:results',
+                                           args=(question.id,)))
+        self.assertIsNone(response.context['results']['leader'])
+
+    def test_constant_query_count(self):
+        """Loading the results costs the same no matter the choice count."""
+        for count in (2, 10):
+            question = create_question(f"{count} choices", days=-1)
+            for number in range(count):
+                question.choice_set.create(choice_text=str(number))
+            with self.assertNumQueries(2):
+                self.client.get(reverse('polls:results',
+                                        args=(question.id,)))
+
+
+class ResultsCacheTests(TestCase):
+    """Test for the cached results snapshots."""
+
+    def setUp(self):
+        """Create a question with a choice and a voter."""
+        self.question = create_question("cached", days=-1)
+        self.choice = self.question.choice_set.create(choice_text='one')
+        User.objects.create_user(username="voter", password="123")
+        self.url = reverse('polls:results', args=(self.question.id,))
+
+    def test_second_view_is_served_from_cache(self):
+        """A repeated results view does not hit the database."""
+        self.client.get(self.url)
+        before = cache_stats()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        self.assertEqual(before['hits'] + 1, cache_stats()['hits'])
+
+    def test_vote_invalidates_cache(self):
+        """The voter sees their own vote right after voting."""
+        self.client.get(self.url)
+        self.client.login(username="voter", password="123")
+        self.client.post(reverse('polls:vote', args=(self.question.id,)),
+                         {'choice': self.choice.id})
+        response = self.client.get(self.url)
+        self.assertEqual(1, response.context['results']['total'])
+
+    def test_rebuild_invalidates_cache(self):
+        """Repaired tallies are shown right after the rebuild command."""
+        self.client.get(self.url)
+        # bulk_create sends no signals, so the stored tally drifts.
+        Vote.objects.bulk_create([Vote(user=User.objects.get(),
+                                       question=self.question,
+                                       choice=self.choice)])
+        call_command('rebuild_vote_counts', stdout=StringIO())
+        response = self.client.get(self.url)
+        self.assertEqual(1, response.context['results']['total'])
+
+    def test_metrics_for_staff(self):
+        """Staff members can read the hit and miss counters."""
+        url = reverse('polls:metrics')
+        self.assertEqual(302, self.client.get(url).status_code)
+        User.objects.create_user(username="staff", password="123",
+                                 is_staff=True)
+        self.client.login(username="staff", password="123")
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(cache_stats(),
+                         self.client.get(url).json()['results_cache'])
+
+    def test_missing_question(self):
+        """Results of a question that does not exist give a 404."""
+        response = self.client.get(reverse('polls:results', args=(999,)))
+        self.assertEqual(404, response.status_code)
+
+
+class IndexVotedBadgeTests(TestCase):
+    """Test for the already voted badges of the index page."""
+
+    def test_badges_in_one_query(self):
+        """The polls the user voted on are marked with one query."""
+        user = User.objects.create_user(username="voter", password="123")
+        voted = create_question("voted", days=-2)
+        create_question("not voted", days=-1)
+        Vote.objects.create(user=user,
+                            choice=voted.choice_set.create(choice_text='a'))
+        self.client.login(username="voter", password="123")
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('polls:index'))
+        self.assertEqual({voted.id}, response.context['voted_question_ids'])
+        self.assertContains(response, "Already voted", count=1)
+
+
+class IndexPageCacheTests(TestCase):
+    """Test for the cached anonymous index page."""
+
+    def setUp(self):
+        """Create a published question."""
+        self.question = create_question("cached index", days=-1)
+        self.url = reverse('polls:index')
+
+    def test_second_view_is_served_from_cache(self):
+        """A repeated anonymous index view does not hit the database."""
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_conditional_get(self):
+        """A client holding the current page gets a 304."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.content)
+
+    def test_question_change_invalidates_page(self):
+        """An edited question shows up on the next view."""
+        self.client.get(self.url)
+        self.question.question_text = "edited"
+        self.question.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, "edited")
+
+    def test_logged_in_user_is_not_cached(self):
+        """Logged in users get a page rendered for them."""
+        User.objects.create_user(username="voter", password="123")
+        self.client.login(username="voter", password="123")
+        response = self.client.get(self.url)
+        self.assertNotIn('ETag', response)
+
+    def test_expires_at_next_publication(self):
+        """The page expires when the next question is published."""
+        now = timezone.now()
+        Question.objects.create(question_text="soon",
+                                pub_date=now + datetime.timedelta(minutes=5))
+        self.assertEqual(300, seconds_until_next_change(now))
+
+
+class QuestionDetailViewTests(TestCase):
+    """Test for detail page."""
+
+    def setUp(self):
+        """Create an open question with choices and a voter."""
+        self.question = create_question("detail", days=-1)
+        for number in range(5):
+            self.question.choice_set.create(choice_text=str(number))
+        self.user = User.objects.create_user(username="voter",
+                                             password="123")
+        self.url = reverse('polls:detail', args=(self.question.id,))
+
+    def test_closed_question_redirects(self):
+        """A question that is not open for voting redirects to the index."""
+        question = create_question("closed", days=-5, end_day=-1)
+        response = self.client.get(reverse('polls:detail',
+                                           args=(question.id,)))
+        self.assertRedirects(response, reverse('polls:index'))
+
+    def test_future_question_redirects(self):
+        """A question that is not published yet redirects to the index."""
+        question = create_question("future", days=5)
+        response = self.client.get(reverse('polls:detail',
+                                           args=(question.id,)))
+        self.assertRedirects(response, reverse('polls:index'))
+
+    def test_existing_vote_is_selected(self):
+        """The choice the user voted for is passed to the template."""
+        choice = self.question.choice_set.last()
+        Vote.objects.create(user=self.user, choice=choice)
+        self.client.login(username="voter", password="123")
+        response = self.client.get(self.url)
+        self.assertEqual(choice.id, response.context['existed_vote'])
+
+    def test_anonymous_query_budget(self):
+        """An anonymous visit loads the question and its choices only."""
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_authenticated_query_budget(self):
+        """A logged in visit adds the session, user and history lookups."""
+        Vote.objects.create(user=self.user,
+                            choice=self.question.choice_set.first())
+        self.client.login(username="voter", password="123")
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+    def test_same_text_choices(self):
+        """Only the chosen one of two choices with the same text is checked."""
+        first = self.question.choice_set.create(choice_text='same')
+        second = self.question.choice_set.create(choice_text='same')
+        Vote.objects.create(user=self.user, choice=second)
+        self.client.login(username="voter", password="123")
+        response = self.client.get(self.url)
+        self.assertContains(response, 'checked="checked"', count=1)
+        self.assertContains(
+            response, f'value="{second.id}" checked="checked"')
+        self.assertNotContains(
+            response, f'value="{first.id}" checked="checked"')
+
+    def test_vote_history_is_cached(self):
+        """Once loaded, the user's votes cost no query on other polls."""
+        other = create_question("other", days=-1)
+        other.choice_set.create(choice_text='a')
+        self.client.login(username="voter", password="123")
+        self.client.get(self.url)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('polls:detail', args=(other.id,)))
+
+    @override_settings(
+        CACHES={alias: {'BACKEND':
+                        'django.core.cache.backends.locmem.LocMemCache',
+                        'LOCATION': alias}
+                for alias in ['default', 'history']},
+        POLLS_HISTORY_CACHE='history')
+    def test_history_has_its_own_cache(self):
+        """The histories are kept in the POLLS_HISTORY_CACHE alias."""
+        get_vote_history(self.user.id)
+        self.assertIsNotNone(
+            caches['history'].get(f'polls:history:version:{self.user.id}'))
+        self.assertIsNone(
+            caches['default'].get(f'polls:history:version:{self.user.id}'))
+
+    def test_vote_updates_history(self):
+        """A new vote shows up on the detail page right away."""
+        choice = self.question.choice_set.last()
+        self.client.login(username="voter", password="123")
+        self.client.get(self.url)
+        self.client.post(reverse('polls:vote', args=(self.question.id,)),
+                         {'choice': choice.id})
+        response = self.client.get(self.url)
+        self.assertEqual(choice.id, response.context['existed_vote'])
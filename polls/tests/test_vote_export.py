@@ -0,0 +1,91 @@
+"""Test for the raw vote export."""
+import csv
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Vote
+from .test_view import create_question
+
+
+class VoteExportTests(TestCase):
+    """Test for the export_votes command and endpoint."""
+
+    def setUp(self):
+        """Create recent votes and votes cast on an old question."""
+        self.recent = create_question("recent", days=-1)
+        self.old = create_question("old", days=-30)
+        self.votes = []
+        for number in range(3):
+            user = User.objects.create_user(username=f"voter{number}",
+                                            password="123")
+            for question in (self.recent, self.old):
+                choice = question.choice_set.create(choice_text=str(number))
+                self.votes.append(Vote.objects.create(user=user,
+                                                      choice=choice))
+        Vote.objects.filter(question=self.old).update(
+            cast_at=self.old.pub_date)
+
+    def export(self, *args):
+        """Run the command and return its output."""
+        stdout = io.StringIO()
+        call_command('export_votes', *args, stdout=stdout,
+                     stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def test_csv(self):
+        """The CSV export has a header and one row per vote."""
+        rows = list(csv.reader(io.StringIO(self.export())))
+        self.assertEqual(['id', 'user_id', 'question_id', 'choice_id',
+                          'cast_at'], rows[0])
+        self.assertEqual([str(vote.pk) for vote in self.votes],
+                         [row[0] for row in rows[1:]])
+
+    def test_ndjson(self):
+        """The NDJSON export has one object per vote."""
+        lines = self.export('--format', 'ndjson').splitlines()
+        vote = self.votes[0]
+        self.assertEqual(len(self.votes), len(lines))
+        self.assertEqual({'id': vote.pk, 'user_id': vote.user_id,
+                          'question_id': vote.question_id,
+                          'choice_id': vote.choice_id,
+                          'cast_at': DjangoJSONEncoder().default(
+                              vote.cast_at)}, json.loads(lines[0]))
+
+    def test_filters(self):
+        """Votes can be filtered by question and the time they were cast."""
+        lines = self.export('--format', 'ndjson', '--question',
+                            str(self.old.pk)).splitlines()
+        self.assertEqual({self.old.pk}, {json.loads(line)['question_id']
+                                         for line in lines})
+        since = self.recent.pub_date.isoformat()
+        lines = self.export('--format', 'ndjson', '--since',
+                            since).splitlines()
+        self.assertEqual({self.recent.pk}, {json.loads(line)['question_id']
+                                            for line in lines})
+
+    def test_invalid_date(self):
+        """A malformed date stops the command."""
+        with self.assertRaises(CommandError):
+            self.export('--since', 'yesterday')
+
+    def test_endpoint_is_staff_only(self):
+        """Only staff members can download the votes."""
+        url = reverse('polls:export_votes')
+        self.client.login(username="voter0", password="123")
+        self.assertEqual(302, self.client.get(url).status_code)
+        User.objects.create_user(username="admin", password="123",
+                                 is_staff=True)
+        self.client.login(username="admin", password="123")
+        response = self.client.get(url, {'format': 'ndjson',
+                                         'question': self.recent.pk})
+        self.assertEqual('application/x-ndjson', response['Content-Type'])
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertEqual(400, self.client.get(url, {'format': 'xml'})
+                         .status_code)
@@ -0,0 +1,101 @@
+"""Test for the worker warm-up."""
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import OperationalError
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..results import cache_stats, get_results
+from ..warmup import resolve_urls, warm_up, warm_up_if_enabled
+from .test_view import create_question
+
+
+class WarmUpTests(TestCase):
+    """Test for warm_up and the POLLS_WARMUP setting."""
+
+    def setUp(self):
+        """Start every test from empty caches."""
+        for cache in caches.all():
+            cache.clear()
+
+    def test_templates_compiled(self):
+        """The polls and project templates are in the cached loader."""
+        loader = engines['django'].engine.template_loaders[0]
+        loader.reset()
+        report = warm_up()
+        self.assertEqual(5, report['templates']['count'])
+        cached = {key.split(':')[0] for key in loader.get_template_cache}
+        self.assertLessEqual({'polls/index.html', 'polls/detail.html',
+                              'polls/results.html', 'polls/archive.html',
+                              'registration/login.html'}, cached)
+
+    @override_settings(POLLS_WARMUP_RESULTS=1)
+    def test_results_primed(self):
+        """The results of the newest open polls are cached."""
+        older = create_question("older", days=-2)
+        newest = create_question("newest", days=-1)
+        create_question("closed", days=-3, end_day=-1)
+        create_question("future", days=2)
+        self.assertEqual(1, warm_up()['results']['count'])
+        hits = cache_stats()['hits']
+        with self.assertNumQueries(0):
+            self.assertEqual("newest",
+                             get_results(newest.id)['question_text'])
+        self.assertEqual(hits + 1, cache_stats()['hits'])
+        with self.assertNumQueries(2):
+            get_results(older.id)
+
+    def test_database_errors_are_skipped(self):
+        """A failing database step does not stop the warm-up."""
+        failing = mock.Mock(side_effect=OperationalError("no database"))
+        steps = [('connections', failing), ('urls', resolve_urls)]
+        with mock.patch('polls.warmup.STEPS', steps), \
+                self.assertLogs('polls.warmup', 'WARNING'):
+            report = warm_up()
+        self.assertIsNone(report['connections']['count'])
+        self.assertGreater(report['urls']['count'], 0)
+
+    def test_warm_up_only_when_enabled(self):
+        """warm_up_if_enabled only warms up with POLLS_WARMUP."""
+        with mock.patch('polls.warmup.warm_up') as warm:
+            self.assertIsNone(warm_up_if_enabled())
+            warm.assert_not_called()
+            with override_settings(POLLS_WARMUP=True):
+                warm_up_if_enabled()
+            warm.assert_called_once()
+
+
+class WarmBootTests(SimpleTestCase):
+    """Test for a server worker booted with POLLS_WARMUP."""
+
+    def test_admin_after_warm_up(self):
+        """The admin URLs are built after the admin registered its models."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        env = dict(os.environ, POLLS_WARMUP='True',
+                   DJANGO_SETTINGS_MODULE='mysite.settings',
+                   DATABASE_NAME=os.path.join(directory.name, 'db.sqlite3'))
+        script = (
+            "from mysite.wsgi import application\n"
+            "from django.core.management import call_command\n"
+            "from django.contrib.auth.models import User\n"
+            "from django.test import Client\n"
+            "from django.test.utils import setup_test_environment\n"
+            "from django.urls import reverse\n"
+            "setup_test_environment()\n"
+            "call_command('migrate', verbosity=0)\n"
+            "client = Client()\n"
+            "client.force_login(User.objects.create_superuser('admin'))\n"
+            "print(client.get('/admin/').status_code)\n"
+            "print(reverse('admin:polls_question_changelist'))\n")
+        output = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            check=True, capture_output=True, text=True).stdout
+        self.assertEqual(['200', '/admin/polls/question/'],
+                         output.split())
@@ -0,0 +1,140 @@
+"""Vote trends for Polls app.
+
+Every change of a tally is added to the minute bucket of its choice in
+`VoteRollup`, with a single upsert per ballot. The history of a poll is
+then read from one row per choice and active minute, instead of from
+every vote, and old minute buckets are merged into hour buckets to
+bound the size of the table.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Choice, VoteRollup
+from .results import results_version
+
+# Rollup rows written per statement, well within SQLite's parameter limit.
+BATCH_SIZE = 100
+
+
+def minute_bucket(moment):
+    """Return the start of the minute of a moment."""
+    return moment.replace(second=0, microsecond=0)
+
+
+def hour_bucket(moment):
+    """Return the start of the hour of a moment."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def add_deltas(rows, resolution=VoteRollup.MINUTE):
+    """Add deltas to rollup buckets, creating the buckets when needed.
+
+    The rows are upserted with INSERT ... ON CONFLICT, which SQLite and
+    PostgreSQL both support, so concurrent writers add up correctly.
+
+    :param rows: iterable of (question id, choice id, bucket, delta)
+    """
+    rows = [row for row in rows if row[3]]
+    table = connection.ops.quote_name(VoteRollup._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(column) for column in
+                        ['question_id', 'choice_id', 'bucket',
+                         'resolution', 'delta'])
+    conflict = ', '.join(connection.ops.quote_name(column) for column in
+                         ['choice_id', 'resolution', 'bucket'])
+    delta = connection.ops.quote_name('delta')
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            params = []
+            for question_id, choice_id, bucket, change in batch:
+                params += [question_id, choice_id,
+                           connection.ops.adapt_datetimefield_value(bucket),
+                           resolution, change]
+            values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {values}'
+                f' ON CONFLICT ({conflict}) DO UPDATE'
+                f' SET {delta} = {table}.{delta} + excluded.{delta}',
+                params)
+
+
+def record_deltas(deltas, moment=None):
+    """Add changes of tallies to the current minute bucket.
+
+    :param deltas: dict of (question id, choice id) to the tally change
+    :param moment: time of the change, now by default
+    """
+    bucket = minute_bucket(moment or timezone.now())
+    add_deltas((question_id, choice_id, bucket, delta)
+               for (question_id, choice_id), delta in deltas.items())
+
+
+def compact_rollups(before):
+    """Merge the minute buckets before an hour into hour buckets.
+
+    Cached trends keep showing the merged minutes until the results of
+    the question change or the cache entry expires.
+
+    :param before: minute buckets of hours that started before this
+                   moment's hour are merged
+    :return: number of minute buckets that were merged
+    """
+    minutes = VoteRollup.objects.filter(resolution=VoteRollup.MINUTE,
+                                        bucket__lt=hour_bucket(before))
+    with transaction.atomic():
+        hours = minutes.annotate(
+            hour=TruncHour('bucket', tzinfo=datetime.timezone.utc)
+        ).order_by().values('question_id', 'choice_id', 'hour') \
+            .annotate(total=Sum('delta'))
+        add_deltas([(row['question_id'], row['choice_id'], row['hour'],
+                     row['total']) for row in hours], VoteRollup.HOUR)
+        merged, _ = minutes.delete()
+    return merged
+
+
+def build_trend(question_id, resolution=VoteRollup.MINUTE):
+    """Return the cumulative tally of each choice over time.
+
+    :param resolution: minute, or hour to merge the minutes of each hour
+    :return: list of dicts with the id and text of each choice and its
+             points as [ISO time, tally] pairs
+    """
+    moment = F('bucket')
+    if resolution == VoteRollup.HOUR:
+        moment = TruncHour('bucket', tzinfo=datetime.timezone.utc)
+    rows = VoteRollup.objects.filter(question_id=question_id) \
+        .annotate(moment=moment).order_by() \
+        .values('choice_id', 'moment').annotate(total=Sum('delta')) \
+        .order_by('moment', 'choice_id')
+    choices = {choice['id']: dict(choice, points=[]) for choice in
+               Choice.objects.filter(question_id=question_id)
+               .order_by('pk').values('id', 'choice_text')}
+    tallies = dict.fromkeys(choices, 0)
+    for row in rows:
+        tallies[row['choice_id']] += row['total']
+        choices[row['choice_id']]['points'].append(
+            [row['moment'].isoformat(), tallies[row['choice_id']]])
+    return list(choices.values())
+
+
+def get_trend(question_id, resolution=VoteRollup.MINUTE):
+    """Return the trend of a question, from the cache when possible.
+
+    The trend is cached under the results version of the question, so
+    it is rebuilt after every vote.
+    """
+    cache = caches[settings.POLLS_RESULTS_CACHE]
+    key = f'polls:trend:{question_id}:{resolution}'
+    version = results_version(question_id)
+    trend = cache.get(key, version=version)
+    if trend is None:
+        trend = build_trend(question_id, resolution)
+        cache.set(key, trend, timeout=settings.POLLS_RESULTS_TIMEOUT,
+                  version=version)
+    return trend
@@ -1,12 +1,27 @@
 """Urls config for Polls app."""
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
+# The pages are served by the async views when the site runs under ASGI
+# with POLLS_ASYNC_VIEWS enabled.
+pages = async_views if settings.POLLS_ASYNC_VIEWS else views
 
 app_name = 'polls'
 urlpatterns = [
-    path('', views.IndexView.as_view(), name='index'),
-    path('<int:pk>/', views.DetailView.as_view(), name='detail'),
-    path('<int:pk>/results/', views.ResultsView.as_view(), name='results'),
-    path('<int:question_id>/vote/', views.vote, name='vote'),
+    path('', pages.IndexView.as_view(), name='index'),
+    path('archive/', views.ArchiveView.as_view(), name='archive'),
+    path('api/questions/', views.archive_api, name='archive_api'),
+    path('export/', views.export, name='export'),
+    path('export/votes/', views.export_votes, name='export_votes'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('<int:pk>/', pages.DetailView.as_view(), name='detail'),
+    path('<int:pk>/results/', pages.ResultsView.as_view(), name='results'),
+    path('<int:pk>/results/stream/', async_views.results_stream,
+         name='results_stream'),
+    path('<int:question_id>/trend/', views.trend, name='trend'),
+    path('<int:question_id>/vote/', pages.vote, name='vote'),
+    path('<int:question_id>/ballot/', views.submit_ballot, name='ballot'),
+    path('ballots/<str:ticket>/', views.ballot_status,
+         name='ballot_status'),
 ]
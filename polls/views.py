@@ -1,13 +1,29 @@
 """View for Polls app."""
-from django.http import HttpResponse, HttpResponseRedirect
+from django.conf import settings
+from django.http import (Http404, HttpResponse, HttpResponseBadRequest,
+                         HttpResponseRedirect, JsonResponse,
+                         StreamingHttpResponse)
+from django.db.models import Prefetch
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
+from django.utils.http import urlencode
 from django.views import generic
-from django.utils import timezone
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_GET, require_POST
 
-from .models import Question, Choice, Vote
+from .models import Question, Choice, VoteRollup
+from .archive import archive_page, export_questions, question_data
+from .history import get_vote_history
+from .ingest import get_ballot_queue
+from .middleware import timings
+from .page_cache import (get_index_page, index_generation, page_response,
+                         serves_cached_page, store_index_page)
+from .results import cache_stats, get_results
+from .services import cast_vote
+from .trends import get_trend
+from .vote_export import FORMATS, parse_moment, vote_rows
 
 
 class IndexView(generic.ListView):
@@ -21,8 +37,139 @@ class IndexView(generic.ListView):
 
         :return: last five published question
         """
-        return Question.objects.filter(
-            pub_date__lte=timezone.now()).order_by('-pub_date')[:5]
+        return Question.objects.published().order_by('-pub_date')[:5]
+
+    def get_context_data(self, **kwargs):
+        """Add the questions a logged in user has voted on."""
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            context['voted_question_ids'] = set(
+                get_vote_history(self.request.user.pk))
+        return context
+
+    def get(self, request, *args, **kwargs):
+        """Serve anonymous visitors from the page cache.
+
+        The cached page carries an ETag and Last-Modified date, so a
+        browser revalidating it gets a 304 without any rendering.
+        Visitors who are logged in or have pending messages get a
+        freshly rendered page.
+        """
+        if not serves_cached_page(request):
+            return super().get(request, *args, **kwargs)
+        generation = index_generation()
+        page = get_index_page(generation)
+        if page is not None:
+            return page_response(request, page)
+        response = super().get(request, *args, **kwargs)
+        response.render()
+        page = store_index_page(generation, response.content)
+        return page_response(request, page, response)
+
+
+class ArchiveView(generic.TemplateView):
+    """Archive page that lists every published question."""
+
+    template_name = 'polls/archive.html'
+
+    def get_context_data(self, **kwargs):
+        """Add a page of questions and the cursor of the next one."""
+        context = super().get_context_data(**kwargs)
+        questions, next_cursor = archive_page(
+            self.request.GET.get('cursor'), settings.POLLS_ARCHIVE_PAGE_SIZE)
+        context['question_list'] = questions
+        context['next_cursor'] = next_cursor
+        return context
+
+
+@require_GET
+def archive_api(request):
+    """Return a page of the archive as JSON.
+
+    :return: questions of the page and the URL of the next page, or null
+             on the last page
+    """
+    questions, next_cursor = archive_page(request.GET.get('cursor'),
+                                          settings.POLLS_ARCHIVE_PAGE_SIZE)
+    next_url = None
+    if next_cursor:
+        next_url = '%s?%s' % (reverse('polls:archive_api'),
+                              urlencode({'cursor': next_cursor}))
+    return JsonResponse({
+        'questions': [question_data(question) for question in questions],
+        'next': next_url,
+    })
+
+
+@require_GET
+def export(request):
+    """Stream every question with its tallies as a JSON array."""
+    response = StreamingHttpResponse(
+        export_questions(settings.POLLS_EXPORT_CHUNK_SIZE),
+        content_type='application/json')
+    response['Content-Disposition'] = 'attachment; filename="polls.json"'
+    return response
+
+
+@require_GET
+@staff_member_required
+def export_votes(request):
+    """Stream the votes as CSV or NDJSON to staff members.
+
+    The `format` parameter picks csv (default) or ndjson; `question`
+    (repeatable), `since` and `until` filter the votes.
+    """
+    name = request.GET.get('format', 'csv')
+    if name not in FORMATS:
+        return HttpResponseBadRequest(f"Unknown format: {name}")
+    try:
+        questions = [int(pk) for pk in request.GET.getlist('question')]
+        since = request.GET.get('since')
+        since = since and parse_moment(since)
+        until = request.GET.get('until')
+        until = until and parse_moment(until, end=True)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    lines, content_type = FORMATS[name]
+    response = StreamingHttpResponse(
+        lines(vote_rows(questions, since, until)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="votes.{name}"'
+    return response
+
+
+@require_GET
+@staff_member_required
+def metrics(request):
+    """Return the monitoring counters of this worker as JSON to staff."""
+    return JsonResponse({'results_cache': cache_stats(),
+                         'timings': timings.snapshot()})
+
+
+@require_GET
+def trend(request, question_id):
+    """Return the tally of each choice of a question over time as JSON.
+
+    The `resolution` parameter picks minute (default) or hour points.
+    """
+    resolution = request.GET.get('resolution', VoteRollup.MINUTE)
+    if resolution not in dict(VoteRollup.RESOLUTIONS):
+        return HttpResponseBadRequest(f"Unknown resolution: {resolution}")
+    question = get_object_or_404(Question.objects.published(),
+                                 pk=question_id)
+    return JsonResponse({
+        'question': question.pk,
+        'resolution': resolution,
+        'choices': get_trend(question.pk, resolution),
+    })
+
+
+def detail_queryset():
+    """Return questions with their choices loaded.
+
+    Showing a question costs two queries however many choices it has.
+    """
+    return Question.objects.prefetch_related(
+        Prefetch('choice_set', queryset=Choice.objects.order_by('pk')))
 
 
 class DetailView(generic.DetailView):
@@ -32,61 +179,108 @@ class DetailView(generic.DetailView):
     template_name = 'polls/detail.html'
 
     def get_queryset(self):
-        """Excludes any questions that aren't published yet."""
-        return Question.objects.filter(pub_date__lte=timezone.now())
+        """Load the open question with its choices."""
+        return detail_queryset().open()
 
-    def dispatch(self, request, *args, **kwargs):
+    def get(self, request, *args, **kwargs):
         """Redirect user to index page when voting is not allow."""
-        question = get_object_or_404(Question, pk=self.kwargs['pk'])
-        if not question.can_vote():
+        try:
+            self.object = self.get_object()
+        except Http404:
+            if not Question.objects.filter(pk=kwargs['pk']).exists():
+                raise
             messages.error(request, "Voting is not allowed for this poll")
             return redirect(reverse('polls:index'))
-        else:
-            return super().get(request, *args, **kwargs)
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
 
     def get_context_data(self, **kwargs):
-        """Add more context to the template of this page."""
+        """Add the choice the user voted for to the template."""
         context = super().get_context_data(**kwargs)
-        question = Question.objects.get(pk=self.kwargs['pk'])
-        user = self.request.user
-        if user.is_authenticated:
-            try:
-                existed_vote = Vote.objects.get(
-                    user=user,
-                    choice__in=question.choice_set.all()
-                ).choice.choice_text
-                context['existed_vote'] = existed_vote
-            except Vote.DoesNotExist:
-                pass
+        if self.request.user.is_authenticated:
+            choice_id = get_vote_history(
+                self.request.user.pk).get(self.object.pk)
+            if choice_id is not None:
+                context['existed_vote'] = choice_id
         return context
 
 
-class ResultsView(generic.DetailView):
+class ResultsView(generic.TemplateView):
     """Result page for each questions."""
 
-    model = Question
     template_name = 'polls/results.html'
 
+    def get_context_data(self, **kwargs):
+        """Add the (cached) aggregated results to the template."""
+        context = super().get_context_data(**kwargs)
+        results = get_results(self.kwargs['pk'])
+        if results is None:
+            raise Http404("No question found matching the query")
+        context['results'] = results
+        context['live_results'] = settings.POLLS_LIVE_RESULTS
+        return context
+
 
 @login_required
 def vote(request, question_id):
     """Get the vote action from detail page and save it."""
-    question = get_object_or_404(Question, pk=question_id)
+    if settings.POLLS_BATCHED_VOTES:
+        return queue_vote(request, question_id)
     try:
-        selected_choice = question.choice_set.get(pk=request.POST['choice'])
-    except (KeyError, Choice.DoesNotExist):
+        cast_vote(request.user, question_id, request.POST['choice'])
+    except (KeyError, ValueError, Choice.DoesNotExist):
+        question = get_object_or_404(Question, pk=question_id)
         return render(request, 'polls/detail.html', {
             'question': question,
             'error_message': "You didn't select a choice.",
         })
-    else:
-        try:
-            user_vote = Vote.objects.get(user=request.user,
-                                         choice__question=question)
-            user_vote.choice = selected_choice
-            user_vote.save()
-        except Vote.DoesNotExist:
-            Vote.objects.create(choice=selected_choice,
-                                user=request.user)
-        return HttpResponseRedirect(reverse('polls:results',
-                                            args=(question_id,)))
+    return HttpResponseRedirect(reverse('polls:results',
+                                        args=(question_id,)))
+
+
+def queue_vote(request, question_id):
+    """Queue the vote from detail page to be written in the next batch."""
+    try:
+        choice_id = int(request.POST['choice'])
+    except (KeyError, ValueError):
+        question = get_object_or_404(Question, pk=question_id)
+        return render(request, 'polls/detail.html', {
+            'question': question,
+            'error_message': "You didn't select a choice.",
+        })
+    get_ballot_queue().submit(request.user.id, question_id, choice_id)
+    messages.success(request, "Your vote was received and will be "
+                              "counted in a moment.")
+    return HttpResponseRedirect(reverse('polls:results',
+                                        args=(question_id,)))
+
+
+@require_POST
+@login_required
+def submit_ballot(request, question_id):
+    """Queue a ballot and acknowledge it with a ticket.
+
+    :return: 202 response with the ticket and the URL of its status
+    """
+    try:
+        choice_id = int(request.POST['choice'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': "You didn't select a choice."},
+                            status=400)
+    ticket = get_ballot_queue().submit(request.user.id, question_id,
+                                       choice_id)
+    return JsonResponse({
+        'ticket': ticket,
+        'status': 'pending',
+        'status_url': reverse('polls:ballot_status', args=(ticket,)),
+    }, status=202)
+
+
+@require_GET
+@login_required
+def ballot_status(request, ticket):
+    """Report whether a queued ballot was written."""
+    status = get_ballot_queue().status(ticket, request.user.id)
+    if status is None:
+        raise Http404("No ballot found matching the ticket")
+    return JsonResponse({'ticket': ticket, 'status': status})
@@ -0,0 +1,86 @@
+"""Streaming export of the raw votes for Polls app.
+
+Votes are read as plain tuples with `values_list` in chunks through
+`iterator()`, which uses a server-side cursor where the database has
+one, and written out one line at a time, so memory use does not grow
+with the number of votes.
+"""
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Vote
+
+COLUMNS = ('id', 'user_id', 'question_id', 'choice_id', 'cast_at')
+
+
+def parse_moment(value, end=False):
+    """Parse an ISO date or datetime into an aware datetime.
+
+    A plain date is the start of that day, or the start of the next day
+    with `end`, so it can be used as an exclusive upper bound.
+
+    :raise ValueError: when the value is not a date or datetime
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        if end:
+            day += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def vote_rows(questions=None, since=None, until=None, chunk_size=2000):
+    """Yield the votes as (id, user id, question id, choice id, cast at).
+
+    :param questions: only export the votes of these question ids
+    :param since: only export the votes cast from then
+    :param until: only export the votes cast before then
+    """
+    votes = Vote.objects.order_by('pk')
+    if questions:
+        votes = votes.filter(question_id__in=questions)
+    if since is not None:
+        votes = votes.filter(cast_at__gte=since)
+    if until is not None:
+        votes = votes.filter(cast_at__lt=until)
+    return votes.values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object that returns what is written to it."""
+
+    def write(self, value):
+        """Return the written line instead of buffering it."""
+        return value
+
+
+def csv_lines(rows):
+    """Yield the rows as CSV lines, after a header line."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    """Yield the rows as newline delimited JSON objects."""
+    for row in rows:
+        yield json.dumps(dict(zip(COLUMNS, row)), cls=DjangoJSONEncoder) \
+            + '\n'
+
+
+# Export format name to (line writer, content type).
+FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
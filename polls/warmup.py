@@ -0,0 +1,135 @@
+"""Warm-up of a new worker for Polls app.
+
+A fresh process compiles every template on its first render, builds the
+URL resolvers on the first lookup and connects to the database on the
+first query, so its first requests are slow. With POLLS_WARMUP the work
+is done by `mysite.wsgi` and `mysite.asgi` once the application is
+created, before the worker takes traffic:
+
+- the templates of the project and of Polls app are compiled into the
+  cached template loader,
+- the URL resolvers are populated,
+- the database connections of the loading thread are opened,
+- the results snapshots of the newest open polls are cached.
+
+Failing database steps, e.g. before the migrations ran, are logged and
+skipped, so a worker always starts. The warm-up cannot run in
+`PollsConfig.ready`: Polls app comes first in INSTALLED_APPS, so the URL
+resolvers would be built before the admin has registered its models.
+"""
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template import engines
+from django.urls import get_resolver, resolve, reverse
+
+logger = logging.getLogger(__name__)
+
+
+def compile_templates():
+    """Load every template of the project and of Polls app.
+
+    :return: number of templates compiled
+    """
+    directories = [os.path.join(apps.get_app_config('polls').path,
+                                'templates')]
+    for config in settings.TEMPLATES:
+        directories += [str(directory) for directory in config['DIRS']]
+    compiled = 0
+    for engine in engines.all():
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith('.html'):
+                        path = os.path.join(root, name)
+                        engine.get_template(os.path.relpath(path, directory)
+                                            .replace(os.sep, '/'))
+                        compiled += 1
+    return compiled
+
+
+def resolve_urls():
+    """Populate the root and namespaced URL resolvers.
+
+    :return: number of namespaces populated
+    """
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for _, namespaced in resolver.namespace_dict.values():
+        namespaced.reverse_dict
+    resolve(reverse('polls:index'))
+    return len(resolver.namespace_dict)
+
+
+def open_connections():
+    """Connect every configured database.
+
+    Django connections belong to a thread and are closed at the start of
+    a request when they outlived CONN_MAX_AGE, so this helps servers that
+    handle requests on the thread that loaded the application with
+    persistent connections.
+
+    :return: number of connections opened
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+def prime_open_results():
+    """Cache the results of the newest POLLS_WARMUP_RESULTS open polls.
+
+    :return: number of results snapshots stored
+    """
+    from .models import Question
+    from .results import prime_results, results_queryset
+
+    newest = Question.objects.open().order_by('-pub_date').values('pk')[
+        :settings.POLLS_WARMUP_RESULTS]
+    return prime_results(results_queryset().filter(pk__in=newest))
+
+
+STEPS = [
+    ('templates', compile_templates),
+    ('urls', resolve_urls),
+    ('connections', open_connections),
+    ('results', prime_open_results),
+]
+
+
+def warm_up():
+    """Run every warm-up step.
+
+    :return: dict of step name to how many items it warmed and how long
+             it took, with None as count for steps that failed
+    """
+    report = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            count = step()
+        except DatabaseError:
+            logger.warning("Warm-up step %s failed", name, exc_info=True)
+            count = None
+        report[name] = {
+            'count': count,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+    logger.info("Warmed up: %s", report)
+    return report
+
+
+def warm_up_if_enabled():
+    """Run `warm_up` when POLLS_WARMUP is set.
+
+    Called by the server entry points after every app is ready.
+
+    :return: the report of `warm_up`, or None when it is disabled
+    """
+    if settings.POLLS_WARMUP:
+        return warm_up()
+    return None